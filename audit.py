@@ -0,0 +1,204 @@
+# audit.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This script scores the whole labeled image corpus with the trained classifier
+# to audit the labels, e.g. of the images saved automatically during the games.
+# The images are processed by batches in several processes. The label,
+# prediction and decision margin of each image are written to a CSV table
+# (audit.csv by default) and the images whose prediction disagrees with their
+# label by a margin of at least --margin=<m> (default 0.5) are listed as
+# likely mislabels. For a classifier without one-vs-rest decision values, the
+# margins are not available (nan) and all disagreements are listed.
+# Command line arguments:
+#   --packed: read the images from the packed dataset (see pack.py)
+#   --processes=<n>: number of processes (default: number of CPU cores)
+#   --batch=<n>: number of images per batch (default 64)
+#   --margin=<m>: minimum margin of likely mislabels
+#   --output=<filename>: output CSV filename
+
+import csv
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+
+from rpscv import imgproc as imp
+from rpscv import utils
+
+# Variables of the worker processes, set by initWorker()
+_clf = None
+_images = None
+_bgParams = None
+
+def initWorker(clfFilename, packFilename, bgParams):
+    """Loads the classifier, opens the packed dataset and sets the background
+    parameters of the features in a worker process."""
+    global _clf, _images, _bgParams
+    _bgParams = bgParams
+    from rpscv.model import getPipeline, loadClassifier
+    _clf = getPipeline(loadClassifier(clfFilename))
+    if packFilename is not None:
+        from rpscv.dataset import PackedDataset
+        _images = PackedDataset(packFilename).getImages()
+
+def getDecision(clf, features):
+    """Returns the one-vs-rest decision values of the feature vectors, or None
+    if the classifier does not provide them. The one-vs-one decision values
+    of a CompactClassifier are converted to one-vs-rest values as by the SVC
+    decision_function()."""
+    nbClasses = len(utils.gestureTxt)
+    if hasattr(clf, 'decisionFunction'):
+        return ovoToOvr(clf.decisionFunction(features), nbClasses)
+    if not hasattr(clf, 'decision_function'):
+        return None
+    dec = clf.decision_function(features)
+    if dec.ndim != 2 or dec.shape[1] != nbClasses:
+        return None
+    return dec
+
+def getMargins(dec, labels):
+    """Returns the predictions and the margins of the one-vs-rest decision
+    values dec: the decision value of the predicted gesture minus the
+    decision value of the labeled gesture (0 when they agree)."""
+    pred = dec.argmax(axis=1)
+    rows = np.arange(len(labels))
+    return pred, dec[rows, pred] - dec[rows, labels]
+
+def ovoToOvr(dec, nbClasses):
+    """Returns the one-vs-rest decision values of the one-vs-one decision
+    values dec: the number of votes of each class plus its sum of confidences
+    scaled to (-1/3, 1/3), as the SVC decision_function() with
+    decision_function_shape='ovr'."""
+    votes = np.zeros((dec.shape[0], nbClasses))
+    confidences = np.zeros((dec.shape[0], nbClasses))
+    p = 0
+    for i in range(nbClasses):
+        for j in range(i + 1, nbClasses):
+            positive = dec[:, p] > 0
+            votes[positive, i] += 1
+            votes[~positive, j] += 1
+            confidences[:, i] += dec[:, p]
+            confidences[:, j] -= dec[:, p]
+            p += 1
+    return votes + confidences / (3 * (np.abs(confidences) + 1))
+
+def scoreBatch(batch):
+    """Returns the indices, predictions and margins (see getMargins()) of a
+    batch of (index, filename, label) tuples. The margins are nan if the
+    classifier has no one-vs-rest decision values. The images are read from
+    the packed dataset if it is open, otherwise decoded from the files."""
+    features = np.empty((len(batch), 200 * 300), dtype=np.float32)
+    for i, (index, filename, label) in enumerate(batch):
+        if _images is not None:
+            img = _images[index]
+        else:
+            img = imp.decodeImage(filename)
+        features[i] = imp.getGray(img, *_bgParams)
+    indices = [index for index, filename, label in batch]
+    dec = getDecision(_clf, features)
+    if dec is None:
+        pred = np.asarray(_clf.predict(features), dtype=int)
+        return indices, pred, np.full(len(batch), np.nan)
+    pred, margins = getMargins(dec, np.array([label for index, filename, label
+                                              in batch], dtype=int))
+    return indices, pred, margins
+
+if __name__ == '__main__':
+
+    packed = False
+    nbProcesses = multiprocessing.cpu_count()
+    batchSize = 64
+    minMargin = .5
+    outFilename = 'audit.csv'
+
+    # Read command line arguments
+    for arg in sys.argv[1:]:
+        if arg == '--packed':
+            packed = True
+        elif arg.startswith('--processes='):
+            nbProcesses = int(arg.split('=', 1)[1])
+        elif arg.startswith('--batch='):
+            batchSize = int(arg.split('=', 1)[1])
+        elif arg.startswith('--margin='):
+            minMargin = float(arg.split('=', 1)[1])
+        elif arg.startswith('--output='):
+            outFilename = arg.split('=', 1)[1]
+
+    if packed:
+        from rpscv.dataset import PackedDataset, packFilename
+        dataset = PackedDataset(packFilename)
+        files, labels = dataset.files, dataset.getLabels()
+    else:
+        packFilename = None
+        files = []
+        labels = []
+        for gesture in utils.gestureTxt:
+            for imageFile in imp.getImageFiles(gesture):
+                if imp.readPngShape(imageFile) in [None, imp.imshape]:
+                    files.append(imageFile)
+                    labels.append(gesture)
+        labels = np.array(labels, dtype=int)
+
+    indexedFiles = [(i, files[i], labels[i]) for i in range(len(files))]
+    batches = [indexedFiles[start:start + batchSize]
+               for start in range(0, len(files), batchSize)]
+    pred = np.empty(len(files), dtype=int)
+    margins = np.empty(len(files))
+
+    t0 = time.perf_counter()
+    bgParams = imp.getBackgroundParams()
+    with multiprocessing.Pool(nbProcesses, initWorker,
+                              ('clf.pkl', packFilename, bgParams)) as pool:
+        for indices, batchPred, batchMargins in pool.imap_unordered(
+                scoreBatch, batches):
+            pred[indices] = batchPred
+            margins[indices] = batchMargins
+    dt = time.perf_counter() - t0
+    print('Scored {} images in {:.1f}s ({:.1f} images/s, {} processes)'.format(
+        len(files), dt, len(files) / dt, nbProcesses))
+
+    # Without margins, all the disagreements are flagged
+    flagged = (pred != labels) & ~(margins < minMargin)
+    if np.isnan(margins).any():
+        print('The classifier has no one-vs-rest decision values, margins '
+              'not available')
+
+    with open(outFilename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['file', 'label', 'prediction', 'margin', 'flagged'])
+        for i in range(len(files)):
+            writer.writerow([files[i], utils.gestureTxt[labels[i]],
+                             utils.gestureTxt[pred[i]],
+                             '{:.4f}'.format(margins[i]), int(flagged[i])])
+    print('Predictions written to {}'.format(outFilename))
+
+    print('Agreement with labels: {:.4f}'.format(np.mean(pred == labels)))
+    print('Likely mislabels (margin >= {}): {}'.format(minMargin,
+                                                      np.count_nonzero(flagged)))
+    for i in np.flatnonzero(flagged)[np.argsort(-margins[flagged])]:
+        print('  {}: labeled {}, predicted {} (margin {:.2f})'.format(files[i],
+            utils.gestureTxt[labels[i]], utils.gestureTxt[pred[i]],
+            margins[i]))
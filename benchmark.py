@@ -0,0 +1,256 @@
+# benchmark.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This script runs benchmarks to compare the speed of different parts of the
+# pipeline. The benchmark to run is selected with the first command line
+# argument:
+#   camera: compares the frames captured with and without the camera region of
+#           interest (rpscv.camera.Camera roi argument), using the mock camera
+#           of rpscv.mockcamera so that it runs without a Raspberry Pi.
+#   decode: compares the time to generate the features from the image files with
+#           the available image decoders and thread counts, and the time to
+#           validate the image shapes from the PNG headers vs by decoding.
+#   knn: compares the predict latency and score of the current classifier with
+#        a k-nearest neighbours classifier using its PCA (rpscv.knn).
+#   server: measures the throughput and latency of the inference server
+#           (rpscv.server) as the number of clients grows.
+
+import sys
+import time
+
+import numpy as np
+
+import train
+
+def camera(nbFrames=100):
+    """Checks, with the mock camera and for each flip setting, that the frames
+    captured with the camera region of interest are identical to the cropped
+    full frames and that getFrameBytes() is the number of bytes written by
+    the camera per frame, then compares the bytes transferred and the time
+    per frame. Raises AssertionError if a check fails."""
+    from rpscv import imgproc as imp
+    from rpscv import mockcamera
+    from rpscv.camera import Camera
+
+    def checkBytes(cam, nbFrames):
+        if cam.picam.nbBytes != nbFrames * cam.getFrameBytes():
+            raise AssertionError('{} bytes written by the camera for {} '
+                'frames, getFrameBytes() is {}'.format(cam.picam.nbBytes,
+                                                       nbFrames,
+                                                       cam.getFrameBytes()))
+
+    print('Cropped full frame vs region of interest:')
+    for hflip, vflip in [(False, False), (True, False), (False, True),
+                         (True, True)]:
+        cams = [Camera(size=8, hflip=hflip, vflip=vflip,
+                       picamera=mockcamera),
+                Camera(size=8, hflip=hflip, vflip=vflip, roi=imp.cropWindow,
+                       picamera=mockcamera)]
+        try:
+            full, roi = [imp.crop(cam.getOpenCVImage()) for cam in cams]
+            if full.shape != roi.shape or not np.array_equal(full, roi):
+                raise AssertionError('Frames differ with hflip={}, vflip={}: '
+                    'shapes {} and {}'.format(hflip, vflip, full.shape,
+                                              roi.shape))
+            for cam in cams:
+                checkBytes(cam, 1)
+            print('  hflip={!s:<6} vflip={!s:<6} identical {} frames'.format(
+                hflip, vflip, 'x'.join(str(n) for n in roi.shape)))
+        finally:
+            for cam in cams:
+                cam.close()
+
+    cams = [Camera(size=8, picamera=mockcamera),
+            Camera(size=8, roi=imp.cropWindow, picamera=mockcamera)]
+    try:
+        print('  {:<22}{:>14}{:>14}'.format('capture', 'bytes/frame',
+                                            'time/frame'))
+        for name, cam in zip(['full frame + crop', 'region of interest'],
+                             cams):
+            t0 = time.perf_counter()
+            for i in range(nbFrames):
+                imp.crop(cam.getOpenCVImage())
+            dt = (time.perf_counter() - t0) / nbFrames
+            checkBytes(cam, nbFrames)
+            print('  {:<22}{:>14}{:>12.3f}ms'.format(name, cam.getFrameBytes(),
+                                                    1000 * dt))
+        print('Bytes per frame reduced x{:.2f}'.format(
+            cams[0].getFrameBytes() / cams[1].getFrameBytes()))
+    finally:
+        for cam in cams:
+            cam.close()
+
+def decode(nbImg=300, threadCounts=(1, 2, 4)):
+    """Compares the feature generation time from the image files for each
+    decoder and number of threads, on a subset of nbImg images."""
+    from rpscv import imgproc as imp
+    from rpscv import utils
+
+    files = []
+    for gesture in utils.gestureTxt:
+        files += imp.getImageFiles(gesture)[:nbImg // 3]
+
+    # Shape validation of the image files
+    t0 = time.perf_counter()
+    for imageFile in files:
+        imp.readPngShape(imageFile)
+    tHeader = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for imageFile in files:
+        imp.decodeImage(imageFile)
+    tDecode = time.perf_counter() - t0
+    print('Shape validation ({} images): header {:.3f}ms/image, decoding '
+          '{:.3f}ms/image'.format(len(files), 1000 * tHeader / len(files),
+                                  1000 * tDecode / len(files)))
+
+    print('Feature generation:')
+    for decoder in ['cv2', 'skimage']:
+        for nbThreads in threadCounts:
+            t0 = time.perf_counter()
+            features, labels = imp.generateGrayFeatures(nbImg=nbImg,
+                decoder=decoder, nbThreads=nbThreads)
+            dt = time.perf_counter() - t0
+            print('  {}, {} thread(s): {} images in {:.2f}s, {:.1f} '
+                  'images/s'.format(decoder, nbThreads, len(labels), dt,
+                                    len(labels) / dt))
+
+def knn(k=5, nbRepeat=5):
+    """Compares the current classifier with k-nearest neighbours classifiers
+    using its PCA."""
+    from sklearn.metrics import f1_score
+
+    from rpscv.knn import PCAKNNClassifier
+    from rpscv.model import getPipeline, loadClassifier, measureLatency
+
+    features, labels, files = train.loadFeatures()
+    train_index, test_index = train.splitHeldOut(files, labels)
+    X_train, X_test = features[train_index], features[test_index]
+    y_train, y_test = labels[train_index], labels[test_index]
+    clf = getPipeline(loadClassifier(train.pklFilename))
+
+    print('Predict latency ({} test images x {}):'.format(len(X_test),
+                                                           nbRepeat))
+    printLatency('current classifier', measureLatency(clf, X_test, nbRepeat))
+    scores = [('current classifier',
+               f1_score(y_test, clf.predict(X_test), average='micro'))]
+
+    for algorithm in ['brute', 'kdtree', 'balltree']:
+        knnClf = PCAKNNClassifier.fromPipeline(clf, k=k, algorithm=algorithm)
+        knnClf.fit(X_train, y_train)
+        knnClf.predict(X_test[:1])
+        name = 'k-NN {} (k={})'.format(algorithm, k)
+        printLatency(name, measureLatency(knnClf, X_test, nbRepeat))
+        scores.append((name, f1_score(y_test, knnClf.predict(X_test),
+                                      average='micro')))
+
+    print('Test set f1-score:')
+    for name, score in scores:
+        print('  {}: {:.4f}'.format(name, score))
+
+    # Time to add a single labeled image
+    times = []
+    for x, y in zip(X_test, y_test):
+        t0 = time.perf_counter()
+        knnClf.append([x], [y])
+        times.append(time.perf_counter() - t0)
+    print('Append time per image:')
+    printLatency('k-NN', np.array(times))
+
+def printLatency(name, times):
+    """Prints the median and 99th percentile of prediction times."""
+    print('  {}: median {:.3f}ms, p99 {:.3f}ms'.format(name,
+        1000 * np.median(times), 1000 * np.percentile(times, 99)))
+
+def runClient(address, features, duration, results):
+    """Sends the feature vectors to the inference server in a loop for
+    duration seconds and puts the list of (latency, queue time, batch size)
+    tuples of the requests in the results queue. Run in a client process."""
+    from rpscv.server import InferenceClient
+
+    client = InferenceClient(address)
+    times = []
+    tEnd = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < tEnd:
+        t0 = time.perf_counter()
+        pred = client.request(features[i % len(features)])
+        times.append((time.perf_counter() - t0, pred.queueTime,
+                      pred.batchSize))
+        i += 1
+    client.close()
+    results.put(times)
+
+def server(clientCounts=(1, 2, 4, 8, 16), duration=5, maxBatch=32,
+           maxDelay=.005):
+    """Measures the throughput and latency of an inference server with an
+    increasing number of client processes sending requests back to back."""
+    import multiprocessing
+    import os
+    import tempfile
+
+    from rpscv.model import ModelRegistry
+    from rpscv.server import InferenceServer
+
+    features, labels, files = train.loadFeatures()
+    features = features[:50]
+    registry = ModelRegistry(train.pklFilename)
+    registry.getClassifier()
+    address = os.path.join(tempfile.mkdtemp(), 'rpscv.sock')
+    srv = InferenceServer(registry, address, maxBatch, maxDelay)
+    srv.start()
+
+    print('Inference server (max batch {}, max delay {:.1f}ms):'.format(
+        maxBatch, 1000 * maxDelay))
+    print('  {:>8}{:>14}{:>12}{:>12}{:>12}{:>12}'.format('clients',
+        'requests/s', 'median', 'p99', 'queue p99', 'mean batch'))
+    try:
+        for nbClients in clientCounts:
+            results = multiprocessing.Queue()
+            clients = [multiprocessing.Process(target=runClient,
+                           args=(address, features, duration, results))
+                       for i in range(nbClients)]
+            for c in clients:
+                c.start()
+            times = np.array(sum([results.get() for c in clients], []))
+            for c in clients:
+                c.join()
+            print('  {:>8}{:>14.1f}{:>10.2f}ms{:>10.2f}ms{:>10.2f}ms'
+                  '{:>12.1f}'.format(nbClients, len(times) / duration,
+                1000 * np.median(times[:, 0]),
+                1000 * np.percentile(times[:, 0], 99),
+                1000 * np.percentile(times[:, 1], 99), times[:, 2].mean()))
+    finally:
+        srv.stop()
+        registry.stop()
+
+if __name__ == '__main__':
+
+    benchmarks = {'camera': camera, 'decode': decode, 'knn': knn, 'server': server}
+
+    if len(sys.argv) < 2 or sys.argv[1] not in benchmarks:
+        print('Usage: python benchmark.py <{}>'.format('|'.join(benchmarks)))
+        sys.exit(1)
+
+    benchmarks[sys.argv[1]]()
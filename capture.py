@@ -25,8 +25,10 @@
 
 # This script is opens the camera to capture images corresponding to Rock, Paper
 # Scisors gestures in a consistant format. It is to be used to capture the images
-# used to train the classifier.
+# used to train the classifier. Use the --fps=<n> argument to set the target
+# frame rate of the capture loop (0 to run as fast as possible).
 
+import sys
 import time
 
 import cv2
@@ -57,6 +59,12 @@ def saveImage(img, gesture):
     else:
         print("Save cancelled")
 
+# Read command line arguments
+frameRate = utils.loopFrameRate
+for arg in sys.argv[1:]:
+    if arg.startswith('--fps='):
+        frameRate = float(arg.split('=', 1)[1])
+
 try:
     # Create camera object with pre-defined settings
     cam = utils.cameraSetup()
@@ -75,8 +83,15 @@ try:
     print("Scisors gesture: s or c")
     print("Press ESC or q to quit capture mode\n")
 
+    # Frame pacing of the main loop
+    scheduler = utils.RateScheduler(frameRate) if frameRate > 0 else None
+
     # Main loop
     while not stop:
+        # Wait for the next frame deadline
+        if scheduler is not None:
+            scheduler.wait()
+
         # Capture image from camera
         img = cam.getOpenCVImage()
 
@@ -110,6 +125,9 @@ try:
             if gesture is not None:
                 saveImage(img, gesture)
 
+    if scheduler is not None:
+        scheduler.report()
+
 finally:
     cv2.destroyAllWindows()
     cam.close()
@@ -0,0 +1,175 @@
+# compress.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This script exports compressed versions of the trained classifier for faster
+# prediction on the Raspberry Pi, without retraining. The compression method is
+# selected with the first command line argument:
+#   prune [budget]: merges near-duplicate SVC support vectors, using the largest
+#                   merge radius for which the f1-score on the held-out test set
+#                   recorded by train.py (clf-split.json) drops by less than
+#                   budget (default 0.005).
+#   quantize [float16|int8]: stores the PCA components and SVC support vectors
+#                            in reduced precision (default float16).
+# The compressed classifier is validated against the original classifier on the
+# whole image dataset and written to clf-<method>.pkl only if it predicts the same
+# gesture as the original classifier for at least minAgreement of the images
+# (last argument, default 0.99). Rename it to clf.pkl to use it in the game.
+
+import sys
+import time
+
+import numpy as np
+
+import train
+
+# Default minimum fraction of the images for which the compressed classifier
+# must predict the same gesture as the original classifier to be written
+minAgreement = .99
+
+def prune(budget=0.005, minAgreement=minAgreement, nbRadius=20):
+    """Exports the classifier with near-duplicate support vectors merged.
+    Merge radiuses are tried from the distribution of distances between
+    support vectors of the same class and the largest radius keeping the
+    f1-score on the held-out test set of the classifier (see
+    train.splitHeldOut()) within budget of the original score is selected.
+    Reports the number of support vectors kept, the prediction agreement and
+    the prediction time compared to the original classifier. The classifier
+    is not written if the agreement is below minAgreement."""
+    from sklearn.metrics import f1_score
+
+    from rpscv.compact import CompactClassifier, agreement, pruneSupportVectors
+    from rpscv.model import getPipeline, loadClassifier
+
+    budget = float(budget)
+    clf = getPipeline(loadClassifier(train.pklFilename))
+    features, labels, files = train.loadFeatures()
+    train_index, test_index = train.splitHeldOut(files, labels)
+    X_test, y_test = features[test_index], labels[test_index]
+
+    compact = CompactClassifier(clf, 'float32')
+    refScore = f1_score(y_test, clf.predict(X_test), average='micro')
+    nbSv = compact.getNbSupportVectors()
+
+    # Candidate radiuses from the nearest neighbour distances between support
+    # vectors
+    sv = compact.supportVectors
+    sqDist = ((sv ** 2).sum(axis=1)[:, np.newaxis] - 2 * sv.dot(sv.T)
+              + (sv ** 2).sum(axis=1))
+    np.fill_diagonal(sqDist, np.inf)
+    nnDist = np.sqrt(np.maximum(sqDist.min(axis=1), 0))
+    radiuses = np.percentile(nnDist, np.linspace(5, 100, nbRadius))
+
+    best = compact
+    print('Original: {} support vectors, test f1-score {:.4f}'.format(nbSv,
+                                                                     refScore))
+    print('  {:>10}{:>10}{:>10}{:>10}'.format('radius', 'kept', 'f1-score',
+                                            'agreement'))
+    for radius in radiuses:
+        pruned = pruneSupportVectors(compact, radius)
+        score = f1_score(y_test, pruned.predict(X_test), average='micro')
+        agree = agreement(clf, pruned, X_test)
+        print('  {:>10.4f}{:>10}{:>10.4f}{:>10.4f}'.format(radius,
+            pruned.getNbSupportVectors(), score, agree))
+        if score < refScore - budget:
+            break
+        best = pruned
+
+    print('Kept {} of {} support vectors ({:.1%})'.format(
+        best.getNbSupportVectors(), nbSv, best.getNbSupportVectors() / nbSv))
+    # Kernel evaluation time per frame, excluding the PCA projection which is
+    # the same for both classifiers
+    proj = compact.project(X_test)
+    tk = []
+    for c in [compact, best]:
+        times = []
+        for i in range(len(proj)):
+            t0 = time.perf_counter()
+            c.kernelDecision(proj[i:i + 1])
+            times.append(time.perf_counter() - t0)
+        tk.append(np.median(times))
+    print('Median kernel evaluation time per frame: original {:.3f}ms, pruned '
+          '{:.3f}ms (x{:.2f})'.format(1000 * tk[0], 1000 * tk[1],
+                                       tk[0] / tk[1]))
+
+    if validate(clf, best, features, float(minAgreement)):
+        saveCompressed(best, 'pruned')
+
+def quantize(dtype='float16', minAgreement=minAgreement):
+    """Exports the classifier with its parameters stored as dtype and reports
+    its size, prediction agreement and prediction time compared to the
+    original classifier. The classifier is not written if the agreement is
+    below minAgreement."""
+    from rpscv.compact import CompactClassifier
+    from rpscv.model import getPipeline, loadClassifier
+
+    clf = getPipeline(loadClassifier(train.pklFilename))
+    features, labels, files = train.loadFeatures()
+
+    reference = CompactClassifier(clf, 'float32')
+    compact = CompactClassifier(clf, dtype)
+    print('Model parameters: {:.2f}MB (float32), {:.2f}MB ({})'.format(
+        reference.getNbytes() / 1e6, compact.getNbytes() / 1e6, dtype))
+
+    if validate(clf, compact, features, float(minAgreement)):
+        saveCompressed(compact, dtype)
+
+def saveCompressed(compact, name):
+    """Writes the compressed classifier to clf-<name>.pkl."""
+    from rpscv.model import saveClassifier
+    filename = '{}-{}.pkl'.format(train.pklFilename.rsplit('.', 1)[0], name)
+    saveClassifier(compact, filename)
+    print('Compressed classifier written to {}'.format(filename))
+
+def validate(clf, compact, features, minAgreement=minAgreement, nbLatency=50):
+    """Prints the fraction of the images for which the compressed classifier
+    predicts the same gesture as the original classifier and their median
+    per-frame prediction times. Returns True if the agreement is at least
+    minAgreement."""
+    from rpscv.compact import agreement
+    from rpscv.model import measureLatency
+
+    agree = agreement(clf, compact, features)
+    print('Agreement with original classifier on {} images: {:.4f}'.format(
+        len(features), agree))
+    t = np.median(measureLatency(clf, features[:nbLatency]))
+    tc = np.median(measureLatency(compact, features[:nbLatency]))
+    print('Median prediction time per frame: original {:.3f}ms, compressed '
+          '{:.3f}ms (x{:.2f})'.format(1000 * t, 1000 * tc, t / tc))
+    if agree < minAgreement:
+        print('Agreement below the minimum of {}, compressed classifier not '
+              'written'.format(minAgreement))
+        return False
+    return True
+
+if __name__ == '__main__':
+
+    methods = {'prune': prune, 'quantize': quantize}
+
+    if len(sys.argv) < 2 or sys.argv[1] not in methods:
+        print('Usage: python compress.py <{}> [options]'.format(
+            '|'.join(methods)))
+        sys.exit(1)
+
+    methods[sys.argv[1]](*sys.argv[2:])
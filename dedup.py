@@ -0,0 +1,72 @@
+# dedup.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This script updates the near-duplicate index of the raw image folders
+# (img/hashes.json, see rpscv.dedup) and reports the groups of near-duplicate
+# images, such as successive captures of the same pose. Only the images not yet
+# indexed are hashed. The maximum number of different hash bits for two images
+# to be near-duplicates can be set with the --distance=<n> argument (default 4).
+# Use train.py --dedup to exclude the near-duplicates from training.
+
+import sys
+import time
+
+from rpscv import utils
+from rpscv.dedup import DuplicateIndex
+
+if __name__ == '__main__':
+
+    maxDistance = 4
+    verbose = False
+
+    # Read command line arguments
+    for arg in sys.argv[1:]:
+        if arg.startswith('--distance='):
+            maxDistance = int(arg.split('=', 1)[1])
+        elif arg == '--verbose':
+            verbose = True
+
+    t0 = time.time()
+    index = DuplicateIndex(maxDistance=maxDistance)
+    nbAdded = index.update(verbose)
+    print('Indexed {} new images, removed {} missing or relabeled images ({} '
+          'images) in {:.1f}s'.format(nbAdded, index.nbRemoved, len(index),
+                                      time.time() - t0))
+
+    duplicates = index.getDuplicates()
+    groups = {}
+    for duplicate, original in duplicates.items():
+        groups.setdefault(original, []).append(duplicate)
+    for original in sorted(groups):
+        print('{}:'.format(original))
+        for duplicate in sorted(groups[original]):
+            print('  {}'.format(duplicate))
+
+    labels = dict(zip(index.files, index.labels))
+    for gesture in utils.gestureTxt:
+        nbImages = sum([l == gesture for l in index.labels[:len(index)]])
+        nbDuplicates = sum([labels[f] == gesture for f in duplicates])
+        print('{}: {} of {} images are near-duplicates'.format(
+            utils.gestureTxt[gesture], nbDuplicates, nbImages))
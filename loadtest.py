@@ -0,0 +1,255 @@
+# loadtest.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This script runs simulated game sessions concurrently, without camera or
+# display, to measure how the recognition and game logic of play.py scales with
+# the number of players. Each session replays a sequence of camera frames
+# through the same steps as the game loop: crop, grayscale features, hand
+# presence check, prediction and game update (successive predictions rule and
+# scores), as fast as possible. The frames are read from a directory of
+# recorded raw BGR camera frames (--frames=<dir>, sorted by filename) or, by
+# default, built from the labeled images of the image folders, each image being
+# held for a few frames between frames of the empty background.
+# Command line arguments:
+#   --sessions=<n>[,<n>...]: numbers of concurrent sessions (default 1,2,4)
+#   --mode=thread|process: run the sessions in threads or processes
+#   --duration=<s>: duration of each run in seconds (default 10)
+#   --frames=<dir>: directory of recorded frames
+#   --server[=<address>]: predict with an inference server (see server.py)
+# The aggregate frames per second, the per-frame and per-decision latencies
+# (time from the first frame of a gesture to the round being played) and the
+# CPU time and peak memory of the run are reported, followed by the frames per
+# second and latencies of each session. The fairness is the ratio of the
+# lowest to the highest frame rate of the sessions (1 if all sessions are
+# served equally).
+
+import glob
+import os
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from rpscv import imgproc as imp
+from rpscv import utils
+from rpscv.game import RPSGame
+
+# Raw camera frame shape (camera size 8)
+frameShape = (384, 512, 3)
+
+def getCpuTime():
+    """Returns the CPU time (user + system) used by this process and its
+    terminated child processes, and the peak memory (resident set size, in
+    MB) of this process and of its largest child."""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (usage.ru_utime + usage.ru_stime + children.ru_utime
+           + children.ru_stime)
+    return cpu, usage.ru_maxrss / 1024, children.ru_maxrss / 1024
+
+def loadFrames(directory):
+    """Returns the list of the recorded BGR frames of the directory. Raises
+    ValueError if there is no frame."""
+    files = sorted(glob.glob(os.path.join(directory, '*.png')))
+    if len(files) == 0:
+        raise ValueError('No .png frames in {}'.format(directory))
+    return [cv2.imread(f, cv2.IMREAD_COLOR) for f in files]
+
+def makeFrames(nbRounds=30, nbHold=5, nbEmpty=3, rs=42):
+    """Returns a list of BGR frames simulating nbRounds rounds: a randomly
+    selected labeled image held for nbHold frames followed by nbEmpty frames
+    of the empty background. The images are placed at the crop position of a
+    camera frame with their borders replicated. Raises ValueError if there
+    is no labeled image."""
+    rand = np.random.RandomState(rs)
+    files = [f for g in utils.gestureTxt for f in imp.getImageFiles(g)
+             if imp.readPngShape(f) in [None, imp.imshape]]
+    if len(files) == 0:
+        raise ValueError('No labeled images in the image folders, use '
+                         '--frames=<dir> to replay recorded frames')
+    top, left = imp.cropWindow[:2]
+    frames = []
+    for i in range(nbRounds):
+        img = cv2.imread(files[rand.randint(len(files))], cv2.IMREAD_COLOR)
+        rows, cols = img.shape[:2]
+        frame = cv2.copyMakeBorder(img, top, frameShape[0] - top - rows, left,
+                                   frameShape[1] - left - cols,
+                                   cv2.BORDER_REPLICATE)
+        # Empty background frame with the color of the image corner
+        empty = np.empty_like(frame)
+        empty[:] = img[0, 0]
+        frames += [frame] * nbHold + [empty] * nbEmpty
+    return frames
+
+def printResults(nbSessions, mode, results, duration, cpu, memory):
+    """Prints the aggregated results of the sessions of a run, then the
+    results of each session."""
+    nbFrames = sum([len(r[0]) for r in results])
+    frameTimes = np.concatenate([r[0] for r in results])
+    decisionTimes = np.concatenate([r[1] for r in results] + [[np.nan]])
+    nbDecisions = len(decisionTimes) - 1
+    sessionFps = [len(r[0]) / duration for r in results]
+    print('  {:>8}{:>8}{:>10.1f}{:>9.2f}ms{:>9.2f}ms{:>10}{:>9.1f}ms'
+          '{:>9.1f}ms{:>8.0f}%{:>8.0f}MB{:>10.2f}'.format(nbSessions, mode,
+        nbFrames / duration, 1000 * np.median(frameTimes),
+        1000 * np.percentile(frameTimes, 99), nbDecisions,
+        1000 * np.nanmedian(decisionTimes),
+        1000 * np.nanpercentile(decisionTimes, 99),
+        100 * cpu / duration, memory, min(sessionFps) / max(sessionFps)))
+    if nbSessions > 1:
+        for i, (frameTimes, decisionTimes) in enumerate(results):
+            decisionTimes = np.concatenate([decisionTimes, [np.nan]])
+            print('  {:>8}{:>8}{:>10.1f}{:>9.2f}ms{:>9.2f}ms{:>10}{:>9.1f}ms'
+                  '{:>9.1f}ms'.format('#{}'.format(i), '', sessionFps[i],
+                1000 * np.median(frameTimes),
+                1000 * np.percentile(frameTimes, 99), len(decisionTimes) - 1,
+                1000 * np.nanmedian(decisionTimes),
+                1000 * np.nanpercentile(decisionTimes, 99)))
+
+def runSession(frames, duration, serverAddress=None, clf=None,
+               results=None):
+    """Replays the frames in a loop through the game loop steps for duration
+    seconds. Returns the per-frame processing times and the decision
+    latencies as numpy arrays, also put in the results queue if specified
+    (process mode). The classifier is loaded if clf is None."""
+    if serverAddress is not None:
+        from rpscv.server import InferenceClient
+        clf = InferenceClient(serverAddress)
+    elif clf is None:
+        from rpscv.model import loadClassifier, warmUp
+        clf = loadClassifier('clf.pkl')
+        warmUp(clf)
+
+    game = RPSGame(endScore=5, resultDelay=0, gameOverDelay=0, loop=True)
+    hueValue, threshold = imp.getBackgroundParams()
+    gray = np.empty(imp.imshape[0] * imp.imshape[1], dtype=np.float32)
+    frameTimes = []
+    decisionTimes = []
+    lastGesture = None
+    tGesture = None
+    tEnd = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < tEnd:
+        t0 = time.perf_counter()
+        img = imp.crop(frames[i % len(frames)])
+        imp.getGrayBGR(img, hueValue, threshold, out=gray)
+        predGesture = None
+        if np.count_nonzero(gray) > 9000:
+            predGesture = clf.predict([gray])[0]
+        rnd = game.update(predGesture)
+        t1 = time.perf_counter()
+        frameTimes.append(t1 - t0)
+        if predGesture != lastGesture:
+            lastGesture = predGesture
+            tGesture = t0
+        if rnd is not None:
+            decisionTimes.append(t1 - tGesture)
+        i += 1
+
+    times = (np.array(frameTimes), np.array(decisionTimes))
+    if results is not None:
+        results.put(times)
+    return times
+
+def runSessions(frames, nbSessions, mode, duration, serverAddress=None):
+    """Runs nbSessions concurrent sessions in threads or processes and
+    returns their results."""
+    import multiprocessing
+    import threading
+
+    clf = None
+    if mode == 'thread' and serverAddress is None:
+        # The sessions share the classifier
+        from rpscv.model import loadClassifier, warmUp
+        clf = loadClassifier('clf.pkl')
+        warmUp(clf)
+
+    results = multiprocessing.Queue() if mode == 'process' else []
+    if mode == 'process':
+        workers = [multiprocessing.Process(target=runSession,
+                       args=(frames, duration, serverAddress, None, results))
+                   for i in range(nbSessions)]
+    else:
+        workers = [threading.Thread(target=lambda: results.append(
+                       runSession(frames, duration, serverAddress, clf)))
+                   for i in range(nbSessions)]
+    for w in workers:
+        w.start()
+    if mode == 'process':
+        results = [results.get() for w in workers]
+    for w in workers:
+        w.join()
+    return results
+
+if __name__ == '__main__':
+
+    sessionCounts = [1, 2, 4]
+    mode = 'thread'
+    duration = 10
+    framesDir = None
+    serverAddress = None
+
+    # Read command line arguments
+    for arg in sys.argv[1:]:
+        if arg.startswith('--sessions='):
+            sessionCounts = [int(n) for n in arg.split('=', 1)[1].split(',')]
+        elif arg.startswith('--mode='):
+            mode = arg.split('=', 1)[1]
+        elif arg.startswith('--duration='):
+            duration = float(arg.split('=', 1)[1])
+        elif arg.startswith('--frames='):
+            framesDir = arg.split('=', 1)[1]
+        elif arg == '--server':
+            from rpscv.server import defaultAddress
+            serverAddress = defaultAddress
+        elif arg.startswith('--server='):
+            serverAddress = arg.split('=', 1)[1]
+
+    if mode not in ['thread', 'process']:
+        print('Usage: python loadtest.py [--mode=thread|process] '
+              '[--sessions=1,2,4] [--duration=10] [--frames=<dir>] '
+              '[--server[=<address>]]')
+        sys.exit(1)
+
+    try:
+        frames = loadFrames(framesDir) if framesDir else makeFrames()
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    print('Replaying {} frames per session ({} mode, {}s per run)'.format(
+        len(frames), mode, duration))
+    print('  {:>8}{:>8}{:>10}{:>11}{:>11}{:>10}{:>11}{:>11}{:>9}{:>10}{:>10}'
+          .format('sessions', 'mode', 'fps', 'frame p50', 'frame p99',
+                  'decisions', 'decis. p50', 'decis. p99', 'cpu', 'memory',
+                  'fairness'))
+    for nbSessions in sessionCounts:
+        cpu0 = getCpuTime()[0]
+        results = runSessions(frames, nbSessions, mode, duration,
+                              serverAddress)
+        cpu, memory, childMemory = getCpuTime()
+        printResults(nbSessions, mode, results, duration, cpu - cpu0,
+                     max(memory, childMemory))
@@ -0,0 +1,55 @@
+# pack.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This script packs the labeled images of the raw image folders into a single
+# memory-mappable dataset file (img/dataset.u8 and img/dataset.json index).
+# Images already in the dataset are skipped so the script can be rerun to append
+# new captures. Images deleted from the folders or moved to another gesture
+# folder are removed from the dataset. Use train.py --packed to train from the
+# packed dataset.
+
+import sys
+import time
+
+from rpscv.dataset import PackedDataset, packFilename
+
+if __name__ == '__main__':
+
+    filename = packFilename
+    verbose = False
+
+    # Read command line arguments
+    for arg in sys.argv[1:]:
+        if arg == '--verbose':
+            verbose = True
+        else:
+            filename = arg
+
+    t0 = time.time()
+    dataset = PackedDataset(filename)
+    nbAdded = dataset.pack(verbose=verbose)
+    print('Added {} and removed {} images in {} ({} images) in '
+          '{:.1f}s'.format(nbAdded, dataset.nbRemoved, dataset.dataFilename,
+                           len(dataset), time.time() - t0))
@@ -25,17 +25,29 @@
 
 # This file is the main program to run to play the Rock-Paper-Scissors game.
 # Game output is made through the terminal and OpenCV window (no GUI).
+# Use the --server[=<address>] argument to predict the gestures with an
+# inference server (see server.py) instead of a local classifier and the
+# --fps=<n> argument to set the target frame rate of the game loop (0 to run as
+# fast as possible).
 
+import sys
 import time
-import random
+# Start time of the program, used to report the startup times
+tStart = time.time()
 
-import cv2
 import numpy as np
-
 from rpscv import utils
-from rpscv import imgproc as imp
+startup = utils.StageTimer(tStart)
+startup.mark('import numpy, rpscv.utils')
 
-import pickle
+import cv2
+startup.mark('import cv2')
+
+from rpscv import imgproc as imp
+from rpscv.game import RPSGame, GAMEOVER, DONE
+from rpscv.model import ClassifierLoader
+from rpscv.server import InferenceClient, defaultAddress
+startup.mark('import rpscv')
 
 def saveImage(img, gesture, notify=False):
 
@@ -50,14 +62,41 @@ def saveImage(img, gesture, notify=False):
     # Save image
     cv2.imwrite(folder + name + extension, img)
 
+# Read command line arguments
+serverAddress = None
+frameRate = utils.loopFrameRate
+for arg in sys.argv[1:]:
+    if arg == '--server':
+        serverAddress = defaultAddress
+    elif arg.startswith('--server='):
+        serverAddress = arg.split('=', 1)[1]
+    elif arg.startswith('--fps='):
+        frameRate = float(arg.split('=', 1)[1])
+
 try:
-    # Load classifier from pickle file
-    filename = 'clf.pkl'
-    with open(filename, 'rb') as f:
-        clf = pickle.load(f)
+    if serverAddress is None:
+        # Load and warm up classifier from pickle file in background
+        loader = ClassifierLoader('clf.pkl')
 
     # Create camera object with pre-defined settings
     cam = utils.cameraSetup()
+    startup.mark('camera setup')
+
+    # Read or calibrate the background removal parameters
+    hueValue, threshold = utils.backgroundSetup(cam)
+    startup.mark('background setup')
+
+    if serverAddress is None:
+        # Wait for classifier to be ready
+        clf = loader.getClassifier()
+        startup.mark('wait for classifier')
+        startup.report()
+        loader.printTimes()
+    else:
+        # The client predict() method sends the requests to the server
+        clf = InferenceClient(serverAddress)
+        startup.mark('connect to inference server')
+        startup.report()
 
     # Initialize variable to stop while loop execution
     stop = False
@@ -67,77 +106,63 @@ try:
 
     # Print instructions
     print("\nImage recognition mode")
-    print("Press ESC or q to quit\n")
+    print("Press ESC or q to quit")
+    print("Press b to recalibrate the background (remove hand first)\n")
+
+    # Initialize game state machine
+    game = RPSGame(endScore=5, gameOverDelay=0)
 
-    # Initialize last gesture value
-    lastGesture = -1
+    # Feature vector buffer, reused at each frame
+    gray = np.empty(200 * 300, dtype=np.float32)
 
-    # Initialize player scores
-    playerScore = 0
-    computerScore = 0
-    endScore = 5
+    # Frame pacing of the main loop
+    scheduler = utils.RateScheduler(frameRate) if frameRate > 0 else None
 
     # Main loop
     while not stop:
+        # Wait for the next frame deadline
+        if scheduler is not None:
+            scheduler.wait()
+
         # Capture image from camera
         img = cam.getOpenCVImage()
 
         # Crop image
         img = imp.crop(img)
 
-        # Convert image to RGB (from BGR)
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-        # Get grayscale image
-        gray = imp.getGray(imgRGB, threshold=17)
+        # Get grayscale image directly from the BGR image
+        imp.getGrayBGR(img, hueValue, threshold, out=gray)
 
         # Count non-background pixels
         nonZero = np.count_nonzero(gray)
 
-        # Define waiting time for cv2.waitKey()
-        waitTime = 1
-
         # Parameters for saving new images
         gesture = None
         notify = False
 
+        # Predict gesture if player hand is present. Prediction continues
+        # during the game pauses so the next round is ready when they end.
+        predGesture = None
         #if  9000 < nz and nz < 25000:
         if nonZero > 9000:
-
-            # Predict gesture
             predGesture = clf.predict([gray])[0]
 
-            if predGesture == lastGesture:
-                successive += 1
-            else:
-                successive = 0
-
-            if successive == 2:
-                print('Player: {}'.format(utils.gestureTxt[predGesture]))
-                waitTime=3000
-                gesture = predGesture
-
-                # Computer gesture
-                computerGesture = random.randint(0,2)
-                print('Computer: {}'.format(utils.gestureTxt[computerGesture]))
-
-                diff = computerGesture - predGesture
-                if diff in [-2, 1]:
-                    print('Computer wins!')
-                    computerScore += 1
-                elif diff in [-1, 2]:
-                    print('Player wins!')
-                    playerScore += 1
-                else:
-                    print('Tie')
-                print('Score: player {}, computer {}\n'.format(playerScore,
-                                                             computerScore))
+        # Update game state
+        rnd = game.update(predGesture)
 
-            lastGesture = predGesture
+        if rnd is not None:
+            print('Player: {}'.format(utils.gestureTxt[rnd.player]))
+            print('Computer: {}'.format(utils.gestureTxt[rnd.computer]))
+            gesture = rnd.player
 
-        else:
-
-            lastGesture = -1
+            if rnd.winner == 'computer':
+                print('Computer wins!')
+            elif rnd.winner == 'player':
+                print('Player wins!')
+            else:
+                print('Tie')
+            print('Score: player {}, computer {}\n'.format(game.plScore,
+                                                         game.coScore))
 
         # Rotate and add framerate to copy of image
         imgFR = imp.fastRotate(img)
@@ -148,7 +173,7 @@ try:
         cv2.imshow('Camera', imgFR)
 
         # Wait for key press
-        key = cv2.waitKey(waitTime)
+        key = cv2.waitKey(1)
         if key in [27, 113]:
             # Escape or "Q" key pressed; Stop.
             stop = True
@@ -164,19 +189,25 @@ try:
             # S or C key pressed (Scissors)
             gesture = utils.SCISSORS
             notify = True
+        elif key == 98:
+            # B key pressed, recalibrate background
+            hueValue, threshold = utils.doBackgroundCalibration(cam)
 
         if gesture is not None:
             # Save new image
             saveImage(img, gesture, notify)
 
-        if playerScore == endScore or computerScore == endScore:
-            stop = True
-            if computerScore > playerScore:
+        if game.stateChanged and game.state == GAMEOVER:
+            if game.winner() == 'computer':
                 print('Game over, computer wins...')
             else:
                 print('Game over, player wins!!!')
+        elif game.state == DONE:
+            stop = True
+
+    if scheduler is not None:
+        scheduler.report()
 
 finally:
-    f.close()
     cv2.destroyAllWindows()
     cam.close()
@@ -26,20 +26,29 @@
 # This file is the main program to run to play the Rock-Paper-Scissors game
 # with the pygame graphical user interface (GUI).
 
-import pickle
-import random
-import sys
 import time
+# Start time of the program, used to report the startup times
+tStart = time.time()
 
-import pygame as pg
-import pygame.locals
+import sys
 
 import numpy as np
+from rpscv import utils
+startup = utils.StageTimer(tStart)
+startup.mark('import numpy, rpscv.utils')
+
 import cv2
+startup.mark('import cv2')
+
+import pygame as pg
+import pygame.locals
+startup.mark('import pygame')
 
-from rpscv import utils
 from rpscv import imgproc as imp
+from rpscv.game import RPSGame, PRIVACY, PLAY, GAMEOVER, DONE
 from rpscv.gui import RPSGUI
+from rpscv.model import ModelRegistry
+startup.mark('import rpscv')
 
 def saveImage(img, gesture, notify=False):
 
@@ -58,12 +67,18 @@ if __name__ == '__main__':
     """Launches the Rock-Paper-Scissors game with a graphical interface
     Command line arguments:
         privacy: will display the privacy notice at beginning of game
-        loop: will launch a new game once current game is over."""
+        loop: will launch a new game once current game is over,
+        fps=<n>: target frame rate of the game loop (0 to run as fast as
+        possible)."""
 
     try:
         # Initialize game mode variables
         privacy = False
         loop = False
+        frameRate = utils.loopFrameRate
+        registry = None
+        cam = None
+        scheduler = None
 
         # Read command line arguments
         argv = sys.argv
@@ -75,119 +90,143 @@ if __name__ == '__main__':
                     privacy = True
                 elif arg == 'loop':
                     loop = True
+                elif arg.startswith('fps='):
+                    frameRate = float(arg.split('=', 1)[1])
                 else:
                     print('{} is not a recognized argument'.format(arg))
 
-        # Load classifier from pickle file
-        filename = 'clf.pkl'
-        with open(filename, 'rb') as f:
-            clf = pickle.load(f)
+        # Load and warm up classifier from pickle file in background while
+        # the camera and GUI are initialized. The registry keeps watching the
+        # file and swaps in new versions of the classifier as they are saved.
+        registry = ModelRegistry('clf.pkl')
+        clf = None
 
         # Create camera object with pre-defined settings
         cam = utils.cameraSetup()
+        startup.mark('camera setup')
 
-        # Initialize last gesture value
-        lastGesture = -1
+        # Read or calibrate the background removal parameters
+        hueValue, threshold = utils.backgroundSetup(cam)
+        startup.mark('background setup')
 
-        # Define score at which game ends
-        endScore = 5
+        # Initialize game state machine
+        game = RPSGame(endScore=5, privacy=privacy, loop=loop)
 
         # Initialize GUI
-        gui = RPSGUI(privacy=privacy, loop=loop)
-
-        # Load static images for computer gestures
-        coImgs = {}
-        img = cv2.imread('img/gui/rock.png', cv2.IMREAD_COLOR)
-        coImgs[utils.ROCK] = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img = cv2.imread('img/gui/paper.png', cv2.IMREAD_COLOR)
-        coImgs[utils.PAPER] = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img = cv2.imread('img/gui/scissors.png',
-                         cv2.IMREAD_COLOR)
-        coImgs[utils.SCISSORS] = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        gui = RPSGUI(game)
+
+        # Load static images for computer gestures and cache them in the GUI
+        for gesture in [utils.ROCK, utils.PAPER, utils.SCISSORS]:
+            img = cv2.imread('img/gui/{}.png'.format(utils.gestureTxt[gesture]),
+                             cv2.IMREAD_COLOR)
+            gui.addCoImg(gesture, cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
 
         # Load green image
         greenImg = cv2.imread('img/gui/green.png', cv2.IMREAD_COLOR)
-        greenImg = cv2.cvtColor(greenImg, cv2.COLOR_BGR2RGB)
+        gui.addCoImg('green', cv2.cvtColor(greenImg, cv2.COLOR_BGR2RGB))
+        startup.mark('GUI setup')
+
+        # Feature vector buffer, reused at each frame
+        gray = np.empty(200 * 300, dtype=np.float32)
+
+        # Frame pacing of the main loop
+        if frameRate > 0:
+            scheduler = utils.RateScheduler(frameRate)
 
         while True:
 
+            # Wait for the next frame deadline
+            if scheduler is not None:
+                scheduler.wait()
+
             # Get image from camera
             img = imp.crop(cam.getOpenCVImage())
 
-            # Convert image to RGB (from BGR)
-            imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-            # Set player image to imgRGB
-            gui.setPlImg(imgRGB)
+            # Set player image to img (converted from BGR while copying)
+            gui.setPlImg(img, bgr=True)
 
-            # Get grayscale image
-            gray = imp.getGray(imgRGB, threshold=17)
+            # Get grayscale image directly from the BGR image
+            imp.getGrayBGR(img, hueValue, threshold, out=gray)
 
             # Count non-background pixels
             nonZero = np.count_nonzero(gray)
 
-            # Define waiting time
-            waitTime = 0
-
             # Parameters for saving new images
             gesture = None
             notify = False
 
-            # Check if player hand is present
-            if nonZero > 9000:
+            # Get active classifier. The privacy notice (if enabled) is
+            # displayed while the first classifier is loading. The game exits
+            # if the first classifier cannot be loaded.
+            if clf is None:
+                try:
+                    clf = registry.getClassifier(block=False)
+                except Exception as e:
+                    print('ERROR: Classifier could not be loaded: {}'.format(e))
+                    gui.quit()
+                if clf is not None:
+                    startup.mark('wait for classifier')
+                    startup.report()
+                    registry.printTimes()
+            else:
+                clf = registry.getClassifier(block=False)
 
-                # Predict gesture
+            # Predict gesture if player hand is present. Prediction continues
+            # during the game pauses so the next round is ready when they end.
+            predGesture = None
+            if nonZero > 9000 and clf is not None:
                 predGesture = clf.predict([gray])[0]
 
-                if predGesture == lastGesture:
-                    successive += 1
-                else:
-                    successive = 0
-
-                if successive == 2:
-                    print('Player: {}'.format(utils.gestureTxt[predGesture]))
-                    waitTime = 3000
-                    gesture = predGesture
-
-                    # Computer gesture
-                    computerGesture = random.randint(0,2)
-                    print('Computer: {}'.format(utils.gestureTxt[computerGesture]))
-
-                    # Set computer image to computer gesture
-                    gui.setCoImg(coImgs[computerGesture])
-
-                    diff = computerGesture - predGesture
-                    if diff in [-2, 1]:
-                        print('Computer wins!')
-                        gui.setWinner('computer')
-                    elif diff in [-1, 2]:
-                        print('Player wins!')
-                        gui.setWinner('player')
-                    else:
-                        print('Tie')
-                        gui.setWinner('tie')
-                    print('Score: player {}, computer {}\n'.format(gui.plScore,
-                                                                 gui.coScore))
+            # Update game state
+            rnd = game.update(predGesture)
 
-                lastGesture = predGesture
+            if rnd is not None:
+                print('Player: {}'.format(utils.gestureTxt[rnd.player]))
+                print('Computer: {}'.format(utils.gestureTxt[rnd.computer]))
+                gesture = rnd.player
 
-            else:
+                # Set computer image to computer gesture
+                gui.setCoImg(rnd.computer)
 
-                lastGesture = -1
+                if rnd.winner == 'computer':
+                    print('Computer wins!')
+                elif rnd.winner == 'player':
+                    print('Player wins!')
+                else:
+                    print('Tie')
+                gui.setWinner(rnd.winner)
+                print('Score: player {}, computer {}\n'.format(game.plScore,
+                                                             game.coScore))
 
+            elif predGesture is None and game.state == PLAY:
                 # Set computer image to green
-                gui.setCoImg(greenImg)
+                gui.setCoImg('green')
                 gui.setWinner()
 
+            if game.stateChanged:
+                if game.state == GAMEOVER:
+                    if game.winner() == 'computer':
+                        print('Game over, computer wins...\n')
+                    else:
+                        print('Game over, player wins!!!\n')
+                elif game.state == DONE:
+                    gui.quit()
+                elif game.previousState == GAMEOVER:
+                    # New game (loop mode)
+                    gui.reset()
+                    gui.setCoImg('green')
+
             # Draw GUI
-            gui.draw()
+            if game.state == PRIVACY:
+                gui.showPrivacyNote()
+            else:
+                gui.draw()
+                if game.state == GAMEOVER:
+                    gui.gameOver()
 
             # Flip pygame display
             pg.display.flip()
 
-            # Wait
-            pg.time.wait(waitTime)
-
             if gesture is not None:
                 # Save new image
                 saveImage(img, gesture, notify)
@@ -196,16 +235,20 @@ if __name__ == '__main__':
             for event in pg.event.get():
                 if event.type == pg.locals.QUIT:
                     gui.quit()
-
-            # Check if scores reach endScore (end of game)
-            if gui.plScore == endScore or gui.coScore == endScore:
-                if gui.coScore > gui.plScore:
-                    print('Game over, computer wins...\n')
-                else:
-                    print('Game over, player wins!!!\n')
-                gui.gameOver()
-
+                elif event.type == pg.locals.KEYDOWN and \
+                        event.key == pg.locals.K_b:
+                    # Recalibrate background (remove hand first)
+                    hueValue, threshold = utils.doBackgroundCalibration(cam)
+                elif event.type == pg.locals.KEYDOWN and \
+                        event.key == pg.locals.K_r:
+                    # Roll back to the previous classifier
+                    if not registry.rollback():
+                        print('No previous classifier to roll back to')
 
     finally:
-        f.close()
-        cam.close()
+        if registry is not None:
+            registry.stop()
+        if cam is not None:
+            cam.close()
+        if scheduler is not None:
+            scheduler.report()
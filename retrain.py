@@ -0,0 +1,166 @@
+# retrain.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This script runs a low priority background trainer. It watches the raw image
+# folders for new images (such as the ones saved by play.py and playgui.py),
+# generates the features of the new images only and refits the current
+# classifier configuration on all images, without grid search. The new
+# classifier is written to the classifier file, where it is picked up by a
+# running playgui.py, only if its score on the held-out test images does not
+# regress compared to the current classifier. The held-out test images are the
+# ones recorded by train.py when the classifier was trained (clf-split.json),
+# so that neither classifier was trained on them; the new images are added to
+# the training images.
+
+import os
+import sys
+
+# Settings:
+
+# Number of CPU threads used by the numerical libraries. Must be set before
+# numpy is imported to be taken into account.
+nbThreads = 1
+for var in ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']:
+    os.environ.setdefault(var, str(nbThreads))
+
+import time
+
+import numpy as np
+
+import train
+from rpscv import imgproc as imp
+from rpscv.features import loadCache, saveCache, updateFeatures
+
+# Classifier .pkl filename (shared with train.py)
+pklFilename = train.pklFilename
+
+# Time in seconds between checks for new images
+interval = 60
+
+# Minimum number of new images to trigger retraining
+minNewImages = 10
+
+# Maximum decrease of the test set score accepted for a new classifier
+tolerance = 0.
+
+# Process niceness (19 = lowest priority) and CPU cores the trainer is allowed
+# to run on (None = all cores). Restricting the trainer to one core and the
+# lowest priority ensures a game running on the same device is never starved.
+niceness = 19
+cpus = None
+
+def getKnownFiles(files):
+    """Returns the set of the image filenames the current classifier was
+    trained or tested on, recorded when it was written (see
+    rpscv.features.saveTestFiles()). If the training images are not recorded
+    (classifier written by an earlier version), all the images of files are
+    considered known."""
+    from rpscv.features import loadTestFiles, loadTrainFiles
+
+    trainFiles = loadTrainFiles(pklFilename)
+    if trainFiles is None:
+        return set(files)
+    return set(trainFiles) | set(loadTestFiles(pklFilename))
+
+def retrain(files, labels, grays):
+    """Refits the configuration of the current classifier on the training
+    images and writes it to the classifier file if its score on the held-out
+    test images of the current classifier (see train.splitHeldOut()) does not
+    regress. The held-out test images are recorded again with the new
+    classifier. Returns True if a new classifier was written."""
+    from sklearn.base import clone
+    from sklearn.metrics import f1_score
+
+    from rpscv.features import saveTestFiles
+    from rpscv.model import getPipeline, loadClassifier, saveClassifier
+
+    current = getPipeline(loadClassifier(pklFilename))
+
+    train_index, test_index = train.splitHeldOut(files, labels)
+    features_train = grays[train_index].astype(np.float32) / 255
+    features_test = grays[test_index].astype(np.float32) / 255
+    labels_train, labels_test = labels[train_index], labels[test_index]
+
+    t0 = time.time()
+    clf = clone(current)
+    clf.fit(features_train, labels_train)
+    print('Classifier refitted in {:.1f}s'.format(time.time() - t0))
+
+    # If the current classifier has no record of its held-out images, it may
+    # have been trained on some of the test images so its score is
+    # optimistic, making this comparison conservative.
+    newScore = f1_score(labels_test, clf.predict(features_test),
+                        average='micro')
+    currentScore = f1_score(labels_test, current.predict(features_test),
+                            average='micro')
+    print('Test set score: new {:.4f}, current {:.4f}'.format(newScore,
+                                                               currentScore))
+
+    if newScore >= currentScore - tolerance:
+        saveClassifier(clf, pklFilename)
+        saveTestFiles(pklFilename, [files[i] for i in test_index],
+                      [files[i] for i in train_index])
+        print('New classifier written to {}'.format(pklFilename))
+        return True
+    else:
+        print('Score regression, new classifier discarded')
+        return False
+
+if __name__ == '__main__':
+
+    # Lower process priority and restrict CPU cores
+    os.nice(niceness)
+    if cpus is not None:
+        os.sched_setaffinity(0, cpus)
+
+    # Read command line arguments
+    once = '--once' in sys.argv[1:]
+
+    bgParams = None
+    known = None
+    while True:
+        # The features are regenerated when the background is recalibrated
+        if imp.getBackgroundParams() != bgParams:
+            bgParams = imp.getBackgroundParams()
+            files, labels, grays = loadCache(bgParams=bgParams)
+        files, labels, grays, nbNew = updateFeatures(files, labels, grays,
+                                                     bgParams)
+        if nbNew > 0:
+            print('Features of {} images generated, {} images in '
+                  'total'.format(nbNew, len(files)))
+            saveCache(files, labels, grays, bgParams)
+        # Only the images the current classifier was neither trained nor
+        # tested on are new, so that regenerating the features (first run or
+        # recalibration) does not trigger a retraining
+        if known is None:
+            known = getKnownFiles(files)
+        pending = len(set(files) - known)
+        if pending >= minNewImages or (once and pending > 0):
+            print('{} new images'.format(pending))
+            retrain(files, labels, grays)
+            known = set(files)
+        if once:
+            break
+        time.sleep(interval)
@@ -0,0 +1,119 @@
+# augment.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines the AugmentedStream class, which generates batches of
+# features of randomly transformed (augmented) training images on demand, so
+# that training can use many augmented samples without storing them.
+
+import numpy as np
+
+from rpscv import imgproc as imp
+
+def augmentImage(img, rand, flip=True, maxAngle=10, maxBrightness=.2):
+    """Returns a randomly transformed copy of the RGB image: horizontal flip
+    (with probability .5 if flip is True), rotation of up to maxAngle degrees
+    about the image center and brightness scaling by up to +/- maxBrightness.
+    rand is the numpy RandomState drawing the transformation parameters. The
+    image borders are replicated so that the background remains green."""
+    import cv2
+
+    if flip and rand.rand() < .5:
+        img = img[:, ::-1]
+    angle = rand.uniform(-maxAngle, maxAngle)
+    scale = 1 + rand.uniform(-maxBrightness, maxBrightness)
+    rows, cols = img.shape[:2]
+    M = cv2.getRotationMatrix2D((cols / 2, rows / 2), angle, 1)
+    img = cv2.warpAffine(np.ascontiguousarray(img), M, (cols, rows),
+                         borderMode=cv2.BORDER_REPLICATE)
+    # Scaling saturated to the uint8 range
+    return cv2.convertScaleAbs(img, alpha=scale)
+
+class AugmentedStream():
+
+    def __init__(self, images, labels, indices=None, nbCopies=1,
+                 original=True, batchSize=256, rs=42, bgParams=None,
+                 **augmentation):
+        """An iterable over batches of features of augmented images. The
+        images are read and transformed only when their batch is generated,
+        so memory use is bounded by batchSize whatever the number of copies.
+        images: sequence of RGB images (e.g. the memory-mapped images of a
+        PackedDataset) or of image filenames,
+        labels: labels of the images,
+        indices: indices of the images to use (default all),
+        nbCopies: number of augmented copies of each image,
+        original: if True, the original images are also generated,
+        batchSize: maximum number of feature vectors per batch,
+        rs: random state. The transformation of each copy of each image is
+        drawn from its own seed (rs, copy, image index) so the stream is
+        identical at each iteration and whatever the batch size,
+        bgParams: background hue value and threshold of the features, read by
+        imgproc.getBackgroundParams() if not specified,
+        augmentation: keyword arguments of augmentImage()."""
+        self.images = images
+        self.labels = np.asarray(labels)
+        if indices is None:
+            indices = np.arange(len(self.labels))
+        self.indices = np.asarray(indices)
+        self.nbCopies = nbCopies
+        self.original = original
+        self.batchSize = batchSize
+        self.rs = rs
+        if bgParams is None:
+            bgParams = imp.getBackgroundParams()
+        self.bgParams = bgParams
+        self.augmentation = augmentation
+
+    def __iter__(self):
+        """Yields (features, labels, indices) tuples of batches of feature
+        vectors with their labels and source image indices. Each pass
+        generates the original images (if original is True) then each
+        augmented copy. Batches of a pass have similar sizes."""
+        nbBatches = max(1, int(np.ceil(len(self.indices) / self.batchSize)))
+        copies = range(0 if self.original else 1, self.nbCopies + 1)
+        for copy in copies:
+            for batch in np.array_split(self.indices, nbBatches):
+                if len(batch) == 0:
+                    continue
+                features = None
+                for i, index in enumerate(batch):
+                    img = self.getImage(index)
+                    if copy > 0:
+                        rand = np.random.RandomState([self.rs, copy, index])
+                        img = augmentImage(img, rand, **self.augmentation)
+                    if features is None:
+                        features = np.empty((len(batch), img.shape[0]
+                                             * img.shape[1]), dtype=np.float32)
+                    features[i] = imp.getGray(img, *self.bgParams)
+                yield features, self.labels[batch], batch
+
+    def __len__(self):
+        return len(self.indices) * (self.nbCopies + int(self.original))
+
+    def getImage(self, index):
+        """Returns the RGB source image of index."""
+        img = self.images[index]
+        if isinstance(img, str):
+            img = imp.decodeImage(img)
+        return img
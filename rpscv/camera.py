@@ -25,6 +25,8 @@
 
 # This module defines the Camera class, a wrapper for the Raspberry Pi camera
 # based on the picamera library to be used with OpenCV computer vision library.
+# The rpscv.mockcamera module can be used in place of the picamera library to
+# run the Camera class without a Raspberry Pi.
 
 import time
 
@@ -36,11 +38,21 @@ from rpscv.utils import Filter1D, Timer
 
 class Camera():
 
-    def __init__(self, size=10, frameRate=40, hflip=False, vflip=False):
+    def __init__(self, size=10, frameRate=40, hflip=False, vflip=False,
+                 roi=None, picamera=None):
         """A wrapper class for the Raspberry Pi camera using the picamera
         python library. The size parameter sets the camera resolution to
-        size * (64, 48)."""
-        from picamera import PiCamera, PiCameraCircularIO
+        size * (64, 48).
+        roi: region of interest (top, left, height, width) of the frame to
+        capture, e.g. rpscv.imgproc.cropWindow. If specified, the camera zoom
+        is set to the region and the frames are resized to the region
+        dimensions by the camera so that getOpenCVImage() transfers and
+        returns only the pixels of the region,
+        picamera: module providing the PiCamera and PiCameraCircularIO
+        classes, the picamera library if not specified (see
+        rpscv.mockcamera)."""
+        if picamera is None:
+            import picamera
         self.active = False
         try:
             if type(size) is not int:
@@ -53,13 +65,14 @@ class Camera():
                 raise ValueError("Size must be in range 1 to 51")
         except TypeError or ValueError:
             raise
-        self.picam = PiCamera()
+        self.picam = picamera.PiCamera()
         self.picam.resolution = (self.hRes, self.vRes)
+        self.setRoi(roi)
         self.picam.framerate = frameRate
         self.picam.hflip = hflip
         self.picam.vflip = vflip
         time.sleep(1)
-        self.stream = PiCameraCircularIO(self.picam, seconds=1)
+        self.stream = picamera.PiCameraCircularIO(self.picam, seconds=1)
         self.frameRateTimer = Timer()
         self.frameRateFilter = Filter1D(maxSize=21)
         self.start()
@@ -120,11 +133,23 @@ class Camera():
         # Add text to image
         cv2.putText(img, frString, pos, cv2.FONT_HERSHEY_DUPLEX, 1, bgr)
 
+    def getFrameBytes(self):
+        """Returns the number of bytes transferred from the camera per frame
+        by getOpenCVImage()."""
+        return int(np.prod(self.bufferShape))
+
     def getOpenCVImage(self):
-        """Grabs a frame from the camera and returns an OpenCV image array."""
-        img = np.empty((self.vRes * self.hRes * 3), dtype=np.uint8)
-        self.picam.capture(img, 'bgr', use_video_port=True)
-        return img.reshape((self.vRes, self.hRes, 3))
+        """Grabs a frame from the camera and returns an OpenCV image array of
+        the whole frame or of the region of interest if set."""
+        img = np.empty(self.getFrameBytes(), dtype=np.uint8)
+        if self.roi is None:
+            self.picam.capture(img, 'bgr', use_video_port=True)
+            return img.reshape(self.bufferShape)
+        top, left, height, width = self.roi
+        self.picam.capture(img, 'bgr', use_video_port=True,
+                           resize=(width, height))
+        # Remove the padding of the camera buffer
+        return img.reshape(self.bufferShape)[:height, :width]
 
     def readWhiteBalance(self, awbFilename='awb_gains.txt'):
         """Reads white balance gains from a file created using the
@@ -141,6 +166,31 @@ class Camera():
         self.picam.awb_gains = gRed, gBlue
         print('AWB gains set to:', gRed, gBlue)
 
+    def setRoi(self, roi):
+        """Sets the region of interest (top, left, height, width) of the frames
+        captured by getOpenCVImage(), or the whole frame if roi is None. The
+        region is applied by the camera zoom, in fractions of the frame. The
+        camera applies the hflip and vflip settings before the zoom (the
+        sensor is read out flipped), so the region is in the coordinates of
+        the flipped frame, as the crop of the full frame by
+        imgproc.crop()."""
+        if roi is None:
+            self.roi = None
+            self.picam.zoom = (0., 0., 1., 1.)
+            self.bufferShape = (self.vRes, self.hRes, 3)
+            return
+        top, left, height, width = roi
+        if (min(roi) < 0 or height == 0 or width == 0
+                or top + height > self.vRes or left + width > self.hRes):
+            raise ValueError('Region of interest must be within the {}x{} '
+                             'frame'.format(self.hRes, self.vRes))
+        self.roi = tuple(roi)
+        self.picam.zoom = (left / self.hRes, top / self.vRes,
+                           width / self.hRes, height / self.vRes)
+        # The camera pads the resized frames to a multiple of 32 columns and
+        # 16 rows
+        self.bufferShape = (-(-height // 16) * 16, -(-width // 32) * 32, 3)
+
     def start(self):
         """Starts continuous recording of the camera into a PicameraCircularIO
         buffer."""
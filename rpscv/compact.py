@@ -0,0 +1,219 @@
+# compact.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines the CompactClassifier class, a standalone predictor for
+# trained PCA + RBF SVC pipelines storing the model parameters in reduced
+# precision (float16 or int8) to reduce memory bandwidth and model size.
+
+import copy
+
+import numpy as np
+
+from rpscv.model import getPipeline
+
+def agreement(clf1, clf2, features, batchSize=256):
+    """Returns the fraction of the feature vectors for which the two
+    classifiers predict the same gesture."""
+    same = 0
+    for start in range(0, len(features), batchSize):
+        batch = features[start:start + batchSize]
+        same += np.count_nonzero(clf1.predict(batch) == clf2.predict(batch))
+    return same / len(features)
+
+def dequantize(values, scales):
+    """Returns the float32 values of an array quantized by quantize()."""
+    values = values.astype(np.float32)
+    if scales is not None:
+        values *= scales
+    return values
+
+def pruneSupportVectors(compact, radius):
+    """Returns a copy of the CompactClassifier with near-duplicate support
+    vectors merged. Within each class, support vectors closer than radius (in
+    PCA space) to a larger weight support vector are merged into it: the
+    merged vector is the weighted mean of the vectors and its dual
+    coefficients are the sum of their coefficients. For the RBF kernel this
+    approximates the decision function when the merged vectors are close."""
+    sv = dequantize(compact.supportVectors, compact.svScales)
+    weights = np.abs(compact.dualCoef).sum(axis=0)
+    start = np.concatenate([[0], np.cumsum(compact.nSupport)])
+    newSv = []
+    newCoef = []
+    nSupport = []
+    for c in range(len(compact.nSupport)):
+        idx = np.arange(start[c], start[c + 1])
+        # Visit support vectors by decreasing weight
+        idx = idx[np.argsort(-weights[idx], kind='stable')]
+        assigned = np.zeros(len(idx), dtype=bool)
+        count = 0
+        for i in range(len(idx)):
+            if assigned[i]:
+                continue
+            dist = np.sqrt(((sv[idx] - sv[idx[i]]) ** 2).sum(axis=1))
+            group = ~assigned & (dist < radius)
+            group[i] = True
+            assigned |= group
+            members = idx[group]
+            w = weights[members]
+            if w.sum() > 0:
+                newSv.append((sv[members] * w[:, np.newaxis]).sum(axis=0)
+                             / w.sum())
+            else:
+                newSv.append(sv[members].mean(axis=0))
+            newCoef.append(compact.dualCoef[:, members].sum(axis=1))
+            count += 1
+        nSupport.append(count)
+
+    pruned = copy.copy(compact)
+    pruned.supportVectors, pruned.svScales = quantize(np.array(newSv),
+                                                      compact.dtype)
+    pruned.dualCoef = np.array(newCoef, dtype=np.float32).T
+    pruned.nSupport = np.array(nSupport)
+    return pruned
+
+def quantize(values, dtype):
+    """Returns values (2D array) converted to dtype ('float32', 'float16' or
+    'int8') and the per column scales (None for float types). int8 values are
+    scaled so that the maximum absolute value of each column maps to 127."""
+    if dtype in ['float32', 'float16']:
+        return values.astype(dtype), None
+    elif dtype == 'int8':
+        scales = np.abs(values).max(axis=0) / 127
+        scales[scales == 0] = 1
+        return (np.rint(values / scales).astype(np.int8),
+                scales.astype(np.float32))
+    else:
+        raise ValueError("dtype must be 'float32', 'float16' or 'int8'")
+
+class CompactClassifier():
+
+    def __init__(self, clf, dtype='float16', blockSize=2048):
+        """A predictor for trained PCA + RBF kernel SVC pipelines storing the
+        PCA components and the SVC support vectors in reduced precision.
+        clf: trained classifier pipeline (e.g. loaded from clf.pkl),
+        dtype: storage type of the parameters, 'float32', 'float16' or 'int8'
+        (with per component scales),
+        blockSize: number of features projected at once. The components are
+        converted to float32 one cache-sized block at a time so that only the
+        reduced precision matrix is read from memory."""
+        pipe = getPipeline(clf)
+        pca = pipe.named_steps['pca']
+        svc = pipe.named_steps['clf']
+        if getattr(svc, 'kernel', None) != 'rbf':
+            raise ValueError('Only PCA + RBF kernel SVC pipelines are supported')
+        self.dtype = dtype
+        self.blockSize = blockSize
+
+        # Components are stored transposed (features x components) so that
+        # each block of features is contiguous in memory
+        components = pca.components_.T.astype(np.float64)
+        if pca.whiten:
+            components /= np.sqrt(pca.explained_variance_)
+        self.components, self.componentScales = quantize(components, dtype)
+        # Projection of the mean, subtracted after the projection to avoid
+        # centering the (large) feature vectors. Computed from the quantized
+        # components for consistency.
+        self.meanProj = pca.mean_.astype(np.float32).dot(
+            dequantize(self.components, self.componentScales))
+
+        self.supportVectors, self.svScales = quantize(svc.support_vectors_,
+                                                      dtype)
+        self.dualCoef = svc.dual_coef_.astype(np.float32)
+        self.intercept = svc.intercept_.astype(np.float32)
+        self.gamma = np.float32(svc._gamma)
+        self.nSupport = np.asarray(svc.n_support_)
+        self.classes = svc.classes_
+
+    def decisionFunction(self, features):
+        """Returns the one-vs-one decision function values of the feature
+        vectors, in the same order as the SVC decision_function() with
+        decision_function_shape='ovo'."""
+        return self.kernelDecision(self.project(features))
+
+    def getNbSupportVectors(self):
+        """Returns the number of support vectors."""
+        return int(self.nSupport.sum())
+
+    def getNbytes(self):
+        """Returns the size in bytes of the model parameters."""
+        arrays = [self.components, self.componentScales, self.meanProj,
+                  self.supportVectors, self.svScales, self.dualCoef,
+                  self.intercept]
+        return sum([a.nbytes for a in arrays if a is not None])
+
+    def kernelDecision(self, proj):
+        """Returns the one-vs-one decision function values of feature vectors
+        already projected on the PCA components."""
+        sv = dequantize(self.supportVectors, self.svScales)
+        sqDist = ((proj ** 2).sum(axis=1)[:, np.newaxis]
+                  - 2 * proj.dot(sv.T) + (sv ** 2).sum(axis=1))
+        kernel = np.exp(-self.gamma * np.maximum(sqDist, 0))
+        start = np.concatenate([[0], np.cumsum(self.nSupport)])
+        nbClasses = len(self.classes)
+        dec = []
+        p = 0
+        for i in range(nbClasses):
+            si = slice(start[i], start[i + 1])
+            for j in range(i + 1, nbClasses):
+                sj = slice(start[j], start[j + 1])
+                dec.append(kernel[:, si].dot(self.dualCoef[j - 1, si])
+                           + kernel[:, sj].dot(self.dualCoef[i, sj])
+                           + self.intercept[p])
+                p += 1
+        return np.array(dec).T
+
+    def predict(self, features):
+        """Returns the predicted gestures of the feature vectors by one-vs-one
+        voting, ties being won by the lowest class as in libsvm."""
+        dec = self.decisionFunction(features)
+        nbClasses = len(self.classes)
+        votes = np.zeros((dec.shape[0], nbClasses), dtype=int)
+        p = 0
+        for i in range(nbClasses):
+            for j in range(i + 1, nbClasses):
+                positive = dec[:, p] > 0
+                votes[positive, i] += 1
+                votes[~positive, j] += 1
+                p += 1
+        return self.classes[votes.argmax(axis=1)]
+
+    def project(self, features):
+        """Returns the feature vectors projected on the PCA components. The
+        reduced precision components are converted to float32 block by
+        block."""
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features[np.newaxis, :]
+        proj = np.zeros((features.shape[0], self.components.shape[1]),
+                        dtype=np.float32)
+        for start in range(0, features.shape[1], self.blockSize):
+            end = start + self.blockSize
+            block = self.components[start:end]
+            if block.dtype != np.float32:
+                block = block.astype(np.float32)
+            proj += features[:, start:end].dot(block)
+        if self.componentScales is not None:
+            proj *= self.componentScales
+        return proj - self.meanProj
@@ -0,0 +1,176 @@
+# dataset.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines the PackedDataset class, a single file storage of the
+# labeled images as a memory-mappable uint8 array with a label and metadata
+# index, to read the image dataset without per file overhead and decoding.
+
+import json
+import os
+
+import numpy as np
+
+from rpscv import utils
+
+# Default packed dataset filename (without extension). The images are stored in
+# the .u8 file and the index in the .json file.
+packFilename = 'img/dataset'
+
+class PackedDataset():
+
+    def __init__(self, filename=packFilename, imshape=(200, 300, 3)):
+        """A packed image dataset. The RGB images are stored back to back as
+        raw uint8 values in the <filename>.u8 file, which can be memory-mapped
+        and read sequentially without decoding. The <filename>.json index
+        stores the image shape, the number of images and the labels and
+        source filenames of the images. Images are added with the .append()
+        method. If the index exists, imshape is read from it."""
+        self.dataFilename = filename + '.u8'
+        self.indexFilename = filename + '.json'
+        self.imshape = tuple(imshape)
+        self.files = []
+        self.labels = []
+        self.nbRemoved = 0
+        if os.path.exists(self.indexFilename):
+            with open(self.indexFilename, 'r') as f:
+                index = json.load(f)
+            self.imshape = tuple(index['shape'])
+            self.files = index['files']
+            self.labels = index['labels']
+
+    def __len__(self):
+        return len(self.labels)
+
+    def append(self, images, labels, files):
+        """Appends the images (sequence of RGB uint8 arrays of shape imshape)
+        with their labels and source filenames. The image data is written
+        before the index so that an interrupted append leaves the dataset
+        unchanged."""
+        imsize = int(np.prod(self.imshape))
+        with open(self.dataFilename, 'ab') as f:
+            # Discard data left by an interrupted append
+            f.truncate(len(self) * imsize)
+            for img in images:
+                if img.shape != self.imshape or img.dtype != np.uint8:
+                    raise ValueError('Images must be uint8 arrays of shape '
+                                     '{}'.format(self.imshape))
+                f.write(np.ascontiguousarray(img).tobytes())
+        self.files = self.files + list(files)
+        self.labels = self.labels + [int(l) for l in labels]
+        self.writeIndex()
+
+    def getImages(self):
+        """Returns a read-only memory-mapped array of all images."""
+        if len(self) == 0:
+            return np.empty((0,) + self.imshape, dtype=np.uint8)
+        return np.memmap(self.dataFilename, dtype=np.uint8, mode='r',
+                         shape=(len(self),) + self.imshape)
+
+    def getLabels(self):
+        """Returns the image labels as a numpy array."""
+        return np.array(self.labels, dtype=int)
+
+    def iterChunks(self, chunkSize=256, indices=None):
+        """Yields (indices, images) tuples of consecutive chunks of up to
+        chunkSize images. If indices is specified, only these images are
+        read, in the order given."""
+        images = self.getImages()
+        if indices is None:
+            indices = np.arange(len(self))
+        for start in range(0, len(indices), chunkSize):
+            chunk = indices[start:start + chunkSize]
+            if len(chunk) > 0 and chunk[-1] - chunk[0] == len(chunk) - 1:
+                # Contiguous chunk, read as a single sequential slice
+                yield chunk, images[chunk[0]:chunk[-1] + 1]
+            else:
+                yield chunk, images[chunk]
+
+    def pack(self, chunkSize=64, verbose=False):
+        """Removes the images that are no longer in the raw image folder of
+        their label (deleted or moved to another gesture folder), then appends
+        the images of the raw image folders that are not yet in the dataset,
+        by chunks of chunkSize images. Returns the number of images added. The
+        number of images removed is kept in the nbRemoved attribute."""
+        import cv2
+
+        from rpscv import imgproc as imp
+
+        current = {}
+        for gesture in utils.gestureTxt:
+            for imageFile in imp.getImageFiles(gesture):
+                current[imageFile] = gesture
+        keep = np.array([current.get(f) == l for f, l in
+                         zip(self.files, self.labels)], dtype=bool)
+        self.nbRemoved = len(self) - int(np.count_nonzero(keep))
+        if self.nbRemoved > 0:
+            self.remove(keep, chunkSize)
+
+        known = set(self.files)
+        images = []
+        labels = []
+        files = []
+        nbAdded = 0
+        for gesture in utils.gestureTxt:
+            for imageFile in imp.getImageFiles(gesture):
+                if imageFile in known:
+                    continue
+                img = cv2.imread(imageFile, cv2.IMREAD_COLOR)
+                if img is None or img.shape != self.imshape:
+                    print('Image {} is invalid, skipping image.'.format(
+                        imageFile))
+                    continue
+                if verbose:
+                    print('Packing image {}'.format(imageFile))
+                images.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+                labels.append(gesture)
+                files.append(imageFile)
+                if len(images) == chunkSize:
+                    self.append(images, labels, files)
+                    nbAdded += len(images)
+                    images, labels, files = [], [], []
+        if len(images) > 0:
+            self.append(images, labels, files)
+            nbAdded += len(images)
+        return nbAdded
+
+    def remove(self, keep, chunkSize=64):
+        """Removes the images whose keep mask value is False. The kept images
+        are copied by chunks of chunkSize images to a new data file which
+        replaces the data file (see utils.atomicWrite()), then the index is
+        written."""
+        indices = np.flatnonzero(keep)
+        with utils.atomicWrite(self.dataFilename, 'wb') as f:
+            for chunk, images in self.iterChunks(chunkSize, indices):
+                f.write(np.ascontiguousarray(images).tobytes())
+        self.files = [self.files[i] for i in indices]
+        self.labels = [self.labels[i] for i in indices]
+        self.writeIndex()
+
+    def writeIndex(self):
+        """Writes the index file (see utils.atomicWrite())."""
+        index = {'shape': list(self.imshape), 'count': len(self),
+                 'labels': self.labels, 'files': self.files}
+        with utils.atomicWrite(self.indexFilename) as f:
+            json.dump(index, f)
@@ -0,0 +1,210 @@
+# dedup.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines the DuplicateIndex class, an incremental index of perceptual
+# hashes of the labeled images used to find near-duplicate images, such as the
+# successive captures of a player holding the same pose.
+
+import json
+import os
+
+import numpy as np
+
+from rpscv import utils
+
+# Default index filename
+indexFilename = 'img/hashes.json'
+
+# Number of bits set in each byte value
+_bitCounts = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def hammingDistance(hash, hashes):
+    """Returns the number of different bits between the hash and each of the
+    hashes (uint64 array)."""
+    diff = np.bitwise_xor(np.asarray(hashes, dtype=np.uint64), np.uint64(hash))
+    return _bitCounts[diff.reshape(-1, 1).view(np.uint8)].sum(axis=1)
+
+def imageHash(img, hashSize=8, bgParams=None):
+    """Returns the difference hash (dHash) of the RGB image as an integer of
+    hashSize * hashSize bits (at most 64). The grayscale image with its
+    background removed is reduced to hashSize rows of hashSize + 1 columns and
+    each bit tells if a pixel is brighter than its right neighbour. Small
+    changes in position or lighting of the hand change only a few bits.
+    bgParams are the background hue value and threshold
+    (imgproc.getBackgroundParams() if not specified)."""
+    import cv2
+
+    from rpscv import imgproc as imp
+
+    if bgParams is None:
+        bgParams = imp.getBackgroundParams()
+    gray = imp.getGray(img, *bgParams).reshape(img.shape[:2])
+    small = cv2.resize(gray, (hashSize + 1, hashSize),
+                       interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    weights = np.left_shift(np.uint64(1), np.arange(bits.size, dtype=np.uint64))
+    return int(weights[bits].sum())
+
+class DuplicateIndex():
+
+    def __init__(self, filename=indexFilename, maxDistance=4, capacity=1024,
+                 bgParams=None):
+        """An index of the perceptual hashes (see imageHash()) of labeled
+        images. Two images of the same gesture are near-duplicates if their
+        hashes differ by at most maxDistance bits. The hashes are stored in a
+        uint64 array so that a new image is compared to all indexed images of
+        its gesture in a single vectorized operation. The index is saved to
+        filename (JSON) and only the images not yet indexed are hashed by the
+        .update() method. The images are hashed with the background parameters
+        bgParams (imgproc.getBackgroundParams() if not specified); an index
+        file of other parameters is not loaded, so that it is regenerated."""
+        if bgParams is None:
+            from rpscv import imgproc as imp
+            bgParams = imp.getBackgroundParams()
+        self.filename = filename
+        self.maxDistance = maxDistance
+        self.bgParams = tuple(bgParams)
+        self.hashes = np.empty(capacity, dtype=np.uint64)
+        self.labels = np.empty(capacity, dtype=np.int8)
+        self.files = []
+        self.nbRemoved = 0
+        if filename is not None and os.path.exists(filename):
+            with open(filename, 'r') as f:
+                index = json.load(f)
+            if tuple(index.get('bgParams', ())) != self.bgParams:
+                print('Hash index {} was generated with other background '
+                      'parameters, regenerating it'.format(filename))
+                return
+            self.append([int(h, 16) for h in index['hashes']], index['labels'],
+                        index['files'])
+
+    def __len__(self):
+        return len(self.files)
+
+    def append(self, hashes, labels, files):
+        """Adds the hashes with their labels and image filenames. The storage
+        arrays are grown by doubling their size when full."""
+        n = len(files)
+        start = len(self)
+        if start + n > self.hashes.shape[0]:
+            capacity = max(2 * self.hashes.shape[0], start + n)
+            for name in ['hashes', 'labels']:
+                grown = np.empty(capacity, dtype=getattr(self, name).dtype)
+                grown[:start] = getattr(self, name)[:start]
+                setattr(self, name, grown)
+        self.hashes[start:start + n] = np.array(hashes, dtype=np.uint64)
+        self.labels[start:start + n] = labels
+        self.files += list(files)
+
+    def findDuplicates(self, img, gesture):
+        """Returns the filenames of the indexed images of the gesture that are
+        near-duplicates of the RGB image."""
+        return self.findHashDuplicates(imageHash(img,
+                                                 bgParams=self.bgParams),
+                                       gesture)
+
+    def findHashDuplicates(self, hash, gesture, end=None):
+        """Returns the filenames of the indexed images of the gesture (among
+        the first end images if specified) whose hash is within maxDistance
+        bits of hash."""
+        end = len(self) if end is None else end
+        dist = hammingDistance(hash, self.hashes[:end])
+        match = (dist <= self.maxDistance) & (self.labels[:end] == gesture)
+        return [self.files[i] for i in np.flatnonzero(match)]
+
+    def getDuplicates(self):
+        """Returns a dictionary mapping the filename of each near-duplicate
+        image to the filename of the first image (in index order) it
+        duplicates. Excluding the near-duplicates keeps one image of each
+        group."""
+        duplicates = {}
+        for gesture in utils.gestureTxt:
+            idx = np.flatnonzero(self.labels[:len(self)] == gesture)
+            hashes = self.hashes[idx]
+            kept = np.zeros(len(idx), dtype=bool)
+            for j in range(len(idx)):
+                keptIdx = idx[:j][kept[:j]]
+                dist = hammingDistance(hashes[j], hashes[:j][kept[:j]])
+                if dist.size > 0 and dist.min() <= self.maxDistance:
+                    duplicates[self.files[idx[j]]] = \
+                        self.files[keptIdx[dist.argmin()]]
+                else:
+                    kept[j] = True
+        return duplicates
+
+    def save(self):
+        """Writes the index file (see utils.atomicWrite())."""
+        index = {'bgParams': list(self.bgParams),
+                 'labels': self.labels[:len(self)].tolist(),
+                 'files': self.files,
+                 'hashes': ['{:016x}'.format(int(h))
+                            for h in self.hashes[:len(self)]]}
+        with utils.atomicWrite(self.filename) as f:
+            json.dump(index, f)
+
+    def update(self, verbose=False):
+        """Removes the images that are no longer in the raw image folder of
+        their label (deleted or moved to another gesture folder), hashes the
+        images of the raw image folders that are not yet in the index, adds
+        them and saves the index. Returns the number of images added. The
+        number of images removed is kept in the nbRemoved attribute."""
+        from rpscv import imgproc as imp
+
+        current = {}
+        for gesture in utils.gestureTxt:
+            for imageFile in imp.getImageFiles(gesture):
+                current[imageFile] = gesture
+        keep = np.array([current.get(f) == l for f, l in
+                         zip(self.files, self.labels[:len(self)])], dtype=bool)
+        n = int(np.count_nonzero(keep))
+        self.nbRemoved = len(self) - n
+        if self.nbRemoved > 0:
+            self.hashes[:n] = self.hashes[:len(self)][keep]
+            self.labels[:n] = self.labels[:len(self)][keep]
+            self.files = [f for f, k in zip(self.files, keep) if k]
+
+        known = set(self.files)
+        hashes = []
+        labels = []
+        files = []
+        for gesture in utils.gestureTxt:
+            for imageFile in imp.getImageFiles(gesture):
+                if imageFile in known:
+                    continue
+                if verbose:
+                    print('Hashing image {}'.format(imageFile))
+                try:
+                    img = imp.decodeImage(imageFile)
+                except IOError:
+                    print('Image {} is invalid, skipping image.'.format(
+                        imageFile))
+                    continue
+                hashes.append(imageHash(img, bgParams=self.bgParams))
+                labels.append(gesture)
+                files.append(imageFile)
+        self.append(hashes, labels, files)
+        if (len(files) > 0 or self.nbRemoved > 0) and self.filename is not None:
+            self.save()
+        return len(files)
@@ -0,0 +1,400 @@
+# distributed.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines the DistributedGridSearch class, a grid search
+# cross-validation whose (parameters x fold) tasks are run by a pool of worker
+# processes, local or on other hosts, reachable over sockets (see worker.py),
+# or locally. Task results can be cached (see rpscv.gridcache).
+#
+# Protocol: each message is a pickled object preceded by its length (8 bytes).
+# Only use workers on trusted hosts as pickled messages can execute code. The
+# coordinator sends task dictionaries (estimator, parameters, train and test
+# indices, dataset path) and the worker answers with the scores and times of
+# the task. The dataset is not sent: the workers memory-map it from the .npy
+# files written by the coordinator in a temporary directory, which must be on a
+# path shared with the workers (e.g. a network file system) for workers on other
+# hosts. The directory is removed at the end of the grid search.
+
+import os
+import pickle
+import queue
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from rpscv.server import createSocket, recvExactly
+
+def recvMessage(sock):
+    """Receives and returns a message. Returns None if the connection was
+    closed."""
+    header = bytearray(8)
+    if not recvExactly(sock, header):
+        return None
+    data = bytearray(struct.unpack('!Q', header)[0])
+    if not recvExactly(sock, data):
+        return None
+    return pickle.loads(data)
+
+def runTask(task, datasets):
+    """Fits and scores the estimator of the task on its train and test
+    indices and returns the result dictionary. The datasets dictionary caches
+    the memory-mapped datasets by path (or holds the dataset of a local
+    task)."""
+    from sklearn.base import clone
+    from sklearn.metrics import check_scoring
+
+    path = task['dataPath']
+    if path not in datasets:
+        datasets[path] = (np.load(path + '_X.npy', mmap_mode='r'),
+                          np.load(path + '_y.npy'))
+    X, y = datasets[path]
+    result = {'id': task['id'], 'worker': socket.gethostname(),
+              'pid': os.getpid(), 'error': None}
+    t0 = time.perf_counter()
+    try:
+        estimator = clone(task['estimator']).set_params(**task['params'])
+        estimator.fit(X[task['train']], y[task['train']])
+        result['fitTime'] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        # The default scoring (None) uses the estimator .score() method, as in
+        # GridSearchCV
+        scorer = check_scoring(estimator, task['scoring'])
+        result['score'] = scorer(estimator, X[task['test']], y[task['test']])
+        result['scoreTime'] = time.perf_counter() - t0
+    except Exception as e:
+        # Failed fits are scored as nan, as GridSearchCV does by default
+        result['fitTime'] = time.perf_counter() - t0
+        result['scoreTime'] = 0.
+        result['score'] = np.nan
+        result['error'] = repr(e)
+    return result
+
+def sendMessage(sock, obj):
+    """Sends obj as a message."""
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(struct.pack('!Q', len(data)) + data)
+
+def serveWorker(address):
+    """Runs a worker listening on address (Unix socket path or 'host:port')
+    for task messages and answering them with their result, one coordinator
+    connection at a time."""
+    sock, sockAddress = createSocket(address)
+    if isinstance(sockAddress, str) and os.path.exists(sockAddress):
+        os.remove(sockAddress)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(sockAddress)
+    sock.listen()
+    while True:
+        conn, addr = sock.accept()
+        # Datasets memory-mapped for this coordinator connection (grid search)
+        datasets = {}
+        with conn:
+            while True:
+                task = recvMessage(conn)
+                if task is None:
+                    break
+                sendMessage(conn, runTask(task, datasets))
+
+def startLocalWorkers(nbWorkers, directory):
+    """Starts nbWorkers worker processes on this computer, listening on Unix
+    sockets in directory, and returns their addresses and processes. The
+    processes are terminated by stopLocalWorkers() or when this program
+    ends."""
+    import multiprocessing
+
+    addresses = []
+    processes = []
+    for i in range(nbWorkers):
+        address = os.path.join(directory, 'worker{}.sock'.format(i))
+        process = multiprocessing.Process(target=serveWorker, args=(address,),
+                                          daemon=True)
+        process.start()
+        addresses.append(address)
+        processes.append(process)
+    return addresses, processes
+
+def stopLocalWorkers(processes):
+    """Terminates the worker processes started by startLocalWorkers()."""
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+class DistributedGridSearch():
+
+    def __init__(self, estimator, param_grid, workers, scoring=None, cv=5,
+                 refit=True, dataDir=None, maxRetries=2, connectTimeout=10,
+                 taskTimeout=600, cache=None, n_jobs=1):
+        """A grid search cross-validation with the same interface and results
+        (cv_results_, best_params_, best_score_, best_estimator_) as
+        sklearn GridSearchCV, where each (parameters x fold) task is run by one
+        of the workers.
+        workers: list of worker addresses (Unix socket paths or 'host:port'),
+        or number of local worker processes started by .fit() and stopped at
+        the end of the search. If empty, the tasks are run locally in n_jobs
+        processes,
+        dataDir: directory in which .fit() creates the temporary directory of
+        the .npy files of the dataset memory-mapped by the workers (the system
+        temporary directory by default). The temporary directory is removed at
+        the end of the search,
+        maxRetries: number of times a task is resubmitted to another worker
+        when its worker fails (connection lost or no result within
+        taskTimeout seconds). A worker that fails is not used anymore,
+        connectTimeout: time in seconds to wait for a worker to accept the
+        connection (e.g. while it starts),
+        cache: GridCache of the task results. Only the tasks not in the cache
+        are run and their results are added to the cache."""
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.workers = workers
+        self.scoring = scoring
+        self.cv = cv
+        self.refit = refit
+        self.dataDir = dataDir
+        self.maxRetries = maxRetries
+        self.connectTimeout = connectTimeout
+        self.taskTimeout = taskTimeout
+        self.cache = cache
+        self.n_jobs = n_jobs
+
+    def connect(self, address):
+        """Returns a socket connected to the worker at address, retrying
+        until connectTimeout."""
+        tEnd = time.perf_counter() + self.connectTimeout
+        while True:
+            sock, sockAddress = createSocket(address)
+            try:
+                sock.connect(sockAddress)
+                sock.settimeout(self.taskTimeout)
+                return sock
+            except OSError:
+                sock.close()
+                if time.perf_counter() > tEnd:
+                    raise
+                time.sleep(.1)
+
+    def dispatch(self, address, tasks, results, failed):
+        """Sends the tasks of the queue to the worker at address until all
+        tasks have a result. Called by one thread per worker. If the worker
+        fails or does not answer within taskTimeout seconds, its current task
+        is put back in the queue (up to maxRetries times) for the other
+        workers."""
+        try:
+            sock = self.connect(address)
+        except OSError as e:
+            failed.append((address, repr(e)))
+            return
+        with sock:
+            while len(results) < self.nbTasks:
+                try:
+                    task = tasks.get(timeout=.1)
+                except queue.Empty:
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    sendMessage(sock, task)
+                    result = recvMessage(sock)
+                    if result is None:
+                        raise ConnectionError('Connection closed by worker')
+                except OSError as e:
+                    task['attempts'] += 1
+                    if task['attempts'] <= self.maxRetries:
+                        tasks.put(task)
+                    else:
+                        results[task['id']] = dict(id=task['id'],
+                            worker=address, score=np.nan, fitTime=np.nan,
+                            scoreTime=np.nan, error=repr(e))
+                    failed.append((address, repr(e)))
+                    return
+                result['address'] = address
+                result['attempts'] = task['attempts'] + 1
+                result['wallTime'] = time.perf_counter() - t0
+                results[task['id']] = result
+
+    def fit(self, X, y):
+        """Runs the grid search on the features X and labels y and refits the
+        best estimator on the whole dataset if refit is True."""
+        import sklearn
+        from sklearn.base import clone
+        from sklearn.model_selection import ParameterGrid, check_cv
+
+        candidates = list(ParameterGrid(self.param_grid))
+        cv = check_cv(self.cv, y, classifier=True)
+        splits = list(cv.split(X, y))
+        self.nbTasks = len(candidates) * len(splits)
+
+        results = {}
+        keys = {}
+        if self.cache is not None:
+            from rpscv.gridcache import fingerprint
+            dataKey = fingerprint(np.asarray(X), np.asarray(y))
+            cvKey = fingerprint(cv, self.scoring, sklearn.__version__)
+
+        tasks = queue.Queue()
+        for c, params in enumerate(candidates):
+            for f, (train, test) in enumerate(splits):
+                if self.cache is not None:
+                    keys[(c, f)] = self.cache.taskKey(dataKey, cvKey,
+                        clone(self.estimator).set_params(**params), f)
+                    result = self.cache.get(keys[(c, f)])
+                    if result is not None:
+                        results[(c, f)] = dict(result, id=(c, f),
+                            worker='cache', address='cache', attempts=0,
+                            wallTime=0., error=None)
+                        continue
+                tasks.put(dict(id=(c, f), estimator=self.estimator,
+                               params=params, train=train, test=test,
+                               scoring=self.scoring, attempts=0))
+
+        failed = []
+        if not tasks.empty():
+            if isinstance(self.workers, int) or len(self.workers) > 0:
+                self.runWorkers(X, y, tasks, results, failed)
+            else:
+                self.runLocal(X, y, tasks, results)
+        self.failedWorkers = failed
+        if len(results) < self.nbTasks:
+            raise RuntimeError('{} tasks not run, all workers failed: '
+                               '{}'.format(self.nbTasks - len(results),
+                                           failed))
+
+        if self.cache is not None:
+            for key, result in results.items():
+                if result['worker'] != 'cache' and result['error'] is None:
+                    self.cache.put(keys[key], result)
+            self.cache.save()
+
+        self.timings = [results[(c, f)] for c in range(len(candidates))
+                        for f in range(len(splits))]
+        self.cv_results_ = self.getCvResults(candidates, len(splits), results)
+        self.best_index_ = int(np.argmin(self.cv_results_['rank_test_score']))
+        self.best_params_ = candidates[self.best_index_]
+        self.best_score_ = self.cv_results_['mean_test_score'][self.best_index_]
+        self.n_splits_ = len(splits)
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator).set_params(
+                **self.best_params_)
+            self.best_estimator_.fit(X, y)
+        return self
+
+    def getCvResults(self, candidates, nbSplits, results):
+        """Returns the results dictionary in the format of the GridSearchCV
+        cv_results_ attribute."""
+        from scipy.stats import rankdata
+
+        cvResults = {}
+        for key in ['score', 'fitTime', 'scoreTime']:
+            values = np.array([[results[(c, f)][key] for f in range(nbSplits)]
+                               for c in range(len(candidates))])
+            if key == 'score':
+                for f in range(nbSplits):
+                    cvResults['split{}_test_score'.format(f)] = values[:, f]
+                cvResults['mean_test_score'] = np.mean(values, axis=1)
+                cvResults['std_test_score'] = np.std(values, axis=1)
+            else:
+                name = {'fitTime': 'fit_time', 'scoreTime': 'score_time'}[key]
+                cvResults['mean_' + name] = np.mean(values, axis=1)
+                cvResults['std_' + name] = np.std(values, axis=1)
+        # Failed candidates (nan scores) are ranked last
+        scores = np.nan_to_num(cvResults['mean_test_score'], nan=-np.inf)
+        cvResults['rank_test_score'] = rankdata(-scores,
+                                                method='min').astype(np.int32)
+        names = sorted(set(k for params in candidates for k in params))
+        for name in names:
+            column = np.ma.MaskedArray(np.empty(len(candidates), dtype=object),
+                                       mask=True)
+            for c, params in enumerate(candidates):
+                if name in params:
+                    column[c] = params[name]
+            cvResults['param_' + name] = column
+        cvResults['params'] = candidates
+        return cvResults
+
+    def predict(self, X):
+        """Returns the predictions of the best estimator."""
+        return self.best_estimator_.predict(X)
+
+    def runWorkers(self, X, y, tasks, results, failed):
+        """Runs the tasks of the queue on the workers, which memory-map the
+        features X and labels y from a temporary directory."""
+        directory = tempfile.mkdtemp(prefix='grid_data', dir=self.dataDir)
+        processes = []
+        try:
+            # Write the dataset for the workers
+            dataPath = os.path.join(directory, 'data')
+            np.save(dataPath + '_X.npy', np.asarray(X))
+            np.save(dataPath + '_y.npy', np.asarray(y))
+            for task in tasks.queue:
+                task['dataPath'] = dataPath
+            workers = self.workers
+            if isinstance(workers, int):
+                workers, processes = startLocalWorkers(workers, directory)
+            threads = [threading.Thread(target=self.dispatch,
+                                        args=(w, tasks, results, failed))
+                       for w in workers]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            stopLocalWorkers(processes)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def runLocal(self, X, y, tasks, results):
+        """Runs the tasks of the queue in n_jobs local processes. The features
+        X and labels y are passed to the processes by joblib, which
+        memory-maps the large arrays, instead of being written for workers."""
+        from joblib import Parallel, delayed
+
+        dataset = {None: (np.asarray(X), np.asarray(y))}
+        tasks = [dict(tasks.get(), dataPath=None)
+                 for i in range(tasks.qsize())]
+        for result in Parallel(n_jobs=self.n_jobs)(
+                delayed(runTask)(task, dataset) for task in tasks):
+            result['address'] = 'local'
+            result['attempts'] = 1
+            result['wallTime'] = result['fitTime'] + result['scoreTime']
+            results[result['id']] = result
+
+    def printTimings(self):
+        """Prints the worker, attempts and times of each task."""
+        print('Task timings:')
+        print('  {:>5}{:>5}  {:<24}{:>9}{:>10}{:>10}{:>10}  {}'.format(
+            'cand.', 'fold', 'worker', 'attempts', 'fit', 'score', 'wall',
+            'params'))
+        for r in self.timings:
+            c, f = r['id']
+            print('  {:>5}{:>5}  {:<24}{:>9}{:>9.2f}s{:>9.2f}s{:>9.2f}s  '
+                  '{}'.format(c, f, str(r.get('address', r['worker']))[-24:],
+                              r.get('attempts', '-'), r['fitTime'],
+                              r['scoreTime'], r.get('wallTime', np.nan),
+                              self.cv_results_['params'][c]))
+            if r['error'] is not None:
+                print('    error: {}'.format(r['error']))
@@ -0,0 +1,154 @@
+# features.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines the feature cache of the labeled images (features.npz),
+# updated incrementally by retrain.py and read by the other training scripts,
+# and the record of the training and held-out test images of a trained
+# classifier, so that the scripts evaluating or refitting a classifier use the
+# images it was not trained on.
+
+import json
+import os
+
+import numpy as np
+
+from rpscv import utils
+
+# Feature cache filename
+cacheFilename = 'features.npz'
+
+# Invalid image files, skipped by updateFeatures()
+invalidFiles = set()
+
+def getSplitFilename(clfFilename):
+    """Returns the filename of the held-out test image record of the
+    classifier file (clf-split.json for clf.pkl)."""
+    return clfFilename.rsplit('.', 1)[0] + '-split.json'
+
+def loadCache(filename=cacheFilename, bgParams=None):
+    """Returns the cached image filenames, labels and features as uint8 masked
+    grayscale images. Returns empty arrays if the cache file does not exist or
+    if its features were generated with other background parameters than
+    bgParams (see imgproc.getBackgroundParams(), used if not specified)."""
+    from rpscv import imgproc as imp
+
+    if bgParams is None:
+        bgParams = imp.getBackgroundParams()
+    empty = [], np.empty(0, dtype=int), np.empty((0, 200 * 300), np.uint8)
+    if not os.path.exists(filename):
+        return empty
+    with np.load(filename) as cache:
+        if 'bgParams' not in cache or \
+                tuple(cache['bgParams']) != tuple(bgParams):
+            print('Feature cache {} was generated with other background '
+                  'parameters, regenerating it'.format(filename))
+            return empty
+        return list(cache['files']), cache['labels'], cache['grays']
+
+def loadTestFiles(clfFilename):
+    """Returns the list of the held-out test image filenames recorded with the
+    classifier file by saveTestFiles(), or None if there is no record."""
+    filename = getSplitFilename(clfFilename)
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'r') as f:
+        return json.load(f)['test']
+
+def loadTrainFiles(clfFilename):
+    """Returns the list of the training image filenames recorded with the
+    classifier file by saveTestFiles(), or None if there is no record of
+    them."""
+    filename = getSplitFilename(clfFilename)
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'r') as f:
+        return json.load(f).get('train')
+
+def saveCache(files, labels, grays, bgParams, filename=cacheFilename):
+    """Writes the image filenames, labels and uint8 features with the
+    background parameters of the features to the cache file."""
+    with utils.atomicWrite(filename, 'wb') as f:
+        np.savez(f, files=np.array(files), labels=labels, grays=grays,
+                 bgParams=np.array(bgParams))
+
+def saveTestFiles(clfFilename, testFiles, trainFiles=None):
+    """Records the filenames of the held-out test images of the classifier
+    file, i.e. the images it was not trained on, and the filenames of its
+    training images if trainFiles is specified."""
+    split = {'test': [str(f) for f in testFiles]}
+    if trainFiles is not None:
+        split['train'] = [str(f) for f in trainFiles]
+    filename = getSplitFilename(clfFilename)
+    with utils.atomicWrite(filename) as f:
+        json.dump(split, f)
+
+def updateFeatures(files, labels, grays, bgParams, imshape=None):
+    """Generates the features of the images not in the cache with the
+    background parameters bgParams and drops the images removed from the
+    image folders. Features are stored as uint8 masked grayscale images which
+    are converted back exactly to the float features of imgproc.getGray() by
+    dividing by 255. Returns the updated filenames, labels, features and the
+    number of new images. imshape is the shape of the images (imgproc.imshape
+    by default)."""
+    import cv2
+
+    from rpscv import imgproc as imp
+
+    if imshape is None:
+        imshape = imp.imshape
+
+    known = set(files)
+    current = []
+    newFiles = []
+    newLabels = []
+    newGrays = []
+    for gesture in utils.gestureTxt:
+        for imageFile in imp.getImageFiles(gesture):
+            current.append(imageFile)
+            if imageFile in known or imageFile in invalidFiles:
+                continue
+            img = cv2.imread(imageFile, cv2.IMREAD_COLOR)
+            if img is None or img.shape != imshape:
+                print('Image {} is invalid, skipping image.'.format(imageFile))
+                invalidFiles.add(imageFile)
+                continue
+            gray = imp.getGrayBGR(img, *bgParams)
+            newFiles.append(imageFile)
+            newLabels.append(gesture)
+            newGrays.append(np.rint(gray * 255).astype(np.uint8))
+
+    # Drop images removed from the image folders
+    current = set(current)
+    keep = np.array([f in current for f in files], dtype=bool)
+    files = [f for f, k in zip(files, keep) if k]
+    labels = labels[keep]
+    grays = grays[keep]
+
+    if len(newFiles) > 0:
+        files = files + newFiles
+        labels = np.concatenate([labels, newLabels])
+        grays = np.concatenate([grays, np.array(newGrays)])
+
+    return files, labels, grays, len(newFiles)
@@ -0,0 +1,174 @@
+# game.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines the RPSGame class, a time based state machine managing the
+# rounds, scores and display pauses of the game without blocking the main loop.
+
+from collections import namedtuple
+import random
+
+from rpscv import utils
+
+# Define game states as constants
+PRIVACY = 'privacy'
+PLAY = 'play'
+RESULT = 'result'
+GAMEOVER = 'gameover'
+DONE = 'done'
+
+# Result of a round
+Round = namedtuple('Round', ['player', 'computer', 'winner'])
+
+def getWinner(playerGesture, computerGesture):
+    """Returns 'player', 'computer' or 'tie' depending on the winner of the
+    round."""
+    diff = computerGesture - playerGesture
+    if diff in [-2, 1]:
+        return 'computer'
+    elif diff in [-1, 2]:
+        return 'player'
+    else:
+        return 'tie'
+
+class RPSGame():
+
+    def __init__(self, endScore=5, resultDelay=3, gameOverDelay=3.5,
+                 privacyDelay=10, privacy=False, loop=False, nbSuccessive=3):
+        """A state machine managing the game rounds and scores. The game
+        is updated once per frame with the gesture predicted on that frame
+        using the .update() method. Delays are in seconds and are managed as
+        states instead of blocking waits so that image capture and gesture
+        prediction can continue during the pauses.
+        endScore: score at which the game ends,
+        resultDelay: duration of the pause after each round,
+        gameOverDelay: duration of the pause at the end of the game,
+        privacyDelay: duration of the privacy notice at the start of a game,
+        privacy: if True, the privacy notice is shown at the start of a game,
+        loop: if True, a new game is started once the current game is over,
+        nbSuccessive: number of successive identical predictions required to
+        play a round."""
+        self.endScore = endScore
+        self.resultDelay = resultDelay
+        self.gameOverDelay = gameOverDelay
+        self.privacyDelay = privacyDelay
+        self.privacy = privacy
+        self.loop = loop
+        self.nbSuccessive = nbSuccessive
+        self.timer = utils.Timer()
+        self.state = None
+        self.previousState = None
+        self.stateChanged = False
+        self.reset()
+
+    def isOver(self):
+        """Returns True if one of the scores has reached the end score."""
+        return self.plScore >= self.endScore or self.coScore >= self.endScore
+
+    def isPaused(self):
+        """Returns True if the game is in one of the display pause states."""
+        return self.state in [PRIVACY, RESULT, GAMEOVER]
+
+    def playRound(self, playerGesture):
+        """Plays a round against a random computer gesture, updates the scores
+        and returns the Round result."""
+        computerGesture = random.randint(0, 2)
+        winner = getWinner(playerGesture, computerGesture)
+        if winner == 'player':
+            self.plScore += 1
+        elif winner == 'computer':
+            self.coScore += 1
+        return Round(playerGesture, computerGesture, winner)
+
+    def reset(self):
+        """Resets the scores and starts a new game."""
+        self.plScore = 0
+        self.coScore = 0
+        self.lastGesture = None
+        self.successive = 0
+        self.played = False
+        if self.privacy:
+            self.setState(PRIVACY, self.privacyDelay)
+        else:
+            self.setState(PLAY)
+
+    def setState(self, state, delay=0):
+        """Sets the game state and restarts the state timer. delay is the
+        duration of the state in seconds for the pause states."""
+        self.previousState = self.state
+        self.state = state
+        self.delay = delay
+        self.stateChanged = True
+        self.timer.reset()
+
+    def update(self, gesture=None):
+        """Updates the game with the gesture predicted on the current frame.
+        gesture must be None if no hand is detected on the frame. Returns a
+        Round if a round is played on this frame, None otherwise."""
+        self.stateChanged = False
+
+        # Count successive identical predictions. Counting continues during
+        # pauses so that a round can be played as soon as a pause ends.
+        if gesture is None:
+            self.lastGesture = None
+            self.successive = 0
+            self.played = False
+        elif gesture == self.lastGesture:
+            self.successive += 1
+        else:
+            self.lastGesture = gesture
+            self.successive = 1
+            self.played = False
+
+        # Move on to the next state at the end of pauses
+        if self.isPaused() and not self.timer.isWithin(self.delay):
+            if self.state == PRIVACY:
+                self.setState(PLAY)
+            elif self.state == RESULT:
+                if self.isOver():
+                    self.setState(GAMEOVER, self.gameOverDelay)
+                else:
+                    self.setState(PLAY)
+            elif self.state == GAMEOVER:
+                if self.loop:
+                    self.reset()
+                else:
+                    self.setState(DONE)
+
+        # Play a round once per series of successive identical predictions
+        if (self.state == PLAY and self.successive >= self.nbSuccessive
+                and not self.played):
+            self.played = True
+            self.setState(RESULT, self.resultDelay)
+            return self.playRound(gesture)
+
+        return None
+
+    def winner(self):
+        """Returns 'player' or 'computer' depending on the winner of the
+        game."""
+        if self.plScore > self.coScore:
+            return 'player'
+        else:
+            return 'computer'
@@ -0,0 +1,103 @@
+# gridcache.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines the GridCache class, a persistent cache of the scores of
+# the grid search (parameters x fold) tasks, so that a grid search rerun on the
+# same data only computes the new parameter combinations.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from rpscv import utils
+
+# Default cache filename
+cacheFilename = 'grid_cache.json'
+
+def estimatorFingerprint(estimator):
+    """Returns the fingerprint of the estimator class and parameters, nested
+    estimators (e.g. pipeline steps) being identified by their class name and
+    own parameters."""
+    items = []
+    for name, value in sorted(estimator.get_params(deep=True).items()):
+        if hasattr(value, 'get_params'):
+            value = type(value).__name__
+        items.append((name, repr(value)))
+    return fingerprint(type(estimator).__name__, items)
+
+def fingerprint(*objects):
+    """Returns the SHA-1 hex digest of the objects: the data of numpy arrays
+    (with their shape and type) and the repr() of other objects."""
+    sha = hashlib.sha1()
+    for obj in objects:
+        if isinstance(obj, np.ndarray):
+            sha.update(repr((obj.shape, obj.dtype.str)).encode())
+            sha.update(memoryview(np.ascontiguousarray(obj)).cast('B'))
+        else:
+            sha.update(repr(obj).encode())
+    return sha.hexdigest()
+
+class GridCache():
+
+    def __init__(self, filename=cacheFilename):
+        """A persistent cache of grid search task results (score, fit time and
+        score time). A task is identified by the fingerprint of the dataset
+        (features and labels data, so that it changes with the images and
+        the preprocessing parameters), the cross-validation settings (splitter,
+        scoring and scikit-learn version), the fold and the estimator with its
+        parameters. Results are added with .put() and written with
+        .save()."""
+        self.filename = filename
+        self.results = {}
+        if os.path.exists(filename):
+            with open(filename, 'r') as f:
+                self.results = json.load(f)
+        self.nbHits = 0
+
+    def get(self, key):
+        """Returns the cached result of the task key or None."""
+        result = self.results.get(key)
+        if result is not None:
+            self.nbHits += 1
+        return result
+
+    def put(self, key, result):
+        """Caches the score and times of the task result."""
+        self.results[key] = {name: float(result[name])
+                             for name in ['score', 'fitTime', 'scoreTime']}
+
+    def save(self):
+        """Writes the cache file (see utils.atomicWrite())."""
+        with utils.atomicWrite(self.filename) as f:
+            json.dump(self.results, f)
+
+    def taskKey(self, dataKey, cvKey, estimator, fold):
+        """Returns the key of the task fitting estimator (with its grid
+        parameters set) on fold of the dataset and cross-validation
+        fingerprints."""
+        return fingerprint(dataKey, cvKey, fold,
+                           estimatorFingerprint(estimator))
@@ -29,24 +29,23 @@
 import sys
 import numpy as np
 
-import cv2
 import pygame as pg
 import pygame.freetype
 
 class RPSGUI():
 
-    def __init__(self, privacy=False, loop=False):
+    def __init__(self, game):
+        """The game window. The scores and the winner of the game are read
+        from game (RPSGame)."""
         pg.init()
-        self.privacy = privacy
-        self.loop = loop
         self.sWidth = 640
         self.sHeight = 480
         self.surf = pg.display.set_mode((self.sWidth, self.sHeight))
         pg.display.set_caption('Rock-Paper-Scissors by drgfreeman@tuta.io')
-        self.plScore = 0
-        self.coScore = 0
+        self.game = game
         self.plImg = pg.Surface((200, 300))
         self.coImg = pg.Surface((200, 300))
+        self.coImgs = {}
         self.plImgPos = (380, 160)
         self.coImgPos = (60, 160)
         self.plZone = pg.Surface((250, 330))
@@ -62,8 +61,6 @@ class RPSGUI():
         self.GREEN = (0, 255, 0)
         self.BLUE = (0, 0, 255)
 
-        self.showPrivacyNote()
-
     def blitTextAlignCenter(self, surf, text, pos):
         tWidth = text[1].width
         surf.blit(text[0], (pos[0] - tWidth / 2, pos[1]))
@@ -109,12 +106,14 @@ class RPSGUI():
 
         # Render computer and player scores
         font = pg.freetype.SysFont(None, 100)
-        text = font.render(str(self.plScore), self.BLACK)
+        text = font.render(str(self.game.plScore), self.BLACK)
         self.blitTextAlignCenter(self.surf, text, (480, 60))
-        text = font.render(str(self.coScore), self.BLACK)
+        text = font.render(str(self.game.coScore), self.BLACK)
         self.blitTextAlignCenter(self.surf, text, (160, 60))
 
-    def gameOver(self, delay=3500):
+    def gameOver(self):
+        """Draws the game over message over the game screen. Does not block,
+        the display duration is managed by the caller."""
         # Create surface for Game Over message
         goZone = pg.Surface((400, 200))
 
@@ -130,7 +129,7 @@ class RPSGUI():
         gameOverText = font.render('GAME OVER', self.BLACK)
         self.blitTextAlignCenter(goZone, gameOverText, (200, 45))
 
-        if self.plScore > self.coScore:
+        if self.game.winner() == 'player':
             winner = 'PLAYER'
             color = self.GREEN
         else:
@@ -144,58 +143,60 @@ class RPSGUI():
         pos = (self.sWidth / 2 - 200, 175)
         self.surf.blit(goZone, pos)
 
-        pg.display.flip()
-
-        pg.time.wait(delay)
-
-        if self.loop:
-            self.reset()
-        else:
-            self.quit()
-
-    def showPrivacyNote(self, delay=10000):
-        if self.privacy:
-            # Fill surface with background color
-            self.surf.fill(self.WHITE)
+    def showPrivacyNote(self):
+        """Draws the privacy notice screen. Does not block, the display
+        duration is managed by the caller."""
+        # Fill surface with background color
+        self.surf.fill(self.WHITE)
 
-            #Render text on surface
-            font = pg.freetype.SysFont(None, 40)
-            text = font.render('Privacy Notice', self.RED)
-            pos = (self.sWidth / 2, 100)
+        #Render text on surface
+        font = pg.freetype.SysFont(None, 40)
+        text = font.render('Privacy Notice', self.RED)
+        pos = (self.sWidth / 2, 100)
+        self.blitTextAlignCenter(self.surf, text, pos)
+
+        font = pg.freetype.SysFont(None, 20)
+        pn = ['Images captured during the game are stored to help']
+        pn.append('improve the image classification algorithm and may be')
+        pn.append('shared publicly. By playing this game you agree to have')
+        pn.append('images of your hand captured and stored.')
+        for i, line in enumerate(pn):
+            text = font.render(line, self.BLACK)
+            pos = (self.sWidth / 2, 150 + 25 * i)
             self.blitTextAlignCenter(self.surf, text, pos)
 
-            font = pg.freetype.SysFont(None, 20)
-            pn = ['Images captured during the game are stored to help']
-            pn.append('improve the image classification algorithm and may be')
-            pn.append('shared publicly. By playing this game you agree to have')
-            pn.append('images of your hand captured and stored.')
-            for i, line in enumerate(pn):
-                text = font.render(line, self.BLACK)
-                pos = (self.sWidth / 2, 150 + 25 * i)
-                self.blitTextAlignCenter(self.surf, text, pos)
-
-            pg.display.flip()
-            pg.time.wait(delay)
-
     def quit(self, delay=0):
         pg.time.wait(delay)
         pg.quit()
         sys.exit()
 
     def reset(self):
-        self.plScore = 0
-        self.coScore = 0
-        self.showPrivacyNote()
+        self.winner = None
+
+    def addCoImg(self, key, img):
+        """Converts a computer image to a surface in the display format and
+        caches it under key so it can be set with .setCoImg(key) without any
+        per-frame conversion."""
+        surf = pg.surfarray.make_surface(img[:,::-1,:])
+        self.coImgs[key] = surf.convert()
 
     def setCoImg(self, img):
-        self.coImg = pg.surfarray.make_surface(img[:,::-1,:])
+        """Sets the computer image. img is either the key of an image cached
+        with .addCoImg() or an RGB image array."""
+        if isinstance(img, np.ndarray):
+            self.coImg = pg.surfarray.make_surface(img[:,::-1,:])
+        else:
+            self.coImg = self.coImgs[img]
 
-    def setPlImg(self, img):
-        self.plImg = pg.surfarray.make_surface(img[::-1,:,:])
+    def setPlImg(self, img, bgr=False):
+        """Copies the RGB image array (or BGR image array if bgr is True)
+        into the preallocated player surface."""
+        if bgr:
+            # Channel reversed view, converted while copying
+            img = img[:,:,::-1]
+        pg.surfarray.blit_array(self.plImg, img[::-1,:,:])
 
     def setWinner(self, winner=None):
+        """Sets the winner of the round highlighted by .draw(). The scores are
+        kept by the game."""
         self.winner = winner
-        if winner == 'player':
-            self.plScore += 1
-        elif winner == 'computer':
-            self.coScore += 1
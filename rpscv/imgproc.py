@@ -31,83 +31,247 @@ import time
 
 import numpy as np
 
-from skimage.io import imread
-from skimage import color
-from skimage import feature
-from skimage import filters
-
 from rpscv import utils
 
 import cv2
 
+# Region of the camera frames kept by crop(), as (top, left, height, width)
+cropWindow = (75, 125, 200, 300)
+
+# Shape of the cropped RGB images (height, width, channels)
+imshape = cropWindow[2:] + (3,)
+
+# Background removal parameters (hue value, threshold) file, written by the
+# background calibration, and default parameters used if it does not exist
+bgFilename = 'bg_params.txt'
+defaultBackgroundParams = (63, 17)
+
+# Range of the calibrated thresholds accepted by calibrateBackground(). Higher
+# thresholds are a sign of objects in the calibration frames.
+thresholdRange = (4, 30)
+
+# Feature value of each uint8 grayscale value
+_grayTable = np.arange(256, dtype=np.float32) / 255
+
+# Hue distance lookup tables by background hue value
+_hueDistanceTables = {}
+
+# Background mask lookup tables by background hue value and threshold
+_maskTables = {}
+
+def calibrateBackground(images, percentile=99.5, margin=2):
+    """Returns the background hue value and threshold fitted on images (RGB
+    images of the empty background). The hue value is the mode of the hue
+    histogram of all pixels, smoothed over +/- 2 hue units. The threshold is
+    the percentile of the hue distance of the background pixels plus margin,
+    so that almost all background pixels are removed by getGray(). Raises a
+    ValueError if the threshold is outside thresholdRange, e.g. when a hand
+    is in the calibration frames."""
+    hist = np.zeros(180)
+    for img in images:
+        hue = cv2.cvtColor(img, cv2.COLOR_RGB2HSV)[:,:,0]
+        hist += np.bincount(hue.ravel(), minlength=180)[:180]
+    # Circular smoothing as hue 0 and 179 are neighbours
+    smoothed = sum([np.roll(hist, shift) for shift in range(-2, 3)])
+    hueValue = int(smoothed.argmax())
+
+    dist = hueDistanceTable(hueValue)[:180]
+    cumulative = np.cumsum(hist[np.argsort(dist, kind='stable')])
+    sortedDist = np.sort(dist, kind='stable')
+    index = np.searchsorted(cumulative, cumulative[-1] * percentile / 100)
+    threshold = int(sortedDist[min(index, len(sortedDist) - 1)]) + margin
+    if not thresholdRange[0] <= threshold <= thresholdRange[1]:
+        raise ValueError('Calibrated background threshold {} is outside the '
+                         'range {} to {}, check that the background is empty '
+                         'and evenly lit'.format(threshold, *thresholdRange))
+    return hueValue, threshold
+
 def crop(img):
-    """Returns a cropped image to pre-defined shape."""
-    return img[75:275, 125:425]
+    """Returns a cropped image to pre-defined shape. Images already captured
+    at the cropped shape (camera region of interest, see rpscv.camera.Camera)
+    are returned unchanged."""
+    top, left, height, width = cropWindow
+    if img.shape[:2] == (height, width):
+        return img
+    return img[top:top + height, left:left + width]
+
+def decodeImage(filename, decoder='cv2'):
+    """Decodes the image file and returns it as an RGB image array.
+    decoder: 'cv2' (OpenCV, fastest for PNG) or 'skimage' (scikit-image)."""
+    if decoder == 'cv2':
+        img = cv2.imread(filename, cv2.IMREAD_COLOR)
+        if img is None:
+            raise IOError('Unable to decode image {}'.format(filename))
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    elif decoder == 'skimage':
+        # Imported here as scikit-image is only required for training
+        from skimage.io import imread
+        return imread(filename)
+    else:
+        raise ValueError("decoder must be 'cv2' or 'skimage'")
 
 def fastRotate(img):
     """Rotates the image clockwise 90 deg."""
     return np.transpose(img, axes=(1, 0, 2))[:,::-1,:].copy()
 
-def generateGrayFeatures(imshape=(200,300, 3), nbImg=0, verbose=False, rs=42):
+def generateGrayFeatures(imshape=imshape, nbImg=0, verbose=False, rs=42,
+                         packFilename=None, decoder='cv2', nbThreads=4,
+                         maxDuplicateDistance=None, returnFiles=False,
+                         bgParams=None):
     """Reads training image files, generates features from grayscale image and
     saves the features and labels in a csv file to be used to train the image
-    classifier."""
+    classifier. If packFilename is specified, the images are read from the
+    packed dataset (see rpscv.dataset) instead of the image files.
+    The image shapes are checked from the PNG file headers, without decoding.
+    The valid images are then decoded with decoder (see decodeImage()) by a
+    pool of nbThreads threads, overlapping file reading and decoding, and their
+    features are written directly in their row of the features array.
+    If maxDuplicateDistance is specified, the near-duplicate images (see
+    rpscv.dedup) are reported and excluded, keeping one image of each group.
+    If returnFiles is True, the list of the source filenames of the images is
+    returned with the features and labels. bgParams are the background hue
+    value and threshold, read by getBackgroundParams() if not specified, so
+    that the features match the ones of the game."""
+    if bgParams is None:
+        bgParams = getBackgroundParams()
+
+    exclude = set()
+    if maxDuplicateDistance is not None:
+        exclude = set(getDuplicates(maxDuplicateDistance, verbose, bgParams))
+
+    if packFilename is not None:
+        return generateGrayFeaturesPacked(packFilename, nbImg, verbose, rs,
+                                          exclude, returnFiles, bgParams)
+
+    from concurrent.futures import ThreadPoolExecutor
 
     imsize = imshape[0] * imshape[1]
 
-    t0 = time.time()
-
     gestures = [utils.ROCK, utils.PAPER, utils.SCISSORS]
 
     # Create a list of image files for each gesture
-    files = []
-    for i, gesture in enumerate(gestures):
-        path = os.path.join(utils.imgPathsRaw[gesture], '*.png')
-        files.append(glob(path))
-        files[i].sort(key=str.lower)
+    files = [getImageFiles(gesture) for gesture in gestures]
 
-    nbImages = sum([len(i) for i in files])
-
-    # Create empty numpy arays for features and labels
-    features = np.empty((nbImages, imsize), dtype=np.float32)
-    labels = np.empty((nbImages), dtype=np.int)
-
-    # Generate grayscale images
-    counter = 0
+    # Select valid image files from their headers
+    validFiles = []
+    validLabels = []
     for i, gesture in enumerate(gestures):
 
         if nbImg > 0:
-            np.random.seed = rs
-            files[i] = np.random.permutation(files[i])
+            files[i] = np.random.RandomState(rs).permutation(files[i])
             if len(files[i]) > nbImg:
                 files[i] = files[i][:int(nbImg / 3)]
 
         for imageFile in files[i]:
-
-            if verbose:
-                print('Processing image {}'.format(imageFile))
-
-            # Load image as a numpy array
-            img = imread(imageFile)
-
-            if img.shape == imshape:
-
-                # Generate and store image features in features array
-                features[counter] = getGray(img, threshold=17)
-
-                # Store image label in labels array
-                labels[counter] = gesture
-
-                counter += 1
-
+            if imageFile in exclude:
+                continue
+            shape = readPngShape(imageFile)
+            if shape is None or shape == imshape:
+                # Files that are not PNG are checked after decoding
+                validFiles.append(imageFile)
+                validLabels.append(gesture)
             else:
                 print('Image {} has invalid shape: {}, {} expected, skipping image.'.format( \
-                    imageFile, img.shape, imshape))
+                    imageFile, shape, imshape))
 
-    print('Completed processing {} images'.format(counter))
+    # Create empty numpy arays for features and labels
+    features = np.empty((len(validFiles), imsize), dtype=np.float32)
+    labels = np.array(validLabels, dtype=int)
+    valid = np.ones(len(validFiles), dtype=bool)
+
+    def process(i):
+        """Decodes image i and stores its features in row i."""
+        if verbose:
+            print('Processing image {}'.format(validFiles[i]))
+        img = decodeImage(validFiles[i], decoder)
+        if img.shape == imshape:
+            features[i] = getGray(img, *bgParams)
+        else:
+            print('Image {} has invalid shape: {}, {} expected, skipping image.'.format( \
+                validFiles[i], img.shape, imshape))
+            valid[i] = False
 
-    return features[:counter], labels[:counter]
+    # Generate grayscale images
+    with ThreadPoolExecutor(max_workers=nbThreads) as executor:
+        list(executor.map(process, range(len(validFiles))))
+
+    if not valid.all():
+        features = features[valid]
+        labels = labels[valid]
+
+    print('Completed processing {} images'.format(len(labels)))
+
+    if returnFiles:
+        return features, labels, [f for f, v in zip(validFiles, valid) if v]
+    return features, labels
+
+
+def generateGrayFeaturesPacked(packFilename, nbImg=0, verbose=False, rs=42,
+                               exclude=(), returnFiles=False, bgParams=None):
+    """Generates the grayscale features and labels of the images of a packed
+    dataset. The images are read sequentially by chunks from the memory-mapped
+    data file, without decoding. Images whose source filename is in exclude
+    are skipped. If returnFiles is True, the source filenames of the images
+    are also returned. bgParams are the background hue value and threshold
+    (see getBackgroundParams())."""
+    from rpscv.dataset import PackedDataset
+
+    if bgParams is None:
+        bgParams = getBackgroundParams()
+    dataset = PackedDataset(packFilename)
+    labels = dataset.getLabels()
+
+    indices = np.array([i for i, f in enumerate(dataset.files)
+                        if f not in exclude], dtype=int)
+    if nbImg > 0:
+        # Random selection of nbImg / 3 images per gesture
+        rand = np.random.RandomState(rs)
+        indices = np.sort(np.concatenate(
+            [rand.permutation(indices[labels[indices] == gesture])[:nbImg // 3]
+             for gesture in utils.gestureTxt]))
+
+    features = np.empty((len(indices), dataset.imshape[0] * dataset.imshape[1]),
+                        dtype=np.float32)
+    counter = 0
+    for chunk, images in dataset.iterChunks(indices=indices):
+        if verbose:
+            print('Processing images {} to {}'.format(chunk[0], chunk[-1]))
+        for img in images:
+            features[counter] = getGray(img, *bgParams)
+            counter += 1
+
+    print('Completed processing {} images'.format(counter))
 
+    if returnFiles:
+        return features, labels[indices], [dataset.files[i] for i in indices]
+    return features, labels[indices]
+
+
+def getDuplicates(maxDistance=4, verbose=False, bgParams=None):
+    """Updates the near-duplicate index of the raw image folders (see
+    rpscv.dedup), hashed with the background parameters bgParams, and returns
+    the dictionary of near-duplicate image filenames with the filename of the
+    image they duplicate."""
+    from rpscv.dedup import DuplicateIndex
+
+    index = DuplicateIndex(maxDistance=maxDistance, bgParams=bgParams)
+    index.update(verbose)
+    duplicates = index.getDuplicates()
+    labels = dict(zip(index.files, index.labels))
+    for gesture in utils.gestureTxt:
+        nbDuplicates = sum([labels[f] == gesture for f in duplicates])
+        print('{}: {} near-duplicate images'.format(utils.gestureTxt[gesture],
+                                                    nbDuplicates))
+    return duplicates
+
+
+def getBackgroundParams(bgFilename=bgFilename):
+    """Returns the background hue value and threshold read from bgFilename if
+    it exists, otherwise the default values. These parameters are used to
+    extract the features both for training and in the game."""
+    if os.path.exists(bgFilename):
+        return readBackgroundParams(bgFilename)
+    return defaultBackgroundParams
 
 def getGray(img, hueValue=63, threshold=0):
     """Returns the grayscale of the source image with its background
@@ -120,6 +284,44 @@ def getGray(img, hueValue=63, threshold=0):
     return img.ravel()
 
 
+def getGrayBGR(img, hueValue=63, threshold=0, out=None):
+    """Returns the same feature vector as getGray() from the BGR image (e.g.
+    the cropped camera frame), without RGB conversion or intermediate masked
+    image. The background is masked with a precomputed lookup table on the hue
+    channel and the normalized grayscale values are written directly in the
+    out float32 array (allocated if None) by a table lookup."""
+    if out is None:
+        out = np.empty(img.shape[0] * img.shape[1], dtype=np.float32)
+    hue = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)[:,:,0]
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if threshold == 0:
+        # Adaptive threshold: mean hue distance of the image
+        dist = hueDistanceTable(hueValue)[hue]
+        gray[dist < dist.mean()] = 0
+    else:
+        cv2.bitwise_and(gray, cv2.LUT(hue, maskTable(hueValue, threshold)),
+                        dst=gray)
+    np.take(_grayTable, gray.ravel(), out=out)
+    return out
+
+
+def getImageFiles(gesture):
+    """Returns the sorted list of the image files in the raw image folder of
+    the gesture."""
+    files = glob(os.path.join(utils.imgPathsRaw[gesture], '*.png'))
+    files.sort(key=str.lower)
+    return files
+
+
+def getHueGray(img):
+    """Returns the hue channel and the grayscale of the RGB image as flattened
+    uint8 arrays. The features of any background removal parameters can then
+    be derived from them with maskGray() without decoding the image again."""
+    hue = cv2.cvtColor(img, cv2.COLOR_RGB2HSV)[:,:,0]
+    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    return hue.ravel(), gray.ravel()
+
+
 def hueDistance(img, hueValue):
     """Returns an image where the pixel values correspond to the distance from
        the hue value of the source image pixels and the hueValue argument."""
@@ -127,19 +329,82 @@ def hueDistance(img, hueValue):
     # Convert image to HSV colorspace
     hsv = cv2.cvtColor(img, cv2.COLOR_RGB2HSV)
 
-    hChannel = hsv[:,:,0].astype(int)
+    return hueDistanceTable(hueValue)[hsv[:,:,0]]
+
+
+def hueDistanceTable(hueValue):
+    """Returns the lookup table of the distance from hueValue of each uint8 hue
+    value. The tables are computed once per hue value."""
+    if hueValue in _hueDistanceTables:
+        return _hueDistanceTables[hueValue]
+
+    hues = np.arange(256)
 
     # Calculate hue distance
-    dist = np.abs(hsv[:,:,0] - hueValue)
     if hueValue < 90:
         hueOffset = 180
     else:
         hueOffset = -180
 
-    dist = np.minimum(np.abs(hChannel - hueValue),
-                      np.abs(hChannel - (hueValue + hueOffset)))
-
-    return dist
+    table = np.minimum(np.abs(hues - hueValue),
+                       np.abs(hues - (hueValue + hueOffset)))
+    table.setflags(write=False)
+    _hueDistanceTables[hueValue] = table
+    return table
+
+
+def maskTable(hueValue, threshold):
+    """Returns the uint8 lookup table of the mask value of each hue value:
+    255 for foreground hues (hue distance to hueValue of at least threshold)
+    and 0 for background hues. The tables are computed once per parameters."""
+    key = (hueValue, threshold)
+    if key not in _maskTables:
+        table = np.where(hueDistanceTable(hueValue) >= threshold, 255, 0)
+        _maskTables[key] = table.astype(np.uint8)
+    return _maskTables[key]
+
+
+def maskGray(hue, gray, hueValue=63, threshold=0):
+    """Returns the features of getGray() from the hue and grayscale uint8
+    arrays of getHueGray() (one image or a 2D array of images, one per row).
+    The background is masked with lookup tables, giving the same values as
+    getGray() with the same hueValue and threshold."""
+    dist = hueDistanceTable(hueValue)
+    if threshold == 0:
+        # Adaptive threshold: mean hue distance of each image
+        dist = dist[hue]
+        keep = dist >= dist.mean(axis=-1, keepdims=True)
+    else:
+        keep = (dist >= threshold)[hue]
+    return _grayTable[np.where(keep, gray, 0)]
+
+
+def readBackgroundParams(bgFilename=bgFilename):
+    """Reads the background hue value and threshold from a file written by
+    writeBackgroundParams() and returns them."""
+    with open(bgFilename, 'r') as f:
+        line = f.readline()
+    hueValue, threshold = [int(v) for v in line.split(', ')]
+    return hueValue, threshold
+
+
+def readPngShape(filename):
+    """Returns the shape (rows, columns, channels) of a PNG image read from its
+    header, without decoding the image. Returns None if the file is not a PNG
+    image."""
+    with open(filename, 'rb') as f:
+        header = f.read(26)
+    if len(header) < 26 or header[:8] != b'\x89PNG\r\n\x1a\n' \
+            or header[12:16] != b'IHDR':
+        return None
+    width = int.from_bytes(header[16:20], 'big')
+    height = int.from_bytes(header[20:24], 'big')
+    # Number of channels of the decoded image by PNG color type (palette images
+    # are decoded as RGB)
+    channels = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}.get(header[25])
+    if channels == 1:
+        return (height, width)
+    return (height, width, channels)
 
 
 def removeBackground(img, hueValue, threshold=0):
@@ -155,8 +420,18 @@ def removeBackground(img, hueValue, threshold=0):
 
     # Select background pixels using thresholding and set value to zero (black)
     if threshold == 0:
+        # Imported here as scikit-image is only required for adaptive threshold
+        from skimage import filters
         masked[dist < filters.threshold_mean(dist)] = 0
     else:
         masked[dist < threshold] = 0
 
     return masked
+
+
+def writeBackgroundParams(hueValue, threshold, bgFilename=bgFilename):
+    """Writes the background hue value and threshold to a file, to be read by
+    readBackgroundParams(). The file is replaced atomically (see
+    utils.atomicWrite())."""
+    with utils.atomicWrite(bgFilename) as f:
+        f.write('{}, {}'.format(int(hueValue), int(threshold)))
@@ -0,0 +1,137 @@
+# knn.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines the PCAKNNClassifier class, a k-nearest neighbours image
+# classifier working in the space of a frozen PCA to which new labeled images
+# can be added without retraining.
+
+import numpy as np
+
+from rpscv.model import getPipeline
+
+class PCAKNNClassifier():
+
+    def __init__(self, pca, k=5, algorithm='brute', capacity=256):
+        """A k-nearest neighbours classifier operating on the features
+        projected by a frozen (already fitted) PCA. The projected features are
+        stored in a compact float32 array which grows as new labeled images
+        are added with the .append() method, without refitting the PCA.
+        pca: fitted sklearn PCA object, e.g. from the last training run,
+        k: number of neighbours voting for the predicted gesture,
+        algorithm: 'brute' for vectorized exhaustive search or 'kdtree' /
+        'balltree' for a scikit-learn tree index (rebuilt after appends),
+        capacity: initial number of samples allocated."""
+        if algorithm not in ['brute', 'kdtree', 'balltree']:
+            raise ValueError("algorithm must be 'brute', 'kdtree' or "
+                             "'balltree'")
+        self.k = k
+        self.algorithm = algorithm
+        self.mean = pca.mean_.astype(np.float32)
+        self.components = pca.components_.astype(np.float32)
+        if pca.whiten:
+            self.components /= np.sqrt(pca.explained_variance_)[:, np.newaxis]
+        # Projection of the mean, subtracted after the projection to avoid
+        # centering the (large) feature vectors
+        self.meanProj = self.components.dot(self.mean)
+        nbComponents = self.components.shape[0]
+        self.points = np.empty((capacity, nbComponents), dtype=np.float32)
+        self.sqNorms = np.empty(capacity, dtype=np.float32)
+        self.labels = np.empty(capacity, dtype=np.int8)
+        self.nbSamples = 0
+        self.tree = None
+
+    @classmethod
+    def fromPipeline(cls, clf, **kwargs):
+        """Returns a PCAKNNClassifier using the PCA of a trained classifier
+        pipeline (e.g. loaded from clf.pkl)."""
+        return cls(getPipeline(clf).named_steps['pca'], **kwargs)
+
+    def append(self, features, labels):
+        """Projects the feature vectors and adds them with their labels to the
+        classifier. The storage arrays are grown by doubling their size when
+        full."""
+        proj = self.project(features)
+        n = proj.shape[0]
+        if self.nbSamples + n > self.points.shape[0]:
+            capacity = max(2 * self.points.shape[0], self.nbSamples + n)
+            self.points = self._grow(self.points, capacity)
+            self.sqNorms = self._grow(self.sqNorms, capacity)
+            self.labels = self._grow(self.labels, capacity)
+        end = self.nbSamples + n
+        self.points[self.nbSamples:end] = proj
+        self.sqNorms[self.nbSamples:end] = np.einsum('ij,ij->i', proj, proj)
+        self.labels[self.nbSamples:end] = labels
+        self.nbSamples = end
+        self.tree = None
+        return self
+
+    def fit(self, features, labels):
+        """Replaces the stored samples with the feature vectors and labels.
+        The PCA is not refitted."""
+        self.nbSamples = 0
+        return self.append(features, labels)
+
+    def _grow(self, array, capacity):
+        """Returns a copy of array with its first dimension extended to
+        capacity."""
+        grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:self.nbSamples] = array[:self.nbSamples]
+        return grown
+
+    def kneighbors(self, features):
+        """Returns the indices of the k nearest stored samples of each feature
+        vector, sorted by increasing distance."""
+        proj = self.project(features)
+        k = min(self.k, self.nbSamples)
+        if self.algorithm == 'brute':
+            # Squared distances up to the constant norm of the query
+            dist = (self.sqNorms[:self.nbSamples]
+                    - 2 * proj.dot(self.points[:self.nbSamples].T))
+            idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            order = np.argsort(np.take_along_axis(dist, idx, axis=1), axis=1)
+            return np.take_along_axis(idx, order, axis=1)
+        else:
+            if self.tree is None:
+                from sklearn.neighbors import BallTree, KDTree
+                Tree = KDTree if self.algorithm == 'kdtree' else BallTree
+                self.tree = Tree(self.points[:self.nbSamples])
+            return self.tree.query(proj, k=k, return_distance=False)
+
+    def predict(self, features):
+        """Returns the predicted gestures of the feature vectors by majority
+        vote of their k nearest neighbours. Ties are won by the gesture of the
+        nearest neighbour."""
+        neighbours = self.labels[self.kneighbors(features)].astype(np.intp)
+        votes = np.zeros((neighbours.shape[0], 3), dtype=np.float32)
+        np.add.at(votes, (np.arange(neighbours.shape[0])[:, np.newaxis],
+                          neighbours), 1)
+        votes[np.arange(neighbours.shape[0]), neighbours[:, 0]] += .5
+        return votes.argmax(axis=1)
+
+    def project(self, features):
+        """Returns the feature vectors projected on the PCA components as a
+        float32 array."""
+        features = np.asarray(features, dtype=np.float32)
+        return features.dot(self.components.T) - self.meanProj
@@ -0,0 +1,124 @@
+# mockcamera.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines mock versions of the picamera library classes used by the
+# Camera class, to run and test the camera code without a Raspberry Pi:
+#   cam = Camera(size=8, picamera=rpscv.mockcamera)
+# The frames are generated from a still image of the whole camera field of view,
+# applying the zoom, resize and buffer padding of the camera.
+
+import cv2
+import numpy as np
+
+def makeScene(shape=(768, 1024)):
+    """Returns a synthetic BGR image of the camera field of view: a hand-like
+    blob on a textured green background."""
+    rand = np.random.RandomState(0)
+    scene = np.empty(shape + (3,), dtype=np.uint8)
+    scene[:] = (40, 160, 60)
+    scene += rand.randint(0, 30, scene.shape).astype(np.uint8)
+    center = (shape[1] // 2, shape[0] // 2)
+    axes = (shape[1] // 8, shape[0] // 5)
+    cv2.ellipse(scene, center, axes, 20, 0, 360, (120, 150, 210), -1)
+    return scene
+
+class PiCamera():
+
+    # BGR image of the whole field of view from which the frames are
+    # generated, shared by all instances. Generated by makeScene() if None.
+    scene = None
+
+    def __init__(self):
+        """A mock of the picamera PiCamera class. The number of frames
+        captured and of bytes written to the capture buffers are counted in
+        the nbFrames and nbBytes attributes."""
+        self.resolution = (1280, 720)
+        self.framerate = 30
+        self.hflip = False
+        self.vflip = False
+        self.zoom = (0., 0., 1., 1.)
+        self.awb_mode = 'auto'
+        self.awb_gains = (1.5, 1.5)
+        self.recording = False
+        self.nbFrames = 0
+        self.nbBytes = 0
+
+    def capture(self, output, format='bgr', use_video_port=False,
+                resize=None):
+        """Writes a frame of the scene to the output numpy array as the
+        picamera capture() method: the scene is flipped (hflip, vflip), then
+        the zoom region of the flipped scene is resized to the resize
+        dimensions (width, height) or the camera resolution and padded to a
+        multiple of 32 columns and 16 rows. As with the camera, where the flips
+        are applied by the sensor readout, the zoom is in the coordinates of
+        the flipped frame."""
+        if format not in ['bgr', 'rgb']:
+            raise ValueError("Only the 'bgr' and 'rgb' formats are supported")
+        if PiCamera.scene is None:
+            PiCamera.scene = makeScene()
+        scene = PiCamera.scene
+        if self.hflip:
+            scene = scene[:, ::-1]
+        if self.vflip:
+            scene = scene[::-1]
+        h, w = scene.shape[:2]
+        x, y, zw, zh = self.zoom
+        region = scene[int(round(y * h)):int(round((y + zh) * h)),
+                       int(round(x * w)):int(round((x + zw) * w))]
+        width, height = resize if resize is not None else self.resolution
+        img = cv2.resize(region, (width, height), interpolation=cv2.INTER_AREA)
+        if format == 'rgb':
+            img = img[:, :, ::-1]
+        buffer = np.zeros((-(-height // 16) * 16, -(-width // 32) * 32, 3),
+                          dtype=np.uint8)
+        buffer[:height, :width] = img
+        if output.size != buffer.size:
+            raise ValueError('Incorrect buffer length for resolution '
+                             '{}x{}'.format(width, height))
+        output.ravel()[:] = buffer.ravel()
+        self.nbFrames += 1
+        self.nbBytes += buffer.size
+
+    def close(self):
+        self.recording = False
+
+    def start_preview(self):
+        pass
+
+    def start_recording(self, output, format=None, resize=None):
+        self.recording = True
+
+    def stop_preview(self):
+        pass
+
+    def stop_recording(self):
+        self.recording = False
+
+class PiCameraCircularIO():
+
+    def __init__(self, camera, seconds=None):
+        """A mock of the picamera PiCameraCircularIO class. Recorded data is
+        discarded."""
+        self.camera = camera
@@ -0,0 +1,254 @@
+# model.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines functions and classes to load the trained image classifier
+# used by the game scripts.
+
+from glob import glob
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+from rpscv import utils
+
+# Number of features of the grayscale feature vectors (cropped image size)
+nbFeatures = 200 * 300
+
+def getPipeline(clf):
+    """Returns the classifier pipeline of clf. Classifier files written by
+    earlier versions of train.py contain the whole grid search object, in which
+    case its best estimator is returned."""
+    return getattr(clf, 'best_estimator_', clf)
+
+def loadClassifier(filename='clf.pkl'):
+    """Loads and returns the image classifier from a pickle file."""
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
+
+def measureLatency(clf, features, nbRepeat=1):
+    """Predicts the feature vectors one at a time, as in the game loop, and
+    returns a numpy array of the prediction times in seconds."""
+    times = []
+    for i in range(nbRepeat):
+        for x in features:
+            t0 = time.perf_counter()
+            clf.predict([x])
+            times.append(time.perf_counter() - t0)
+    return np.array(times)
+
+def saveClassifier(clf, filename='clf.pkl'):
+    """Writes the classifier to a pickle file (see utils.atomicWrite())."""
+    with utils.atomicWrite(filename, 'wb') as f:
+        pickle.dump(clf, f)
+
+def validate(clf, nbFeatures=nbFeatures):
+    """Checks that the classifier can predict a gesture from a feature vector.
+    Raises a ValueError if the classifier is not valid. The check doubles as
+    classifier warm-up."""
+    if not hasattr(clf, 'predict'):
+        raise ValueError('Classifier has no predict method')
+    pred = warmUp(clf, nbFeatures)
+    if pred not in utils.gestureTxt:
+        raise ValueError('Classifier predicted invalid gesture {}'.format(pred))
+
+def warmUp(clf, nbFeatures=nbFeatures):
+    """Runs a dummy prediction on the classifier to page its data in memory and
+    initialize the lazy caches and thread pools of the underlying libraries so
+    that the first prediction of the game is not slowed down. Returns the
+    predicted value."""
+    return clf.predict(np.zeros((1, nbFeatures), dtype=np.float32))[0]
+
+class ClassifierLoader(threading.Thread):
+
+    def __init__(self, filename='clf.pkl'):
+        """A thread that loads and warms up the image classifier in the
+        background while the camera and GUI are initialized. The thread is
+        started at instantiation."""
+        super().__init__(daemon=True)
+        self.filename = filename
+        self.clf = None
+        self.error = None
+        self.loadTime = None
+        self.warmUpTime = None
+        self.start()
+
+    def getClassifier(self, block=True):
+        """Returns the classifier. If block is True (default), waits until the
+        classifier is loaded and warmed up. If block is False, returns None if
+        the classifier is not ready yet. Exceptions raised while loading the
+        classifier are raised by this method."""
+        if block:
+            self.join()
+        elif self.is_alive():
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.clf
+
+    def run(self):
+        """Loads and warms up the classifier. Called by the thread."""
+        try:
+            t0 = time.time()
+            clf = loadClassifier(self.filename)
+            self.loadTime = time.time() - t0
+            t0 = time.time()
+            warmUp(clf)
+            self.warmUpTime = time.time() - t0
+            self.clf = clf
+        except Exception as e:
+            self.error = e
+
+    def printTimes(self):
+        """Prints the classifier load and warm-up times."""
+        print('Classifier loaded in {:.2f}s and warmed up in {:.2f}s (in '
+              'background)'.format(self.loadTime, self.warmUpTime))
+
+class ModelRegistry(threading.Thread):
+
+    def __init__(self, path='clf.pkl', interval=2):
+        """A thread that watches a classifier file, or a directory of
+        classifier .pkl files (the most recent file is used), and loads new
+        versions as they appear. Each new version is loaded, validated and
+        warmed up in the background then swapped with the active classifier
+        so that the game loop is never blocked. The previous classifier is
+        kept to allow an instant rollback. The thread is started at
+        instantiation.
+        path: classifier file or directory of classifier files,
+        interval: time in seconds between checks for new versions."""
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.clf = None
+        self.version = None
+        self.previousClf = None
+        self.previousVersion = None
+        self.rejectedVersion = None
+        self.error = None
+        self.loadTime = None
+        self.warmUpTime = None
+        self.ready = threading.Event()
+        self.stopped = threading.Event()
+        self.start()
+
+    def findLatest(self):
+        """Returns the version of the most recent classifier file as a
+        (modification time, size, filename) tuple or None if no file is
+        found."""
+        if os.path.isdir(self.path):
+            filenames = glob(os.path.join(self.path, '*.pkl'))
+        else:
+            filenames = [self.path]
+        latest = None
+        for filename in filenames:
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            version = (stat.st_mtime, stat.st_size, filename)
+            if latest is None or version > latest:
+                latest = version
+        return latest
+
+    def getClassifier(self, block=True):
+        """Returns the active classifier. If block is True (default), waits
+        until a first classifier is loaded. If block is False, returns None if
+        no classifier is ready yet. If the first classifier cannot be loaded,
+        the exception raised while loading it is raised by this method."""
+        if block:
+            self.ready.wait()
+        if self.clf is None and self.error is not None:
+            raise self.error
+        return self.clf
+
+    def load(self, version):
+        """Loads, validates and warms up the classifier file of version and
+        makes it the active classifier. The active classifier becomes the
+        previous classifier."""
+        t0 = time.time()
+        clf = loadClassifier(version[2])
+        self.loadTime = time.time() - t0
+        t0 = time.time()
+        validate(clf)
+        self.warmUpTime = time.time() - t0
+        with self.lock:
+            self.previousClf, self.previousVersion = self.clf, self.version
+            self.clf, self.version = clf, version
+
+    def printTimes(self):
+        """Prints the load and warm-up times of the last classifier loaded."""
+        print('Classifier loaded in {:.2f}s and warmed up in {:.2f}s (in '
+              'background)'.format(self.loadTime, self.warmUpTime))
+
+    def rollback(self):
+        """Swaps the active classifier with the previous one. Returns True if
+        a previous classifier was available, False otherwise."""
+        with self.lock:
+            if self.previousClf is None:
+                return False
+            self.clf, self.previousClf = self.previousClf, self.clf
+            self.version, self.previousVersion = (self.previousVersion,
+                                                  self.version)
+            # Do not reload the version rolled back from until it changes
+            self.rejectedVersion = self.previousVersion
+        print('Rolled back to classifier {}'.format(self.version[2]))
+        return True
+
+    def run(self):
+        """Checks for new classifier versions at regular intervals. Called by
+        the thread."""
+        candidate = None
+        while not self.stopped.is_set():
+            latest = self.findLatest()
+            if latest is None:
+                if self.clf is None:
+                    self.error = FileNotFoundError(
+                        'No classifier file found at {}'.format(self.path))
+                    self.ready.set()
+            elif latest != self.version and latest != self.rejectedVersion:
+                # The first classifier is loaded immediately. New versions are
+                # only loaded once unchanged between two checks so that files
+                # still being written are not read.
+                if self.clf is None or latest == candidate:
+                    try:
+                        self.load(latest)
+                        if self.previousClf is not None:
+                            print('New classifier {} activated'.format(
+                                latest[2]))
+                    except Exception as e:
+                        self.rejectedVersion = latest
+                        self.error = e
+                        print('WARNING: Classifier {} rejected: {}'.format(
+                            latest[2], e))
+                    self.ready.set()
+                candidate = latest
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        """Stops watching for new classifier versions."""
+        self.stopped.set()
@@ -0,0 +1,214 @@
+# profiler.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines the TrainingProfiler class, recording the wall time, CPU
+# time, memory use and array sizes of the successive stages of a training run,
+# and the compareProfiles() function comparing two recorded profiles.
+
+import json
+import os
+import resource
+import time
+
+from rpscv import utils
+
+def compareProfiles(filename1, filename2):
+    """Prints the settings that differ and the stages of two profiles written
+    by TrainingProfiler.save() side by side, with the ratio of their wall
+    times."""
+    profiles = []
+    for filename in [filename1, filename2]:
+        with open(filename, 'r') as f:
+            profiles.append(json.load(f))
+    p1, p2 = profiles
+    print('(1) {} ({})'.format(filename1, p1['date']))
+    print('(2) {} ({})'.format(filename2, p2['date']))
+    for key in sorted(set(p1['info']) | set(p2['info'])):
+        if p1['info'].get(key) != p2['info'].get(key):
+            print('  {}: {} -> {}'.format(key, p1['info'].get(key),
+                                          p2['info'].get(key)))
+
+    stages = [{s['name']: s for s in p['stages']} for p in profiles]
+    names = [s['name'] for s in p1['stages']]
+    names += [s['name'] for s in p2['stages'] if s['name'] not in names]
+    for p, st in zip(profiles, stages):
+        st['total'] = p['total']
+
+    print('  {:<24}{:>10}{:>10}{:>8}{:>10}{:>10}{:>10}{:>10}'.format('stage',
+        'wall (1)', 'wall (2)', 'ratio', 'cpu (1)', 'cpu (2)', 'peak (1)',
+        'peak (2)'))
+    for name in names + ['total']:
+        s1, s2 = stages[0].get(name), stages[1].get(name)
+        cols = []
+        for key, fmt in [('wall', '{:>9.2f}s'), ('cpu', '{:>9.2f}s'),
+                         ('peakRss', '{:>8.0f}MB')]:
+            for s in [s1, s2]:
+                cols.append(fmt.format(s[key]) if s is not None
+                            else '{:>10}'.format('-'))
+        if s1 is not None and s2 is not None and s1['wall'] > 0:
+            ratio = '{:>8.2f}'.format(s2['wall'] / s1['wall'])
+        else:
+            ratio = '{:>8}'.format('-')
+        print('  {:<24}{}{}{}{}{}{}{}'.format(name[:24], cols[0], cols[1],
+                                             ratio, *cols[2:]))
+
+def getChildren(pid):
+    """Returns the process ids of the running descendants of the process pid,
+    on Linux only (empty list otherwise)."""
+    children = []
+    try:
+        for tid in os.listdir('/proc/{}/task'.format(pid)):
+            with open('/proc/{}/task/{}/children'.format(pid, tid), 'r') as f:
+                children += [int(c) for c in f.read().split()]
+    except OSError:
+        return children
+    return children + sum([getChildren(c) for c in children], [])
+
+def getCpuTime():
+    """Returns the CPU time (user + system) in seconds of this process and of
+    its child processes (e.g. grid search jobs), terminated or, on Linux,
+    still running."""
+    total = 0
+    for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]:
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    ticks = os.sysconf('SC_CLK_TCK')
+    for pid in getChildren(os.getpid()):
+        try:
+            with open('/proc/{}/stat'.format(pid), 'r') as f:
+                # Fields after the command name, utime and stime are the 14th
+                # and 15th fields
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / ticks
+        except (OSError, IndexError, ValueError):
+            pass
+    return total
+
+def getMemory():
+    """Returns the current and peak resident set size (RSS) of this process
+    in MB. On Linux, the peak is the peak since the last resetPeakMemory()
+    call, otherwise it is the peak since the process start."""
+    current = None
+    peak = None
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    current = int(line.split()[1]) / 1024
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if peak is None:
+        # ru_maxrss is in kB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return current, peak
+
+def resetPeakMemory():
+    """Resets the peak resident set size of this process, on Linux only."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+class TrainingProfiler():
+
+    def __init__(self, **info):
+        """Records the resources used by the successive stages of a training
+        run. Each call to .mark() ends a stage, which started at the end of the
+        previous stage (or at instantiation), and records its wall time, CPU
+        time (including the grid search worker processes), peak and final
+        resident memory and the size of the arrays it allocated. info are
+        settings of the run saved with the profile (e.g. n_jobs). Wall times
+        are measured with the monotonic time.perf_counter() clock."""
+        self.info = info
+        self.stages = []
+        self.candidates = []
+        self.date = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.initTime = time.perf_counter()
+        self.initCpu = getCpuTime()
+        self.start()
+
+    def getTotal(self):
+        """Returns the totals of the run as a stage dictionary."""
+        rss, peak = getMemory()
+        return {'name': 'total', 'wall': time.perf_counter() - self.initTime,
+                'cpu': getCpuTime() - self.initCpu,
+                'peakRss': max([s['peakRss'] for s in self.stages] + [peak]),
+                'rss': rss}
+
+    def mark(self, name, **arrays):
+        """Records the end of the stage name. arrays are the numpy arrays
+        allocated by the stage, whose shapes, types and sizes are recorded."""
+        rss, peak = getMemory()
+        cpu = getCpuTime()
+        now = time.perf_counter()
+        self.stages.append({
+            'name': name, 'wall': now - self.lastTime,
+            'cpu': cpu - self.lastCpu, 'peakRss': peak, 'rss': rss,
+            'arrays': {key: {'shape': list(a.shape), 'dtype': str(a.dtype),
+                             'MB': a.nbytes / 1e6}
+                       for key, a in arrays.items()}})
+        self.start()
+
+    def recordSearch(self, cvResults):
+        """Records the mean fit and score times and the mean score of each
+        candidate of a grid search cv_results_ dictionary."""
+        for i, params in enumerate(cvResults['params']):
+            self.candidates.append({
+                'params': {k: v.item() if hasattr(v, 'item') else v
+                           for k, v in params.items()},
+                'meanFitTime': float(cvResults['mean_fit_time'][i]),
+                'stdFitTime': float(cvResults['std_fit_time'][i]),
+                'meanScoreTime': float(cvResults['mean_score_time'][i]),
+                'meanTestScore': float(cvResults['mean_test_score'][i])})
+
+    def report(self):
+        """Prints the recorded stages."""
+        print('Training profile:')
+        print('  {:<24}{:>9}{:>9}{:>10}{:>10}  {}'.format('stage', 'wall',
+            'cpu', 'peak RSS', 'RSS', 'arrays'))
+        for s in self.stages + [self.getTotal()]:
+            arrays = ', '.join(['{} {:.1f}MB'.format(k, a['MB'])
+                                for k, a in s.get('arrays', {}).items()])
+            print('  {:<24}{:>8.2f}s{:>8.2f}s{:>8.0f}MB{:>8}  {}'.format(
+                s['name'][:24], s['wall'], s['cpu'], s['peakRss'],
+                '{:.0f}MB'.format(s['rss']) if s['rss'] is not None else '-',
+                arrays))
+
+    def save(self, filename):
+        """Writes the profile to a JSON file."""
+        profile = {'date': self.date, 'info': self.info,
+                   'stages': self.stages, 'total': self.getTotal(),
+                   'candidates': self.candidates}
+        with utils.atomicWrite(filename) as f:
+            json.dump(profile, f, indent=1)
+
+    def start(self):
+        """Starts a new stage."""
+        resetPeakMemory()
+        self.lastTime = time.perf_counter()
+        self.lastCpu = getCpuTime()
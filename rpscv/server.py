@@ -0,0 +1,239 @@
+# server.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This file defines the InferenceServer and InferenceClient classes, to share
+# one classifier between several game stations. The server gathers the
+# requests of its clients into micro-batches predicted at once.
+#
+# Protocol: the client sends the feature vector as nbFeatures uint8 values (the
+# grayscale values, i.e. the features * 255, which is exact for the features
+# of rpscv.imgproc.getGray()). The server answers with the predicted gesture
+# and the timing of the request (see responseFormat).
+
+from collections import namedtuple
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+import traceback
+
+import numpy as np
+
+from rpscv.imgproc import _grayTable
+from rpscv.model import nbFeatures
+
+# Default server address (Unix socket path, or 'host:port' for TCP)
+defaultAddress = '/tmp/rpscv.sock'
+
+# Response: gesture, time in queue, batch prediction time, batch size
+responseFormat = '!bddH'
+# Gesture of the responses to the requests that could not be predicted
+errorGesture = -1
+responseSize = struct.calcsize(responseFormat)
+
+# Prediction result with the server side timing of the request
+Prediction = namedtuple('Prediction', ['gesture', 'queueTime', 'predictTime',
+                                       'batchSize'])
+
+def createSocket(address):
+    """Returns an unconnected socket and its address for the address string:
+    a TCP socket for 'host:port' addresses, a Unix socket otherwise."""
+    if ':' in address:
+        host, port = address.rsplit(':', 1)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, (host, int(port))
+    return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM), address
+
+def recvExactly(sock, buffer):
+    """Receives exactly len(buffer) bytes into buffer. Returns False if the
+    connection was closed."""
+    view = memoryview(buffer)
+    while len(view) > 0:
+        n = sock.recv_into(view)
+        if n == 0:
+            return False
+        view = view[n:]
+    return True
+
+class InferenceClient():
+
+    def __init__(self, address=defaultAddress, timeout=10):
+        """A client of an InferenceServer. Its .predict() method can be used
+        in place of the classifier's. The server side timing of the last
+        request is kept in the last attribute. A socket.timeout error is
+        raised if the server does not answer a request within timeout
+        seconds."""
+        self.sock, sockAddress = createSocket(address)
+        self.sock.settimeout(timeout)
+        self.sock.connect(sockAddress)
+        self.response = bytearray(responseSize)
+        self.last = None
+
+    def close(self):
+        """Closes the connection to the server."""
+        self.sock.close()
+
+    def predict(self, features):
+        """Returns the predicted gestures of the feature vectors, one request
+        per feature vector."""
+        return np.array([self.request(x).gesture for x in features])
+
+    def request(self, features):
+        """Sends one feature vector and returns the Prediction. Raises a
+        RuntimeError if the server failed to predict it."""
+        gray = np.rint(np.asarray(features) * 255).astype(np.uint8)
+        self.sock.sendall(gray.tobytes())
+        if not recvExactly(self.sock, self.response):
+            raise ConnectionError('Connection closed by inference server')
+        self.last = Prediction(*struct.unpack(responseFormat, self.response))
+        if self.last.gesture == errorGesture:
+            raise RuntimeError('Inference server failed to predict the '
+                               'request (see the server output)')
+        return self.last
+
+class InferenceServer(threading.Thread):
+
+    def __init__(self, registry, address=defaultAddress, maxBatch=32,
+                 maxDelay=.005):
+        """A server predicting the gestures of the feature vectors sent by
+        InferenceClient instances over a Unix or TCP socket. A thread per
+        connection receives the requests into a queue. The server thread
+        gathers the queued requests into a batch of up to maxBatch requests,
+        waiting at most maxDelay seconds after the first request, and predicts
+        the batch with a single call to the classifier's predict() method.
+        registry: ModelRegistry providing the active classifier (new
+        classifier versions are used as soon as they are activated),
+        address: Unix socket path or 'host:port' TCP address.
+        If the prediction of a batch fails (e.g. the classifier could not be
+        loaded), the error is printed, the requests of the batch are answered
+        with errorGesture and the server keeps serving.
+        Call .start() to start serving and .stop() to stop."""
+        super().__init__(daemon=True)
+        self.registry = registry
+        self.address = address
+        self.maxBatch = maxBatch
+        self.maxDelay = maxDelay
+        self.requests = queue.Queue()
+        self.stopped = threading.Event()
+        self.nbBatches = 0
+        self.nbRequests = 0
+        self.nbErrors = 0
+        self.sock, sockAddress = createSocket(address)
+        if isinstance(sockAddress, str) and os.path.exists(sockAddress):
+            os.remove(sockAddress)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(sockAddress)
+        self.sock.listen()
+
+    def accept(self):
+        """Accepts client connections and starts their receiving thread."""
+        while not self.stopped.is_set():
+            try:
+                conn, addr = self.sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self.receive, args=(conn,),
+                             daemon=True).start()
+
+    def getBatch(self):
+        """Returns the list of the next batch of queued requests, or None if
+        the server is stopped."""
+        batch = None
+        while batch is None:
+            if self.stopped.is_set():
+                return None
+            try:
+                batch = [self.requests.get(timeout=.1)]
+            except queue.Empty:
+                pass
+        deadline = batch[0][2] + self.maxDelay
+        while len(batch) < self.maxBatch:
+            timeout = deadline - time.perf_counter()
+            try:
+                if timeout > 0:
+                    batch.append(self.requests.get(timeout=timeout))
+                else:
+                    batch.append(self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def receive(self, conn):
+        """Receives the requests of a client connection into the queue."""
+        with conn:
+            while not self.stopped.is_set():
+                gray = np.empty(nbFeatures, dtype=np.uint8)
+                if not recvExactly(conn, gray):
+                    break
+                self.requests.put((conn, gray, time.perf_counter()))
+
+    def run(self):
+        """Predicts the queued requests by batches and sends the responses.
+        Called by the thread."""
+        threading.Thread(target=self.accept, daemon=True).start()
+        features = np.empty((self.maxBatch, nbFeatures), dtype=np.float32)
+        while True:
+            batch = self.getBatch()
+            if batch is None:
+                break
+            n = len(batch)
+            t0 = time.perf_counter()
+            try:
+                for i, (conn, gray, tReceived) in enumerate(batch):
+                    np.take(_grayTable, gray, out=features[i])
+                pred = self.registry.getClassifier().predict(features[:n])
+            except Exception:
+                print('Inference server: prediction of a batch of {} requests '
+                      'failed'.format(n))
+                traceback.print_exc()
+                pred = [errorGesture] * n
+                self.nbErrors += n
+            predictTime = time.perf_counter() - t0
+            for (conn, gray, tReceived), gesture in zip(batch, pred):
+                response = struct.pack(responseFormat, gesture,
+                                       t0 - tReceived, predictTime, n)
+                try:
+                    conn.sendall(response)
+                except OSError:
+                    # Client disconnected
+                    pass
+            self.nbBatches += 1
+            self.nbRequests += n
+
+    def stop(self):
+        """Stops the server and closes its socket."""
+        self.stopped.set()
+        try:
+            # Interrupts the blocking accept()
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        if isinstance(self.address, str) and ':' not in self.address and \
+                os.path.exists(self.address):
+            os.remove(self.address)
@@ -26,7 +26,10 @@
 # This file defines variables and functions to ensure consistancy in capture and
 # naming of images.
 
+import collections
+import contextlib
 import glob
+import os
 import time
 
 import numpy as np
@@ -39,22 +42,45 @@ SCISSORS = 2
 # Define text labels corresponding to gestures
 gestureTxt = {ROCK: 'rock', PAPER: 'paper', SCISSORS: 'scissors'}
 
+# Default target frame rate of the capture and game loops (see RateScheduler)
+loopFrameRate = 15
+
 # Define paths to raw image folders
 imgPathsRaw = {ROCK: './img/rock/', PAPER: './img/paper/',
                SCISSORS: './img/scissors/'}
 
+@contextlib.contextmanager
+def atomicWrite(filename, mode='w'):
+    """Context manager returning a file opened in mode to write the content of
+    filename. The file is written under a temporary name then renamed to
+    filename, so that a running program reading filename never reads a
+    partially written file. The temporary file is removed if writing fails."""
+    tmpFilename = filename + '.tmp'
+    try:
+        with open(tmpFilename, mode) as f:
+            yield f
+        os.replace(tmpFilename, filename)
+    except BaseException:
+        if os.path.exists(tmpFilename):
+            os.remove(tmpFilename)
+        raise
+
 def cameraSetup():
     from rpscv.camera import Camera
     """Returns a camera object with pre-defined settings."""
 
+    from rpscv import imgproc as imp
+
     # Settings
     size = 8
     frameRate = 40
     awbFilename = 'awb_gains.txt'
+    # Capture only the region of the frames kept by imgproc.crop()
+    roi = imp.cropWindow
 
     # Create Camera object
     print("Initializing camera")
-    cam = Camera(size=size, frameRate=frameRate)
+    cam = Camera(size=size, frameRate=frameRate, roi=roi)
 
     # Check if white balance file exists
     if len(glob.glob(awbFilename)) != 0:
@@ -72,6 +98,59 @@ def cameraSetup():
 
     return cam
 
+def backgroundSetup(cam, bgFilename='bg_params.txt'):
+    """Returns the background hue value and threshold used to remove the
+    background of the images, read from bgFilename. If the file does not
+    exist, prompts to perform the background calibration (see
+    doBackgroundCalibration()), otherwise returns the default values."""
+    from rpscv import imgproc as imp
+
+    if len(glob.glob(bgFilename)) != 0:
+        # File exists, read background parameters from file
+        print("Reading background parameters from {}".format(bgFilename))
+        hueValue, threshold = imp.readBackgroundParams(bgFilename)
+        print('Background hue value: {}, threshold: {}'.format(hueValue,
+                                                               threshold))
+        return hueValue, threshold
+    else:
+        # File does not exist. Prompt user to perform background calibration.
+        print("WARNING: No background parameters file found. ")
+        if input("Perform background calibration (Y/n)?\n") != "n":
+            print("Remove any object from the camera field of view.")
+            input("Press any key when ready.\n")
+            return doBackgroundCalibration(cam, bgFilename)
+        return imp.defaultBackgroundParams
+
+def doBackgroundCalibration(cam, bgFilename='bg_params.txt', nbFrames=20):
+    """Fits the background hue value and threshold on nbFrames (cropped)
+    frames of the empty background captured from the camera, writes them to
+    bgFilename and returns them. If the calibration fails (see
+    imgproc.calibrateBackground()), the previous parameters of bgFilename (or
+    the default parameters) are kept and returned."""
+    import cv2
+
+    from rpscv import imgproc as imp
+
+    print('Calibrating background...')
+    images = []
+    for i in range(nbFrames):
+        img = imp.crop(cam.getOpenCVImage())
+        images.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        time.sleep(.05)
+    try:
+        hueValue, threshold = imp.calibrateBackground(images)
+    except ValueError as e:
+        print('Background calibration failed: {}'.format(e))
+        hueValue, threshold = imp.getBackgroundParams(bgFilename)
+        print('Keeping background hue value: {}, threshold: {}'.format(
+            hueValue, threshold))
+        return hueValue, threshold
+    imp.writeBackgroundParams(hueValue, threshold, bgFilename)
+    print('Background hue value: {}, threshold: {}'.format(hueValue,
+                                                           threshold))
+    print('Background parameters written to ' + bgFilename)
+    return hueValue, threshold
+
 class Filter1D:
     """A one dimensional filter class. Useful for real-time filtering of noisy
     time series data such as sensor signal, etc."""
@@ -139,12 +218,14 @@ class Timer:
 
     def __init__(self):
         """A timer that can be used to measure elapsed time, manage time steps
-        in loops, control execution times, etc.
+        in loops, control execution times, etc. The timer uses the monotonic
+        time.perf_counter() clock so that it is not affected by system clock
+        adjustments.
         The constructor, starts the timer at instantiation."""
         self.paused = False
         self.pauseInitTime = None
         self.pauseElapsed = 0
-        self.initTime = time.time()
+        self.initTime = time.perf_counter()
 
     def getElapsed(self):
         """Returns the time elapsed since instantiation or last reset minus sum
@@ -152,7 +233,7 @@ class Timer:
         if self.paused:
             return self.pauseInitTime - self.initTime - self.pauseElapsed
         else:
-            return time.time() - self.initTime - self.pauseElapsed
+            return time.perf_counter() - self.initTime - self.pauseElapsed
 
     def isWithin(self, delay):
         """Returns True if elapsed time is within (less than) delay argument.
@@ -165,7 +246,7 @@ class Timer:
 
     def pause(self):
         """Pauses the timer."""
-        self.pauseInitTime = time.time()
+        self.pauseInitTime = time.perf_counter()
         self.paused = True
 
     def reset(self):
@@ -173,12 +254,12 @@ class Timer:
         self.paused = False
         self.pauseInitTime = None
         self.pauseElapsed = 0
-        self.initTime = time.time()
+        self.initTime = time.perf_counter()
 
     def resume(self):
         """Resumes the timer following call to .pause() method."""
         if self.paused:
-            self.pauseElapsed += time.time() - self.pauseInitTime
+            self.pauseElapsed += time.perf_counter() - self.pauseInitTime
             self.paused = False
         else:
             print("Warning: Timer.resume() called without prior call to Timer.pause()")
@@ -186,8 +267,109 @@ class Timer:
     def sleepToElapsed(self, delay, reset = True):
         """Sleeps until elapsed time reaches delay argument. If reset argument
         is set to True (default), the timer will also be reset. This method is
-        useful to control fixed time steps in loops."""
-        if self.getElapsed() < delay:
-            time.sleep(delay - self.getElapsed())
+        useful to control fixed time steps in loops. If the delay is not yet
+        reached, the timer is reset to the time the delay ended rather than to
+        the time the sleep returns so that the sleep overshoot does not
+        accumulate over the loop iterations (see also RateScheduler)."""
+        elapsed = self.getElapsed()
+        if elapsed < delay:
+            deadline = self.initTime + self.pauseElapsed + delay
+            time.sleep(delay - elapsed)
         if reset:
             self.reset()
+            if elapsed < delay:
+                self.initTime = deadline
+
+class StageTimer:
+
+    def __init__(self, initTime=None):
+        """A timer recording the duration of successive named stages, e.g. to
+        report the time taken by each step of a program startup. initTime is
+        the time.time() value at which the first stage started. If not
+        specified, the first stage starts at instantiation."""
+        if initTime is None:
+            initTime = time.time()
+        self.initTime = initTime
+        self.lastTime = initTime
+        self.stages = []
+
+    def getTotal(self):
+        """Returns the time elapsed between the start of the first stage and
+        the end of the last recorded stage."""
+        return self.lastTime - self.initTime
+
+    def mark(self, name):
+        """Records the end of the stage name. The stage is considered to have
+        started at the end of the previous stage."""
+        now = time.time()
+        self.stages.append((name, now - self.lastTime))
+        self.lastTime = now
+
+    def report(self, title='Startup times'):
+        """Prints the duration of each recorded stage and the total time."""
+        print('{}:'.format(title))
+        for name, duration in self.stages:
+            print('  {}: {:.2f}s'.format(name, duration))
+        print('  total: {:.2f}s'.format(self.getTotal()))
+
+class RateScheduler:
+
+    def __init__(self, frameRate, nbSamples=1000):
+        """A scheduler pacing a loop at a fixed frame rate. The .wait() method,
+        called once per iteration, sleeps until the next deadline. Deadlines
+        are absolute times spaced by 1 / frameRate on the monotonic
+        time.perf_counter() clock, so that the loop rate does not drift with
+        the processing time and sleep overshoot of each iteration. When an
+        iteration ends after one or more deadlines, the missed frames are
+        skipped instead of running the next iterations back to back to catch
+        up. The lateness of each frame with respect to its deadline (jitter)
+        is recorded for the last nbSamples frames."""
+        self.period = 1 / frameRate
+        self.nbSamples = nbSamples
+        self.reset()
+
+    def getStats(self):
+        """Returns a dictionary with the number of frames and skipped frames
+        and the mean, 99th percentile and maximum jitter in seconds."""
+        jitter = np.array(self.jitter)
+        if jitter.size == 0:
+            jitter = np.zeros(1)
+        return {'frames': self.nbFrames, 'skipped': self.nbSkipped,
+                'mean': jitter.mean(), 'p99': np.percentile(jitter, 99),
+                'max': jitter.max()}
+
+    def report(self, title='Frame pacing'):
+        """Prints the target frame rate, the number of frames and skipped
+        frames and the jitter statistics."""
+        stats = self.getStats()
+        print('{} ({:.1f}fps target): {} frames, {} skipped, jitter mean '
+              '{:.2f}ms, p99 {:.2f}ms, max {:.2f}ms'.format(title,
+            1 / self.period, stats['frames'], stats['skipped'],
+            1000 * stats['mean'], 1000 * stats['p99'], 1000 * stats['max']))
+
+    def reset(self):
+        """Clears the statistics. The next call to .wait() returns
+        immediately and starts a new series of deadlines."""
+        self.deadline = None
+        self.nbFrames = 0
+        self.nbSkipped = 0
+        self.jitter = collections.deque(maxlen=self.nbSamples)
+
+    def wait(self):
+        """Sleeps until the next deadline and returns the number of frames
+        skipped because their deadline was already missed (0 if the loop is
+        on time)."""
+        now = time.perf_counter()
+        if self.deadline is None:
+            self.deadline = now
+        elif now < self.deadline:
+            time.sleep(self.deadline - now)
+            now = time.perf_counter()
+        # Skip to the last deadline already reached
+        skipped = int((now - self.deadline) // self.period)
+        self.deadline += skipped * self.period
+        self.nbSkipped += skipped
+        self.nbFrames += 1
+        self.jitter.append(now - self.deadline)
+        self.deadline += self.period
+        return skipped
@@ -0,0 +1,78 @@
+# server.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This script runs the inference server (rpscv.server) so that several game
+# stations share one classifier. Start the games with play.py --server=<address>.
+# Command line arguments:
+#   address: Unix socket path or host:port TCP address (default /tmp/rpscv.sock)
+#   --max-batch=<n>: maximum number of requests predicted at once (default 32)
+#   --max-delay=<ms>: maximum time to wait for requests to fill a batch after
+#                     the first one, in milliseconds (default 5)
+# The classifier file clf.pkl is watched and new versions are used as soon as
+# they are loaded.
+
+import sys
+import time
+
+from rpscv.model import ModelRegistry
+from rpscv.server import InferenceServer, defaultAddress
+
+if __name__ == '__main__':
+
+    address = defaultAddress
+    maxBatch = 32
+    maxDelay = 5
+
+    # Read command line arguments
+    for arg in sys.argv[1:]:
+        if arg.startswith('--max-batch='):
+            maxBatch = int(arg.split('=', 1)[1])
+        elif arg.startswith('--max-delay='):
+            maxDelay = float(arg.split('=', 1)[1])
+        else:
+            address = arg
+
+    registry = ModelRegistry('clf.pkl')
+    registry.getClassifier()
+    registry.printTimes()
+
+    server = InferenceServer(registry, address, maxBatch, maxDelay / 1000)
+    server.start()
+    print('Inference server listening on {}'.format(address))
+
+    try:
+        while True:
+            nbRequests = server.nbRequests
+            nbBatches = server.nbBatches
+            time.sleep(10)
+            if server.nbBatches > nbBatches:
+                n = server.nbRequests - nbRequests
+                print('{:.1f} requests/s, {:.1f} requests/batch'.format(n / 10,
+                    n / (server.nbBatches - nbBatches)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        registry.stop()
@@ -0,0 +1,161 @@
+# test_compact.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Tests of the reduced precision classifier of rpscv.compact and of the
+# agreement gate of compress.py, run on synthetic feature vectors.
+
+import numpy as np
+import pytest
+from sklearn.decomposition import PCA
+from sklearn.pipeline import Pipeline
+from sklearn.svm import SVC
+
+import compress
+from rpscv.compact import CompactClassifier, agreement, pruneSupportVectors
+
+def makeData(rs, nbPerClass=60, nbFeatures=200):
+    """Returns synthetic feature vectors of three classes and their labels."""
+    centers = rs.uniform(0, 1, (3, nbFeatures))
+    features = np.concatenate([c + .3 * rs.randn(nbPerClass, nbFeatures)
+                               for c in centers])
+    labels = np.repeat(np.arange(3), nbPerClass)
+    return features.astype(np.float32), labels
+
+@pytest.fixture(scope='module')
+def data():
+    rs = np.random.RandomState(42)
+    return makeData(rs)
+
+@pytest.fixture(scope='module', params=[False, True], ids=['', 'whiten'])
+def clf(request, data):
+    features, labels = data
+    clf = Pipeline([('pca', PCA(n_components=20, whiten=request.param,
+                                random_state=42)),
+                    ('clf', SVC(gamma=.01, C=10,
+                                decision_function_shape='ovo'))])
+    return clf.fit(features, labels)
+
+def test_float32_decision(clf, data):
+    features, labels = data
+    compact = CompactClassifier(clf, 'float32')
+    assert np.allclose(compact.decisionFunction(features),
+                       clf.decision_function(features), atol=1e-3)
+    assert np.array_equal(compact.predict(features), clf.predict(features))
+
+def test_single_feature_vector(clf, data):
+    features, labels = data
+    compact = CompactClassifier(clf, 'float32')
+    assert compact.predict(features[0]).shape == (1,)
+    assert compact.decisionFunction(features[0]).shape == (1, 3)
+
+@pytest.mark.parametrize('dtype', ['float16', 'int8'])
+def test_reduced_precision(clf, data, dtype):
+    features, labels = data
+    reference = CompactClassifier(clf, 'float32')
+    compact = CompactClassifier(clf, dtype, blockSize=64)
+    assert compact.getNbytes() < reference.getNbytes()
+    assert agreement(clf, compact, features) >= compress.minAgreement
+
+def test_invalid_dtype(clf):
+    with pytest.raises(ValueError):
+        CompactClassifier(clf, 'int16')
+
+def test_unsupported_kernel(data):
+    features, labels = data
+    clf = Pipeline([('pca', PCA(n_components=5)),
+                    ('clf', SVC(kernel='linear'))]).fit(features, labels)
+    with pytest.raises(ValueError):
+        CompactClassifier(clf)
+
+def test_agreement(data):
+    features, labels = data
+
+    class Constant:
+
+        def __init__(self, gesture):
+            self.gesture = gesture
+
+        def predict(self, features):
+            return np.full(len(features), self.gesture)
+
+    assert agreement(Constant(0), Constant(0), features, batchSize=7) == 1
+    assert agreement(Constant(0), Constant(1), features, batchSize=7) == 0
+
+def test_validate_gate(clf, data):
+    features, labels = data
+    compact = CompactClassifier(clf, 'float32')
+    assert compress.validate(clf, compact, features, nbLatency=2)
+    assert not compress.validate(clf, compact, features, minAgreement=1.01,
+                                 nbLatency=2)
+
+def test_prune_zero_radius(clf, data):
+    features, labels = data
+    compact = CompactClassifier(clf, 'float32')
+    pruned = pruneSupportVectors(compact, 0)
+    assert pruned.getNbSupportVectors() == compact.getNbSupportVectors()
+    assert np.allclose(pruned.decisionFunction(features),
+                       compact.decisionFunction(features), atol=1e-5)
+
+def test_prune_duplicates(clf, data):
+    """Duplicated support vectors are merged into a single vector with the
+    sum of their coefficients, leaving the decision function unchanged."""
+    features, labels = data
+    compact = CompactClassifier(clf, 'float32')
+    duplicated = CompactClassifier(clf, 'float32')
+    start = np.concatenate([[0], np.cumsum(compact.nSupport)])
+    sv = []
+    coef = []
+    for c in range(3):
+        s = slice(start[c], start[c + 1])
+        sv += [compact.supportVectors[s]] * 2
+        coef += [compact.dualCoef[:, s] / 2] * 2
+    duplicated.supportVectors = np.concatenate(sv)
+    duplicated.dualCoef = np.concatenate(coef, axis=1)
+    duplicated.nSupport = 2 * compact.nSupport
+    assert np.allclose(duplicated.decisionFunction(features),
+                       compact.decisionFunction(features), atol=1e-4)
+
+    pruned = pruneSupportVectors(duplicated, 1e-3)
+    assert np.array_equal(pruned.nSupport, compact.nSupport)
+    assert np.allclose(pruned.decisionFunction(features),
+                       compact.decisionFunction(features), atol=1e-4)
+    # The classifier passed is not modified
+    assert duplicated.getNbSupportVectors() == 2 * compact.getNbSupportVectors()
+
+def test_prune_radius(clf, data):
+    features, labels = data
+    compact = CompactClassifier(clf, 'float32')
+    counts = [pruneSupportVectors(compact, r).getNbSupportVectors()
+              for r in [0, 1, 5, 1e6]]
+    assert counts == sorted(counts, reverse=True)
+    # An infinite radius keeps one support vector per class
+    assert counts[-1] == 3
+
+@pytest.mark.parametrize('dtype', ['float16', 'int8'])
+def test_prune_keeps_dtype(clf, data, dtype):
+    features, labels = data
+    pruned = pruneSupportVectors(CompactClassifier(clf, dtype), 1)
+    assert pruned.supportVectors.dtype == dtype
+    assert agreement(clf, pruned, features) >= compress.minAgreement
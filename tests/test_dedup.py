@@ -0,0 +1,153 @@
+# test_dedup.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Tests of the near-duplicate image index of rpscv.dedup, run on synthetic
+# images and hashes.
+
+import cv2
+import numpy as np
+import pytest
+
+from rpscv import dedup
+from rpscv import imgproc as imp
+from rpscv.dedup import DuplicateIndex
+
+def makeImage(center=(150, 100), angle=20):
+    """Returns a synthetic RGB image of a hand-like blob on a green
+    background."""
+    img = np.empty(imp.imshape, dtype=np.uint8)
+    img[:] = (60, 160, 40)
+    cv2.ellipse(img, center, (60, 80), angle, 0, 360, (210, 150, 120), -1)
+    cv2.circle(img, (center[0] + 40, center[1] - 60), 20, (90, 60, 40), -1)
+    return img
+
+def test_hammingDistance():
+    hashes = np.array([0, 1, 0b1011, 2 ** 64 - 1], dtype=np.uint64)
+    assert dedup.hammingDistance(0, hashes).tolist() == [0, 1, 3, 64]
+    assert dedup.hammingDistance(2 ** 64 - 1, hashes).tolist() == [64, 63,
+                                                                  61, 0]
+
+def test_imageHash():
+    img = makeImage()
+    h = dedup.imageHash(img)
+    assert 0 <= h < 2 ** 64
+    assert dedup.imageHash(img.copy()) == h
+    # A small shift changes only a few bits, a different pose many more
+    shifted = dedup.imageHash(makeImage(center=(152, 101)))
+    other = dedup.imageHash(makeImage(center=(80, 60), angle=100))
+    assert dedup.hammingDistance(h, [shifted])[0] <= 4
+    assert dedup.hammingDistance(h, [other])[0] > 4
+
+def test_append_grows():
+    index = DuplicateIndex(filename=None, capacity=2)
+    index.append([1, 2, 3], [0, 0, 1], ['a', 'b', 'c'])
+    index.append([4], [2], ['d'])
+    assert len(index) == 4
+    assert index.hashes[:4].tolist() == [1, 2, 3, 4]
+    assert index.labels[:4].tolist() == [0, 0, 1, 2]
+    assert index.files == ['a', 'b', 'c', 'd']
+
+def test_findHashDuplicates():
+    index = DuplicateIndex(filename=None, maxDistance=2)
+    index.append([0b0000, 0b0011, 0b0111, 0b0001], [0, 0, 0, 1],
+                 ['a', 'b', 'c', 'd'])
+    assert index.findHashDuplicates(0, 0) == ['a', 'b']
+    # Images of other gestures are never duplicates
+    assert index.findHashDuplicates(0, 1) == ['d']
+    assert index.findHashDuplicates(0, 0, end=1) == ['a']
+    assert index.findHashDuplicates(0b1111000, 0) == []
+
+def test_getDuplicates():
+    """Each near-duplicate is mapped to the first kept image it duplicates,
+    so that chains of small differences do not remove distinct images."""
+    index = DuplicateIndex(filename=None, maxDistance=2)
+    index.append([0b0, 0b11, 0b1111, 0b111111, 0b1],
+                 [0, 0, 0, 0, 1], ['a', 'b', 'c', 'd', 'e'])
+    assert index.getDuplicates() == {'b': 'a', 'd': 'c'}
+
+def test_save_load(tmp_path):
+    filename = str(tmp_path / 'hashes.json')
+    index = DuplicateIndex(filename)
+    index.append([0, 2 ** 64 - 1], [1, 2], ['a', 'b'])
+    index.save()
+    loaded = DuplicateIndex(filename)
+    assert loaded.files == ['a', 'b']
+    assert loaded.labels[:2].tolist() == [1, 2]
+    assert loaded.hashes[:2].tolist() == [0, 2 ** 64 - 1]
+
+def test_imageHash_bgParams():
+    img = makeImage()
+    assert dedup.imageHash(img, bgParams=imp.defaultBackgroundParams) == \
+        dedup.imageHash(img, bgParams=list(imp.defaultBackgroundParams))
+    # A background hue far from the green background keeps it in the hash
+    assert dedup.imageHash(img, bgParams=(63, 17)) != \
+        dedup.imageHash(img, bgParams=(150, 17))
+
+def test_load_other_bgParams(tmp_path):
+    """An index hashed with other background parameters is not loaded, so
+    that all the images are hashed again."""
+    filename = str(tmp_path / 'hashes.json')
+    index = DuplicateIndex(filename, bgParams=(63, 17))
+    index.append([1, 2], [0, 1], ['a', 'b'])
+    index.save()
+    assert len(DuplicateIndex(filename, bgParams=(63, 17))) == 2
+    assert len(DuplicateIndex(filename, bgParams=(55, 17))) == 0
+
+@pytest.fixture
+def imageFolders(monkeypatch):
+    """Replaces the raw image folders by a dictionary of filenames per
+    gesture and the image decoder by synthetic images."""
+    folders = {0: ['r0', 'r1'], 1: ['p0'], 2: []}
+    decoded = []
+
+    def decodeImage(filename):
+        decoded.append(filename)
+        return makeImage(center=(100 + 10 * len(decoded), 100))
+
+    monkeypatch.setattr(imp, 'getImageFiles', lambda g: list(folders[g]))
+    monkeypatch.setattr(imp, 'decodeImage', decodeImage)
+    return folders, decoded
+
+def test_update(tmp_path, imageFolders):
+    folders, decoded = imageFolders
+    filename = str(tmp_path / 'hashes.json')
+    index = DuplicateIndex(filename)
+    assert index.update() == 3
+    assert index.nbRemoved == 0
+    assert sorted(decoded) == ['p0', 'r0', 'r1']
+
+    # Only new images are hashed, deleted and relabeled images are removed
+    folders[0].remove('r0')
+    folders[0].remove('r1')
+    folders[2].append('r1')
+    folders[1].append('p1')
+    del decoded[:]
+    index = DuplicateIndex(filename)
+    assert index.update() == 2
+    assert index.nbRemoved == 2
+    assert sorted(decoded) == ['p1', 'r1']
+    assert sorted(zip(index.files, index.labels[:len(index)].tolist())) == \
+        [('p0', 1), ('p1', 1), ('r1', 2)]
+    assert DuplicateIndex(filename).files == index.files
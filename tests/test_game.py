@@ -0,0 +1,177 @@
+# test_game.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Tests of the RPSGame state machine of rpscv.game, run on a fake clock.
+
+import random
+
+import pytest
+
+from rpscv import game
+from rpscv.game import PRIVACY, PLAY, RESULT, GAMEOVER, DONE
+
+class FakeClock:
+
+    def __init__(self):
+        """A fake time.perf_counter() clock advanced manually by the tests.
+        Calls to time.sleep() advance the clock without sleeping."""
+        self.now = 1000.
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, delay):
+        self.now += delay
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(game.utils.time, 'perf_counter', clock)
+    monkeypatch.setattr(game.utils.time, 'sleep', clock.advance)
+    return clock
+
+def setComputerGesture(monkeypatch, gesture):
+    monkeypatch.setattr(random, 'randint', lambda a, b: gesture)
+
+def playRound(g, gesture):
+    """Feeds the same gesture for nbSuccessive frames and returns the Round
+    played."""
+    for i in range(g.nbSuccessive - 1):
+        assert g.update(gesture) is None
+    return g.update(gesture)
+
+@pytest.mark.parametrize('player, computer, winner', [
+    (0, 0, 'tie'), (0, 1, 'computer'), (0, 2, 'player'),
+    (1, 0, 'player'), (1, 1, 'tie'), (1, 2, 'computer'),
+    (2, 0, 'computer'), (2, 1, 'player'), (2, 2, 'tie')])
+def test_getWinner(player, computer, winner):
+    assert game.getWinner(player, computer) == winner
+
+def test_initial_state(clock):
+    assert game.RPSGame().state == PLAY
+    g = game.RPSGame(privacy=True, privacyDelay=10)
+    assert g.state == PRIVACY
+    assert g.isPaused()
+
+def test_privacy_delay(clock):
+    g = game.RPSGame(privacy=True, privacyDelay=10)
+    clock.advance(9.9)
+    g.update(None)
+    assert g.state == PRIVACY
+    clock.advance(.1)
+    g.update(None)
+    assert g.state == PLAY
+    assert g.stateChanged
+    assert g.previousState == PRIVACY
+
+def test_nbSuccessive(clock, monkeypatch):
+    setComputerGesture(monkeypatch, 0)
+    g = game.RPSGame(nbSuccessive=3)
+    assert g.update(1) is None
+    assert g.update(1) is None
+    # A different gesture restarts the count
+    assert g.update(2) is None
+    assert g.update(2) is None
+    # No hand restarts the count
+    assert g.update(None) is None
+    assert g.update(2) is None
+    assert g.update(2) is None
+    rnd = g.update(2)
+    assert rnd == game.Round(2, 0, 'computer')
+    assert g.state == RESULT
+    assert (g.plScore, g.coScore) == (0, 1)
+
+def test_played_guard(clock, monkeypatch):
+    """A single series of identical predictions plays only one round, even
+    if it continues past the end of the result pause."""
+    setComputerGesture(monkeypatch, 2)
+    g = game.RPSGame(resultDelay=3, nbSuccessive=3)
+    assert playRound(g, 1) == game.Round(1, 2, 'computer')
+    for i in range(10):
+        clock.advance(1)
+        assert g.update(1) is None
+    assert g.state == PLAY
+    assert g.coScore == 1
+    # Changing gesture allows the next round
+    assert playRound(g, 0) == game.Round(0, 2, 'player')
+    assert (g.plScore, g.coScore) == (1, 1)
+
+def test_no_round_during_pause(clock, monkeypatch):
+    setComputerGesture(monkeypatch, 0)
+    g = game.RPSGame(resultDelay=3, nbSuccessive=3)
+    playRound(g, 1)
+    g.update(None)
+    assert playRound(g, 2) is None
+    assert g.state == RESULT
+    # The round is played as soon as the pause ends
+    clock.advance(3)
+    assert g.update(2) == game.Round(2, 0, 'computer')
+
+def test_game_over(clock, monkeypatch):
+    setComputerGesture(monkeypatch, 0)
+    g = game.RPSGame(endScore=2, resultDelay=3, gameOverDelay=3.5)
+    for gesture in [1, 1]:
+        g.update(None)
+        playRound(g, gesture)
+        assert g.state == RESULT
+        clock.advance(3)
+        g.update(None)
+    assert g.state == GAMEOVER
+    assert g.isOver()
+    assert g.winner() == 'player'
+    clock.advance(3.4)
+    g.update(None)
+    assert g.state == GAMEOVER
+    clock.advance(.1)
+    g.update(None)
+    assert g.state == DONE
+    assert not g.isPaused()
+    # No round is played once the game is done
+    assert playRound(g, 1) is None
+    assert (g.plScore, g.coScore) == (2, 0)
+
+def test_loop(clock, monkeypatch):
+    setComputerGesture(monkeypatch, 0)
+    g = game.RPSGame(endScore=1, resultDelay=3, gameOverDelay=3.5,
+                     privacy=True, privacyDelay=10, loop=True)
+    clock.advance(10)
+    playRound(g, 2)
+    clock.advance(3)
+    g.update(None)
+    assert g.state == GAMEOVER
+    assert g.winner() == 'computer'
+    clock.advance(3.5)
+    g.update(None)
+    # A new game starts with the privacy notice
+    assert g.state == PRIVACY
+    assert (g.plScore, g.coScore) == (0, 0)
+
+def test_winner_tie(clock):
+    g = game.RPSGame()
+    assert g.winner() == 'computer'
+    g.plScore, g.coScore = 3, 3
+    assert g.winner() == 'computer'
+    g.plScore = 4
+    assert g.winner() == 'player'
@@ -0,0 +1,133 @@
+# test_gridcache.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Tests of the invalidation of the grid search cache keys of rpscv.gridcache,
+# run on synthetic feature vectors.
+
+import numpy as np
+import pytest
+from sklearn.decomposition import PCA
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.svm import SVC
+
+from rpscv.distributed import DistributedGridSearch
+from rpscv.gridcache import GridCache, estimatorFingerprint, fingerprint
+
+def makeData(rs=0):
+    rand = np.random.RandomState(rs)
+    X = rand.randn(60, 8).astype(np.float32)
+    y = np.repeat(np.arange(3), 20)
+    X[:, 0] += y
+    return X, y
+
+def makePipeline():
+    return Pipeline([('pca', PCA(n_components=4)), ('clf', SVC())])
+
+def test_fingerprint_data():
+    X, y = makeData()
+    key = fingerprint(X, y)
+    assert fingerprint(X.copy(), y.copy()) == key
+    # Fortran ordered copy of the same data
+    assert fingerprint(np.asfortranarray(X), y) == key
+    X2 = X.copy()
+    X2[10, 3] += 1e-3
+    assert fingerprint(X2, y) != key
+    y2 = y.copy()
+    y2[[0, 59]] = y2[[59, 0]]
+    assert fingerprint(X, y2) != key
+    assert fingerprint(X.astype(np.float64), y) != key
+    assert fingerprint(X.reshape(30, 16), y) != key
+
+def test_fingerprint_cv():
+    key = fingerprint(StratifiedKFold(5), 'f1_micro', '1.0')
+    assert fingerprint(StratifiedKFold(5), 'f1_micro', '1.0') == key
+    assert fingerprint(StratifiedKFold(4), 'f1_micro', '1.0') != key
+    assert fingerprint(StratifiedKFold(5, shuffle=True, random_state=0),
+                       'f1_micro', '1.0') != key
+    assert fingerprint(StratifiedKFold(5), 'accuracy', '1.0') != key
+    assert fingerprint(StratifiedKFold(5), 'f1_micro', '1.1') != key
+
+def test_estimatorFingerprint():
+    key = estimatorFingerprint(makePipeline())
+    assert estimatorFingerprint(makePipeline()) == key
+    assert estimatorFingerprint(makePipeline().set_params(clf__C=2)) != key
+    assert estimatorFingerprint(
+        makePipeline().set_params(pca__n_components=5)) != key
+    other = Pipeline([('pca', PCA(n_components=4)),
+                      ('clf', SVC(kernel='rbf', probability=True))])
+    assert estimatorFingerprint(other) != key
+
+def test_taskKey():
+    cache = GridCache('unused.json')
+    X, y = makeData()
+    dataKey = fingerprint(X, y)
+    cvKey = fingerprint(StratifiedKFold(5), None, '1.0')
+    key = cache.taskKey(dataKey, cvKey, makePipeline(), 0)
+    assert cache.taskKey(dataKey, cvKey, makePipeline(), 0) == key
+    assert cache.taskKey(dataKey, cvKey, makePipeline(), 1) != key
+    assert cache.taskKey(fingerprint(*makeData(1)), cvKey, makePipeline(),
+                         0) != key
+    assert cache.taskKey(dataKey, fingerprint(StratifiedKFold(4), None, '1.0'),
+                         makePipeline(), 0) != key
+
+def test_save_load(tmp_path):
+    filename = str(tmp_path / 'grid_cache.json')
+    cache = GridCache(filename)
+    cache.put('a', {'score': np.float64(.5), 'fitTime': 1, 'scoreTime': 2,
+                    'worker': 'local'})
+    assert cache.get('b') is None
+    cache.save()
+    loaded = GridCache(filename)
+    assert loaded.get('a') == {'score': .5, 'fitTime': 1., 'scoreTime': 2.}
+    assert loaded.nbHits == 1
+
+def search(X, y, cache, grid={'clf__C': [1, 10]}):
+    return DistributedGridSearch(makePipeline(), grid, [], cv=3,
+                                 cache=cache).fit(X, y)
+
+def test_grid_search_cache(tmp_path):
+    """A rerun on the same data only computes the new parameter combinations
+    and a change of the data invalidates all cached tasks."""
+    filename = str(tmp_path / 'grid_cache.json')
+    X, y = makeData()
+    first = search(X, y, GridCache(filename))
+    assert first.cache.nbHits == 0
+
+    cache = GridCache(filename)
+    second = search(X, y, cache)
+    assert cache.nbHits == 6
+    assert np.array_equal(second.cv_results_['mean_test_score'],
+                          first.cv_results_['mean_test_score'])
+
+    cache = GridCache(filename)
+    search(X, y, cache, grid={'clf__C': [1, 10, 100]})
+    assert cache.nbHits == 6
+
+    cache = GridCache(filename)
+    X2 = X.copy()
+    X2[0, 0] += 1
+    search(X2, y, cache)
+    assert cache.nbHits == 0
@@ -0,0 +1,58 @@
+# test_imgproc.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Tests of the feature extraction functions of rpscv.imgproc.
+
+import cv2
+import numpy as np
+import pytest
+
+from rpscv import imgproc as imp
+
+def makeImage(rs=0):
+    """Returns a synthetic BGR image: a hand-like blob on a noisy green
+    background, with random pixels of all hues."""
+    rand = np.random.RandomState(rs)
+    img = np.empty(imp.imshape, dtype=np.uint8)
+    img[:] = (40, 160, 60)
+    img += rand.randint(0, 40, img.shape).astype(np.uint8)
+    cv2.ellipse(img, (150, 100), (60, 80), 20, 0, 360, (120, 150, 210), -1)
+    img[:20] = rand.randint(0, 256, img[:20].shape)
+    return img
+
+@pytest.mark.parametrize('hueValue', [10, 63, 100])
+@pytest.mark.parametrize('threshold', [0, 5, 17])
+def test_getGrayBGR_matches_getGray(hueValue, threshold):
+    img = makeImage()
+    expected = imp.getGray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), hueValue,
+                           threshold)
+    assert np.array_equal(imp.getGrayBGR(img, hueValue, threshold), expected)
+
+def test_getGrayBGR_out():
+    img = makeImage(1)
+    out = np.empty(img.shape[0] * img.shape[1], dtype=np.float32)
+    assert imp.getGrayBGR(img, 63, 17, out=out) is out
+    assert np.array_equal(out, imp.getGray(cv2.cvtColor(img,
+                                           cv2.COLOR_BGR2RGB), 63, 17))
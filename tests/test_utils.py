@@ -0,0 +1,139 @@
+# test_utils.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Tests of the loop pacing of rpscv.utils (RateScheduler and
+# Timer.sleepToElapsed()), run on a fake clock with sleep overshoot.
+
+import pytest
+
+from rpscv import utils
+
+class FakeClock:
+
+    def __init__(self, overshoot=0.):
+        """A fake time.perf_counter() clock advanced by the tests and by the
+        fake time.sleep(), which returns overshoot seconds late as a real
+        sleep does."""
+        self.now = 1000.
+        self.overshoot = overshoot
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, delay):
+        self.now += delay
+
+    def sleep(self, delay):
+        assert delay >= 0
+        self.sleeps.append(delay)
+        self.now += delay + self.overshoot
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(overshoot=.002)
+    monkeypatch.setattr(utils.time, 'perf_counter', clock)
+    monkeypatch.setattr(utils.time, 'sleep', clock.sleep)
+    return clock
+
+def test_scheduler_no_drift(clock):
+    """The deadlines are absolute, so that the processing time and the sleep
+    overshoot of each frame do not accumulate."""
+    scheduler = utils.RateScheduler(50)
+    scheduler.wait()
+    t0 = clock.now
+    for i in range(1000):
+        clock.advance(.005)
+        assert scheduler.wait() == 0
+    # 1000 periods plus the overshoot of the last sleep only
+    assert clock.now - t0 == pytest.approx(1000 * .02 + .002)
+    stats = scheduler.getStats()
+    assert stats['frames'] == 1001
+    assert stats['skipped'] == 0
+    assert stats['max'] == pytest.approx(.002)
+
+def test_scheduler_skips_late_frames(clock):
+    scheduler = utils.RateScheduler(10)
+    scheduler.wait()
+    t0 = clock.now
+    # Processing 2.5 periods long: the frame of the first deadline is
+    # skipped and the frame of the second deadline runs late
+    clock.advance(.25)
+    assert scheduler.wait() == 1
+    assert clock.sleeps == []
+    # The next deadline stays on the original grid
+    clock.advance(.01)
+    assert scheduler.wait() == 0
+    assert clock.now - t0 == pytest.approx(.3 + .002)
+    stats = scheduler.getStats()
+    assert stats['skipped'] == 1
+    assert stats['max'] == pytest.approx(.05)
+
+def test_scheduler_reset(clock):
+    scheduler = utils.RateScheduler(10, nbSamples=3)
+    for i in range(5):
+        scheduler.wait()
+    assert len(scheduler.jitter) == 3
+    scheduler.reset()
+    stats = scheduler.getStats()
+    assert (stats['frames'], stats['skipped'], stats['max']) == (0, 0, 0)
+    # The first wait after a reset returns immediately
+    clock.advance(10)
+    t = clock.now
+    assert scheduler.wait() == 0
+    assert clock.now == t
+
+def test_sleepToElapsed_no_drift(clock):
+    timer = utils.Timer()
+    t0 = clock.now
+    for i in range(100):
+        clock.advance(.01)
+        timer.sleepToElapsed(.05)
+    assert clock.now - t0 == pytest.approx(100 * .05 + .002)
+    # The timer restarts at the end of the delay, not when the sleep returns
+    assert timer.getElapsed() == pytest.approx(.002)
+
+def test_sleepToElapsed_late(clock):
+    timer = utils.Timer()
+    clock.advance(.08)
+    timer.sleepToElapsed(.05)
+    assert clock.sleeps == []
+    assert timer.getElapsed() == 0
+
+def test_sleepToElapsed_no_reset(clock):
+    timer = utils.Timer()
+    clock.advance(.01)
+    timer.sleepToElapsed(.05, reset=False)
+    assert timer.getElapsed() == pytest.approx(.052)
+
+def test_sleepToElapsed_paused(clock):
+    timer = utils.Timer()
+    timer.pause()
+    clock.advance(1)
+    timer.resume()
+    clock.advance(.01)
+    timer.sleepToElapsed(.05)
+    assert clock.sleeps == [pytest.approx(.04)]
+    assert timer.getElapsed() == pytest.approx(.002)
@@ -46,6 +46,46 @@ clf__gamma = np.logspace(-4, -2, 3) # [.0001, .001, .01]
 clf__C = np.logspace(0, 2, 3) # [1, 10, 100]
 scoring = 'f1_micro'
 
+# Background removal parameters (see rpscv.imgproc.getGray) searched jointly
+# with the grid search parameters by searchPreprocessing() (train.py
+# --search-preprocessing). A threshold of 0 selects the adaptive threshold.
+# The best combination is scored on the test set and written to
+# searchBgFilename, so that the calibration of the game is not overwritten. It
+# is written to the background parameters file (rpscv.imgproc.bgFilename) used
+# by training and the game only with train.py --search-preprocessing
+# --write-bg-params.
+prep__hueValue = [55, 63, 71] # Background hue
+prep__threshold = [12, 17, 22] # Minimum hue distance of foreground pixels
+searchBgFilename = 'bg_params-search.txt'
+
+# If True, the images are read from the packed dataset created by pack.py
+# instead of the image folders (run pack.py first to add new images to it).
+packed = False
+
+# If not None, near-duplicate images (e.g. successive captures of the same pose)
+# are excluded from training, keeping one image of each group. Two images are
+# near-duplicates if their perceptual hashes differ by at most this number of
+# bits (see rpscv.dedup and dedup.py).
+maxDuplicateDistance = None
+
+# Kernel of the classifier. With 'exact', an RBF kernel SVC is used; its
+# prediction cost grows with the number of support vectors, hence with the
+# number of training images. With 'nystroem' (Nystroem method) or 'rff' (random
+# Fourier features), the PCA output is mapped through an approximate RBF
+# feature map of kmap__n_components features and a linear SVC is fitted. The
+# prediction cost then only depends on the feature map size. The gamma values of
+# clf__gamma are used for the feature map.
+kernel = 'exact'
+kmap__n_components = [500] # Size of the approximate kernel feature map
+
+# Number of augmented copies (random flip, rotation and brightness, see
+# rpscv.augment) of each training image used by trainAugmented() (train.py
+# --augment). The augmented features are generated by batches of batchSize
+# images and the PCA is fitted incrementally, so memory use does not grow with
+# the number of copies.
+augment = 4
+batchSize = 256
+
 # The n_jobs parameter controls the number of CPU cores to use in parallel for
 # training the machine learning model. Training with a higher number of cores
 # will result in faster training time but uses more memory.
@@ -69,34 +109,262 @@ scoring = 'f1_micro'
 # large number of images, reduce the number of CPU cores by ajusting n_jobs.
 n_jobs = -1
 
-def train(nbImg=0, cvScore=True):
+# Distributed grid search. If workers is a list of worker addresses (see
+# worker.py), the (parameters x fold) tasks of the grid search are run by these
+# workers instead of the local cores. If workers is an integer, this number of
+# local worker processes are started for the grid search. The training
+# features are written to .npy files in a temporary directory created in
+# distributedDataDir (the system temporary directory if None), which must be a
+# directory shared with the workers of other hosts. The files are removed at
+# the end of the grid search. A task whose worker does not answer within
+# taskTimeout seconds is sent to another worker.
+workers = None
+distributedDataDir = None
+taskTimeout = 600
+
+# If True, the score of each (parameters x fold) grid search task is cached in
+# grid_cache.json (see rpscv.gridcache), keyed by the training data, the
+# cross-validation settings and the parameters. Rerunning the grid search on
+# the same images then only computes the new parameter combinations.
+gridCache = False
+
+def buildPipeline(kernel='exact'):
+    """Returns the classifier pipeline and grid search parameters for the
+    kernel ('exact', 'nystroem' or 'rff')."""
+    from sklearn.pipeline import Pipeline
+    from sklearn.decomposition import PCA
+    from sklearn.kernel_approximation import Nystroem, RBFSampler
+    from sklearn.svm import SVC, LinearSVC
+
+    if kernel == 'exact':
+        steps = [('pca', PCA()), ('clf', SVC(kernel='rbf'))]
+        grid_params = dict(pca__n_components=pca__n_components,
+                           clf__gamma=clf__gamma,
+                           clf__C=clf__C)
+    elif kernel in ['nystroem', 'rff']:
+        if kernel == 'nystroem':
+            kmap = Nystroem(kernel='rbf', random_state=rs)
+        else:
+            kmap = RBFSampler(random_state=rs)
+        steps = [('pca', PCA()), ('kmap', kmap),
+                 ('clf', LinearSVC(random_state=rs))]
+        grid_params = dict(pca__n_components=pca__n_components,
+                           kmap__gamma=clf__gamma,
+                           kmap__n_components=kmap__n_components,
+                           clf__C=clf__C)
+    else:
+        raise ValueError("kernel must be 'exact', 'nystroem' or 'rff'")
+
+    return Pipeline(steps), grid_params
+
+def loadImages():
+    """Returns the source images, labels and filenames for streaming: the
+    memory-mapped images of the packed dataset if packed is True, otherwise
+    the image filenames (decoded when used)."""
+    from rpscv import imgproc as imp
+    from rpscv import utils
+    from rpscv.dataset import PackedDataset, packFilename
+
+    if packed:
+        dataset = PackedDataset(packFilename)
+        return dataset.getImages(), dataset.getLabels(), dataset.files
+    images = []
+    labels = []
+    for gesture in utils.gestureTxt:
+        for imageFile in imp.getImageFiles(gesture):
+            if imp.readPngShape(imageFile) in [None, imp.imshape]:
+                images.append(imageFile)
+                labels.append(gesture)
+    return images, np.array(labels, dtype=int), images
+
+def compareKernels(nbImg=0):
+    """Trains the classifier with each kernel on the same images and prints
+    their scores, training times and per-frame prediction latencies. No
+    classifier file is written."""
+    features, labels, files = generateFeatures(nbImg)
+    results = []
+    for k in ['exact', 'nystroem', 'rff']:
+        results.append((k,) + train(cvScore=False, kernel=k, save=False,
+                                    features=features, labels=labels))
+
+    print('Kernel comparison:')
+    print('  {:<10}{:>10}{:>10}{:>12}{:>14}'.format('kernel', 'cv score',
+        'f1-score', 'train time', 'latency'))
+    for k, cvScore, score, dt_train, latency in results:
+        print('  {:<10}{:>10.4f}{:>10.4f}{:>11.1f}s{:>12.3f}ms'.format(k,
+            cvScore, score, dt_train, 1000 * latency))
+
+def generateFeatures(nbImg=0):
+    """Returns the features, labels and filenames of the images generated from
+    the image files or from the packed dataset if packed is True, excluding
+    near-duplicate images if maxDuplicateDistance is not None."""
+    from rpscv import dataset
+    from rpscv import imgproc as imp
+    return imp.generateGrayFeatures(nbImg=nbImg, verbose=False, rs=rs,
+        packFilename=dataset.packFilename if packed else None,
+        maxDuplicateDistance=maxDuplicateDistance, returnFiles=True)
+
+def loadFeatures(nbImg=0):
+    """Returns the features, labels and filenames of the images. Uses the
+    feature cache of retrain.py (see rpscv.features) if it exists and matches
+    the current background parameters, otherwise generates the features from
+    the image files."""
+    from rpscv import features
+
+    if nbImg == 0:
+        files, labels, grays = features.loadCache()
+        if len(files) > 0:
+            return grays.astype(np.float32) / 255, labels, files
+    return generateFeatures(nbImg)
+
+def searchPreprocessing(writeBgParams=False):
+    """Runs the grid search for each combination of the background removal
+    parameters prep__hueValue and prep__threshold and prints the best score
+    and parameters of each. Each image is decoded once and its hue and
+    grayscale are cached as uint8 arrays; the features of each combination
+    are then derived with lookup tables. The best combination is scored on
+    the test set and written to searchBgFilename. If writeBgParams is True,
+    it is written to the background parameters file instead, replacing the
+    calibration used by the next training and the game. No classifier file
+    is written."""
+    import os
+    import time
+
+    from sklearn.base import clone
+    from sklearn.metrics import f1_score
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+
+    from rpscv import imgproc as imp
+
+    t0 = time.time()
+    images, labels, files = loadImages()
+    imsize = imp.imshape[0] * imp.imshape[1]
+    hues = np.empty((len(labels), imsize), dtype=np.uint8)
+    grays = np.empty((len(labels), imsize), dtype=np.uint8)
+    for i in range(len(labels)):
+        img = images[i]
+        if isinstance(img, str):
+            img = imp.decodeImage(img)
+        hues[i], grays[i] = imp.getHueGray(img)
+    train_index, test_index, labels_train, labels_test = splitTestSet(
+        np.arange(len(labels)), labels)
+    print('Decoded {} images in {:.1f}s'.format(len(labels), time.time() - t0))
+
+    pipe, grid_params = buildPipeline(kernel)
+    cv = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=rs)
+    results = []
+    for hueValue in prep__hueValue:
+        for threshold in prep__threshold:
+            t0 = time.time()
+            features = imp.maskGray(hues[train_index], grays[train_index],
+                                    hueValue, threshold)
+            grid = GridSearchCV(pipe, grid_params, scoring=scoring,
+                                n_jobs=n_jobs, cv=cv, refit=False)
+            grid.fit(features, labels_train)
+            results.append((grid.best_score_, hueValue, threshold,
+                            grid.best_params_, time.time() - t0))
+            del features
+
+    print('Preprocessing search results:')
+    print('  {:>8}{:>10}{:>10}{:>8}  {}'.format('hue', 'threshold',
+                                                 'cv score', 'time', 'params'))
+    for score, hueValue, threshold, params, dt in results:
+        print('  {:>8}{:>10}{:>10.4f}{:>7.1f}s  {}'.format(hueValue, threshold,
+                                                         score, dt, params))
+    score, hueValue, threshold, params, dt = max(results,
+                                                 key=lambda r: r[0])
+    print('Best preprocessing: hueValue={}, threshold={} (cv score '
+          '{:.4f})'.format(hueValue, threshold, score))
+
+    # Score the best combination on the test set
+    clf = clone(pipe).set_params(**params)
+    clf.fit(imp.maskGray(hues[train_index], grays[train_index], hueValue,
+                         threshold), labels_train)
+    pred = clf.predict(imp.maskGray(hues[test_index], grays[test_index],
+                                    hueValue, threshold))
+    print('Best preprocessing f1-score on test set: {:.4f}'.format(
+        f1_score(labels_test, pred, average='micro')))
+
+    if writeBgParams:
+        if os.path.exists(imp.bgFilename):
+            print('Replacing background parameters hueValue={}, '
+                  'threshold={}'.format(*imp.readBackgroundParams()))
+        imp.writeBackgroundParams(hueValue, threshold)
+        print('Background parameters written to {}'.format(imp.bgFilename))
+    else:
+        imp.writeBackgroundParams(hueValue, threshold, searchBgFilename)
+        print('Background parameters written to {} ({} not modified, use '
+              '--write-bg-params to replace it)'.format(searchBgFilename,
+                                                        imp.bgFilename))
+
+def splitHeldOut(files, labels):
+    """Returns the train and test indices of the images (filenames files and
+    labels) for the classifier file pklFilename. The test images are the
+    held-out images recorded when the classifier was trained (see
+    rpscv.features.saveTestFiles); the images added since are in the train
+    split. If the classifier has no record, the images are split by
+    splitTestSet()."""
+    from rpscv.features import loadTestFiles
+
+    testFiles = loadTestFiles(pklFilename)
+    if testFiles is None:
+        print('No held-out test images recorded for {}, using a new test '
+              'split'.format(pklFilename))
+        train_index, test_index, labels_train, labels_test = splitTestSet(
+            np.arange(len(labels)), labels)
+        return train_index, test_index
+    test = np.isin(np.array(files, dtype=str), np.array(testFiles, dtype=str))
+    return np.flatnonzero(~test), np.flatnonzero(test)
+
+def splitTestSet(features, labels):
+    """Splits the features and labels into train and test sets. Returns the
+    train features, test features, train labels and test labels."""
+    from sklearn.model_selection import StratifiedShuffleSplit
+    sssplit = StratifiedShuffleSplit(n_splits=1, test_size=.15, random_state=rs)
+    train_index, test_index = next(sssplit.split(features, labels))
+    return (features[train_index], features[test_index], labels[train_index],
+            labels[test_index])
+
+def train(nbImg=0, cvScore=True, kernel=kernel, save=True, features=None,
+          labels=None, files=None):
+    """Trains the classifier using grid search cross-validation and writes
+    the best classifier to the .pkl file if save is True, with the filenames
+    of its held-out test images (see splitHeldOut()). features, labels and
+    files can be passed to reuse image data already generated. Returns the grid
+    search best score, the score on the test set, the training time and the
+    median per-frame prediction time on the test set. The resources used by
+    each stage are profiled (see rpscv.profiler) and the profile is written
+    next to the classifier file (clf-profile.json) if save is True."""
     import time
     t0 = time.time()
 
+    from rpscv.profiler import TrainingProfiler
+    profiler = TrainingProfiler(kernel=kernel, n_jobs=n_jobs,
+                                n_splits=n_splits, nbImg=nbImg,
+                                packed=packed, workers=workers)
+
     def dt():
         return round(time.time() - t0, 2)
 
     print('+{}s: Importing libraries'.format(dt()))
 
-    import pickle
-
-    from sklearn.pipeline import Pipeline
-    from sklearn.decomposition import PCA
-    from sklearn.model_selection import StratifiedShuffleSplit
     from sklearn.model_selection import StratifiedKFold
     from sklearn.model_selection import GridSearchCV
-    from sklearn.svm import SVC
     from sklearn.metrics import f1_score
     from sklearn.metrics import confusion_matrix
     from sklearn.metrics import classification_report
 
-    from rpscv import imgproc as imp
     from rpscv import utils
+    from rpscv.features import saveTestFiles
+    from rpscv.model import measureLatency, saveClassifier
+    profiler.mark('import libraries')
 
     # Generate image data from stored images
-    print('+{}s: Generating image data'.format(dt()))
-    features, labels = imp.generateGrayFeatures(nbImg=nbImg, verbose=False,
-                                                rs=rs)
+    if features is None:
+        print('+{}s: Generating image data'.format(dt()))
+        features, labels, files = generateFeatures(nbImg)
+        profiler.mark('generate features', features=features, labels=labels)
+    profiler.info['nbImages'] = len(labels)
 
     unique, count = np.unique(labels, return_counts=True)
 
@@ -106,17 +374,16 @@ def train(nbImg=0, cvScore=True):
 
     # Generate test set
     print('+{}s: Generating test set'.format(dt()))
-    sssplit = StratifiedShuffleSplit(n_splits=1, test_size=.15, random_state=rs)
-    for train_index, test_index in sssplit.split(features, labels):
-        features_train = features[train_index]
-        features_test = features[test_index]
-        labels_train = labels[train_index]
-        labels_test = labels[test_index]
+    train_index, test_index, labels_train, labels_test = splitTestSet(
+        np.arange(len(labels)), labels)
+    features_train = features[train_index]
+    features_test = features[test_index]
+    profiler.mark('split test set', features_train=features_train,
+                  features_test=features_test)
 
     # Define pipeline parameters
-    print('+{}s: Defining pipeline'.format(dt()))
-    steps = [('pca', PCA()), ('clf', SVC(kernel='rbf'))]
-    pipe = Pipeline(steps)
+    print('+{}s: Defining pipeline ({} kernel)'.format(dt(), kernel))
+    pipe, grid_params = buildPipeline(kernel)
 
     # Define cross-validation parameters
     print('+{}s: Defining cross-validation'.format(dt()))
@@ -124,11 +391,16 @@ def train(nbImg=0, cvScore=True):
 
     # Define grid-search parameters
     print('+{}s: Defining grid search'.format(dt()))
-    grid_params = dict(pca__n_components=pca__n_components,
-                       clf__gamma=clf__gamma,
-                       clf__C=clf__C)
-    grid = GridSearchCV(pipe, grid_params, scoring=scoring, n_jobs=n_jobs,
-        refit=True, cv=cv, verbose=1)
+    if workers is None and not gridCache:
+        grid = GridSearchCV(pipe, grid_params, scoring=scoring, n_jobs=n_jobs,
+            refit=True, cv=cv, verbose=1)
+    else:
+        from rpscv.distributed import DistributedGridSearch
+        from rpscv.gridcache import GridCache
+        grid = DistributedGridSearch(pipe, grid_params,
+            [] if workers is None else workers, scoring=scoring, cv=cv,
+            dataDir=distributedDataDir, taskTimeout=taskTimeout,
+            cache=GridCache() if gridCache else None, n_jobs=n_jobs)
     print('Grid search parameters:')
     print(grid)
 
@@ -137,6 +409,16 @@ def train(nbImg=0, cvScore=True):
     print('+{}s: Fitting classifier'.format(dt()))
     grid.fit(features_train, labels_train)
     dt_train = time.time() - t0_train
+    profiler.mark('grid search')
+    profiler.recordSearch(grid.cv_results_)
+
+    if workers is not None or gridCache:
+        grid.printTimings()
+        if len(grid.failedWorkers) > 0:
+            print('Failed workers: {}'.format(grid.failedWorkers))
+        if gridCache:
+            print('{} of {} grid search tasks read from {}'.format(
+                grid.cache.nbHits, grid.nbTasks, grid.cache.filename))
 
     if cvScore:
         # Print the results of the grid search cross-validation
@@ -162,16 +444,200 @@ def train(nbImg=0, cvScore=True):
     print('Classification report:')
     tn = [utils.gestureTxt[i] for i in range(3)]
     print(classification_report(labels_test, pred, target_names=tn))
+    profiler.mark('validate on test set', pred=pred)
+
+    # Measure per-frame prediction time, as in the game loop
+    latency = np.median(measureLatency(grid.best_estimator_, features_test))
+    print('Median prediction time per frame: {:.3f}ms'.format(1000 * latency))
+    profiler.mark('measure latency')
+
+    if save:
+        # Write best classifier pipeline to a .pkl file. Only the pipeline is
+        # written (not the grid search object) to keep the file small and fast
+        # to load by the game scripts.
+        print('+{}s: Writing classifier to {}'.format(dt(), pklFilename))
+        saveClassifier(grid.best_estimator_, pklFilename)
+        if files is not None:
+            saveTestFiles(pklFilename, [files[i] for i in test_index],
+                          [files[i] for i in train_index])
+        profiler.mark('write classifier')
+        profileFilename = pklFilename.rsplit('.', 1)[0] + '-profile.json'
+        profiler.save(profileFilename)
+        print('+{}s: Profile written to {}'.format(dt(), profileFilename))
+
+    profiler.report()
+    print('+{}s: Done!'.format(dt()))
+
+    return grid.best_score_, score, dt_train, latency
+
+def trainAugmented(nbCopies=augment, save=True):
+    """Trains the classifier on the training images and nbCopies augmented
+    copies of each, generated by batches (see rpscv.augment). The PCA is an
+    IncrementalPCA fitted batch by batch and the SVC grid search is performed
+    on the projected features, with cross-validation folds grouping the copies
+    of the same image. The PCA of each fold is fitted on the training images
+    of the fold only. The test set images are not augmented. Writes the
+    classifier to the .pkl file if save is True, with the filenames of its
+    held-out test images. Returns the grid search best
+    score, the score on the test set, the training time and the median
+    per-frame prediction time on the test set. The stages are profiled as in
+    train()."""
+    import copy
+    import time
+    t0 = time.time()
+
+    from rpscv.profiler import TrainingProfiler
+    profiler = TrainingProfiler(kernel='exact', n_jobs=n_jobs,
+                                n_splits=n_splits, packed=packed,
+                                augment=nbCopies, batchSize=batchSize)
+
+    def dt():
+        return round(time.time() - t0, 2)
 
-    # Write classifier to a .pkl file
-    print('+{}s: Writing classifier to {}'.format(dt(), pklFilename))
-    with open(pklFilename, 'wb') as f:
-        f.flush()
-        pickle.dump(grid, f)
+    from sklearn.decomposition import IncrementalPCA
+    from sklearn.metrics import f1_score
+    from sklearn.model_selection import (GridSearchCV, GroupKFold,
+                                         PredefinedSplit)
+    from sklearn.pipeline import Pipeline
+    from sklearn.svm import SVC
 
+    from rpscv.augment import AugmentedStream
+    from rpscv.features import saveTestFiles
+    from rpscv.model import measureLatency, saveClassifier
+    profiler.mark('import libraries')
+
+    images, labels, files = loadImages()
+    profiler.info['nbImages'] = len(labels)
+    train_index, test_index, labels_train, labels_test = splitTestSet(
+        np.arange(len(labels)), labels)
+    stream = AugmentedStream(images, labels, train_index, nbCopies,
+                             batchSize=batchSize, rs=rs)
+    bgParams = stream.bgParams
+    print('+{}s: Training on {} images x {} copies ({} samples)'.format(dt(),
+        len(train_index), nbCopies + 1, len(stream)))
+
+    def fitPCA(indices):
+        """Returns the incremental PCA fitted on the images of indices and
+        their augmented copies."""
+        ipca = IncrementalPCA(n_components=max(pca__n_components))
+        for features, y, idx in AugmentedStream(images, labels, indices,
+                nbCopies, batchSize=batchSize, rs=rs, bgParams=bgParams):
+            ipca.partial_fit(features)
+        return ipca
+
+    def project(ipca, indices):
+        """Returns the projected features and the labels of the images of
+        indices and their augmented copies. Only the projected features are
+        kept in memory."""
+        proj = []
+        y_proj = []
+        for features, y, idx in AugmentedStream(images, labels, indices,
+                nbCopies, batchSize=batchSize, rs=rs, bgParams=bgParams):
+            proj.append(ipca.transform(features).astype(np.float32))
+            y_proj.append(y)
+        return np.concatenate(proj), np.concatenate(y_proj)
+
+    # Grid search of the SVC parameters for each number of PCA components
+    # (the first components of the incremental PCA). The folds group the
+    # copies of the same image and the PCA of each fold is fitted on its
+    # training images only, so that the validation images do not leak into
+    # the features.
+    t0_train = time.time()
+    print('+{}s: Grid search'.format(dt()))
+    cv = GroupKFold(n_splits=n_splits)
+    foldResults = {n: [] for n in pca__n_components}
+    for f, (fold_train, fold_val) in enumerate(cv.split(train_index,
+            labels[train_index], groups=train_index)):
+        ipca = fitPCA(train_index[fold_train])
+        proj_train, y_fold_train = project(ipca, train_index[fold_train])
+        proj_val, y_fold_val = project(ipca, train_index[fold_val])
+        proj = np.concatenate([proj_train, proj_val])
+        y_fold = np.concatenate([y_fold_train, y_fold_val])
+        split = PredefinedSplit(np.r_[np.full(len(proj_train), -1),
+                                      np.zeros(len(proj_val), dtype=int)])
+        for n in pca__n_components:
+            grid = GridSearchCV(SVC(kernel='rbf'),
+                                dict(gamma=clf__gamma, C=clf__C),
+                                scoring=scoring, n_jobs=n_jobs, refit=False,
+                                cv=split)
+            grid.fit(proj[:, :n], y_fold)
+            foldResults[n].append(grid.cv_results_)
+        print('  fold {}: {} training and {} validation samples'.format(f,
+            len(proj_train), len(proj_val)))
+    del proj, proj_train, proj_val
+
+    # Mean scores of the candidates over the folds, in the cv_results_ format
+    cvResults = {'params': [], 'mean_fit_time': [], 'std_fit_time': [],
+                 'mean_score_time': [], 'mean_test_score': []}
+    for n in pca__n_components:
+        for i, params in enumerate(foldResults[n][0]['params']):
+            cvResults['params'].append(dict(pca__n_components=n,
+                clf__C=params['C'], clf__gamma=params['gamma']))
+            fitTimes = [r['mean_fit_time'][i] for r in foldResults[n]]
+            cvResults['mean_fit_time'].append(np.mean(fitTimes))
+            cvResults['std_fit_time'].append(np.std(fitTimes))
+            cvResults['mean_score_time'].append(np.mean(
+                [r['mean_score_time'][i] for r in foldResults[n]]))
+            cvResults['mean_test_score'].append(np.mean(
+                [r['mean_test_score'][i] for r in foldResults[n]]))
+    best = int(np.argmax(cvResults['mean_test_score']))
+    bestParams = cvResults['params'][best]
+    bestScore = cvResults['mean_test_score'][best]
+    print('Grid search best score: {:.4f}, {}'.format(bestScore, bestParams))
+    profiler.mark('grid search')
+    profiler.recordSearch(cvResults)
+
+    # Fit the PCA on all the training images and the SVC with the best
+    # parameters on the projected features
+    print('+{}s: Fitting incremental PCA'.format(dt()))
+    ipca = fitPCA(train_index)
+    profiler.mark('fit incremental PCA', components=ipca.components_)
+    print('+{}s: Projecting features'.format(dt()))
+    proj, y_train = project(ipca, train_index)
+    profiler.mark('project features', proj=proj)
+    print('+{}s: Fitting classifier'.format(dt()))
+    n = bestParams['pca__n_components']
+    svc = SVC(kernel='rbf', C=bestParams['clf__C'],
+              gamma=bestParams['clf__gamma'])
+    svc.fit(proj[:, :n], y_train)
+    profiler.mark('fit classifier')
+
+    pca = copy.deepcopy(ipca)
+    pca.n_components = pca.n_components_ = n
+    for name in ['components_', 'explained_variance_',
+                 'explained_variance_ratio_', 'singular_values_']:
+        setattr(pca, name, getattr(ipca, name)[:n])
+    clf = Pipeline([('pca', pca), ('clf', svc)])
+    dt_train = time.time() - t0_train
+
+    # Validate classifier on the test set, by batches
+    print('+{}s: Validating classifier on test set'.format(dt()))
+    testStream = AugmentedStream(images, labels, test_index, nbCopies=0,
+                                 batchSize=batchSize, bgParams=bgParams)
+    pred = np.concatenate([clf.predict(f) for f, y, idx in testStream])
+    score = f1_score(labels_test, pred, average='micro')
+    print('Classifier f1-score on test set: {}'.format(score))
+    profiler.mark('validate on test set', pred=pred)
+
+    features_test = next(iter(testStream))[0]
+    latency = np.median(measureLatency(clf, features_test))
+    print('Median prediction time per frame: {:.3f}ms'.format(1000 * latency))
+    profiler.mark('measure latency')
+
+    if save:
+        print('+{}s: Writing classifier to {}'.format(dt(), pklFilename))
+        saveClassifier(clf, pklFilename)
+        saveTestFiles(pklFilename, [files[i] for i in test_index],
+                      [files[i] for i in train_index])
+        profiler.mark('write classifier')
+        profileFilename = pklFilename.rsplit('.', 1)[0] + '-profile.json'
+        profiler.save(profileFilename)
+        print('+{}s: Profile written to {}'.format(dt(), profileFilename))
+
+    profiler.report()
     print('+{}s: Done!'.format(dt()))
 
-    return grid.best_score_, score, dt_train
+    return bestScore, score, dt_train, latency
 
 if __name__ == '__main__':
 
@@ -179,10 +645,51 @@ if __name__ == '__main__':
     argv = sys.argv
 
     cvScore = True
+    compare = False
+    profiles = None
+    augmented = False
+    searchPrep = False
+    writeBgParams = False
 
     if len(sys.argv) > 1:
         for arg in argv[1:]:
             if arg == '--no-cv-score':
                 cvScore = False
-
-    train(cvScore=cvScore)
+            elif arg.startswith('--kernel='):
+                kernel = arg.split('=', 1)[1]
+            elif arg == '--compare-kernels':
+                compare = True
+            elif arg == '--packed':
+                packed = True
+            elif arg == '--search-preprocessing':
+                searchPrep = True
+            elif arg == '--write-bg-params':
+                writeBgParams = True
+            elif arg == '--augment':
+                augmented = True
+            elif arg.startswith('--augment='):
+                augmented = True
+                augment = int(arg.split('=', 1)[1])
+            elif arg.startswith('--compare-profiles='):
+                profiles = arg.split('=', 1)[1].split(',')
+            elif arg == '--cache':
+                gridCache = True
+            elif arg.startswith('--workers='):
+                value = arg.split('=', 1)[1]
+                workers = int(value) if value.isdigit() else value.split(',')
+            elif arg == '--dedup':
+                maxDuplicateDistance = 4
+            elif arg.startswith('--dedup='):
+                maxDuplicateDistance = int(arg.split('=', 1)[1])
+
+    if profiles is not None:
+        from rpscv.profiler import compareProfiles
+        compareProfiles(*profiles)
+    elif compare:
+        compareKernels()
+    elif searchPrep:
+        searchPreprocessing(writeBgParams)
+    elif augmented:
+        trainAugmented(augment)
+    else:
+        train(cvScore=cvScore, kernel=kernel)
@@ -0,0 +1,43 @@
+# worker.py
+# Source: https://github.com/DrGFreeman/rps-cv
+#
+# MIT License
+#
+# Copyright (c) 2017-2019 Julien de la Bruere-Terreault <drgfreeman@tuta.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# This script runs a grid search worker (see rpscv.distributed) listening on
+# the address given as argument: a Unix socket path or a host:port TCP address
+# (e.g. 0.0.0.0:5500 to accept connections from other hosts). Run train.py with
+# --workers=<address>[,<address>...] to use the workers. The dataset directory
+# of train.py (distributedDataDir) must be accessible from the worker host.
+
+import sys
+
+from rpscv.distributed import serveWorker
+
+if __name__ == '__main__':
+
+    if len(sys.argv) != 2:
+        print('Usage: python worker.py <address>')
+        sys.exit(1)
+
+    print('Grid search worker listening on {}'.format(sys.argv[1]))
+    serveWorker(sys.argv[1])